@@ -0,0 +1,250 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain.chains import ConversationalRetrievalChain
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.documents import Document
+import tracing
+
+# Name of the custom callback event sent on every answer cache lookup.
+CACHE_EVENT = "answer_cache"
+
+
+class CachedAnswer:
+    """
+    One cached answer, with the translations (and audio) made for it so far, per language pair.
+    """
+
+    def __init__(self, question, answer, source_documents, mentions=None):
+        self.question = question
+        self.answer = answer
+        self.source_documents = source_documents
+        self.mentions = mentions or {}
+        self.translations = {}
+        self.created = time.time()
+
+    def get_translation(self, languages):
+        """
+        Returns:
+            Tuple[str, bytes]: The translated answer and its audio, or None if it wasn't translated to these languages yet.
+        """
+        return self.translations.get(languages)
+
+    def set_translation(self, languages, text, audio):
+        self.translations[languages] = (text, audio)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of answers keyed by the embedding of the standalone question.
+
+    A lookup returns the answer of the most similar cached question when the cosine similarity reaches `threshold`,
+    so close variants of a question ("career centres in Assam" / "career centers located in Assam") share one answer.
+    With an `extractor` (metadata_index.EntityExtractor), only cached questions naming the same PINs, districts, states and
+    centre types can match: embeddings barely move when only a PIN or a place name changes ("centres near 522001" / "522002").
+    Entries are evicted least-recently-used beyond `max_entries` and expire after `ttl` seconds.
+    The whole cache is dropped when the index version file written by populate_database.py changes,
+    so answers never outlive the data they were generated from.
+    """
+
+    def __init__(self, embeddings, threshold=0.95, max_entries=256, ttl=24 * 3600, version_path=None, extractor=None):
+        self.embeddings = embeddings
+        self.extractor = extractor
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_path = version_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._vectors = {}
+        self._matrix = None
+        self._matrix_keys = []
+        self._version = self._read_version()
+        self._lock = threading.Lock()
+
+    def _read_version(self):
+        if self.version_path is None or not os.path.exists(self.version_path):
+            return None
+        with open(self.version_path, encoding="utf-8") as f:
+            return f.read()
+
+    def _check_version(self):
+        version = self._read_version()
+        if version != self._version:
+            self._version = version
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._vectors.clear()
+        self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-9)
+
+    def _evict_expired(self):
+        expired = [key for key, entry in self._entries.items() if time.time() - entry.created > self.ttl]
+        for key in expired:
+            self._remove(key)
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+        self._matrix = None
+
+    def _mentions(self, question):
+        return self.extractor.extract(question) if self.extractor is not None else {}
+
+    def lookup(self, question):
+        """
+        Find the cached answer of the most similar question.
+
+        Returns:
+            Tuple[CachedAnswer, float]: The cached answer (None on a miss) and its similarity to the question.
+        """
+        vector = self._embed(question)
+        mentions = self._mentions(question)
+        with self._lock:
+            self._check_version()
+            self._evict_expired()
+            if not self._entries:
+                self.misses += 1
+                return None, 0.0
+            if self._matrix is None:
+                self._matrix_keys = list(self._vectors)
+                self._matrix = np.stack([self._vectors[key] for key in self._matrix_keys])
+            similarities = self._matrix @ vector
+            # Questions about other places, PINs or centre types never match, however similar their wording.
+            same_mentions = np.fromiter(
+                (self._entries[key].mentions == mentions for key in self._matrix_keys), dtype=bool, count=len(self._matrix_keys)
+            )
+            if not same_mentions.any():
+                self.misses += 1
+                return None, 0.0
+            similarities = np.where(same_mentions, similarities, -1.0)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, similarity
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key], similarity
+
+    def store(self, question, answer, source_documents):
+        """
+        Cache the answer to a standalone question.
+
+        Returns:
+            CachedAnswer: The new entry, to which translations can be attached later.
+        """
+        entry = CachedAnswer(question, answer, source_documents, self._mentions(question))
+        vector = self._embed(question)
+        key = " ".join(question.split())
+        with self._lock:
+            self._check_version()
+            self._remove(key)
+            self._entries[key] = entry
+            self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+# Lookup of the chain call running in the current context: the standalone question and its documents, set by _get_docs().
+_current_lookup = contextvars.ContextVar("answer_cache_lookup", default=None)
+
+
+class _AnswerCacheHit(Exception):
+    """Raised by CachedConversationalRetrievalChain._get_docs() to skip retrieval and generation on a cache hit."""
+
+    def __init__(self, question, cached):
+        super().__init__(question)
+        self.question = question
+        self.cached = cached
+
+
+class CachedConversationalRetrievalChain(ConversationalRetrievalChain):
+    """
+    ConversationalRetrievalChain that answers from a SemanticAnswerCache when the standalone question was answered before.
+
+    The question is still condensed against the chat history first, since that makes it self-contained. The lookup runs in
+    _get_docs(), which receives the standalone question; on a hit, retrieval, reranking, compression and answer generation
+    are all skipped. The output has the cache entry under "cached_answer" (on hits and on new answers), so callers can attach
+    translations to it, and "cache_hit" tells the two apart.
+    """
+
+    answer_cache: Any = None
+    """The SemanticAnswerCache; the chain behaves like ConversationalRetrievalChain when None."""
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        if self.answer_cache is None:
+            return super()._call(inputs, run_manager=run_manager)
+        lookup = {}
+        token = _current_lookup.set(lookup)
+        try:
+            output = super()._call(inputs, run_manager=run_manager)
+        except _AnswerCacheHit as hit:
+            output = {self.output_key: hit.cached.answer, "cache_hit": True, "cached_answer": hit.cached}
+            if self.return_source_documents:
+                output["source_documents"] = hit.cached.source_documents
+            if self.return_generated_question:
+                output["generated_question"] = hit.question
+            return output
+        finally:
+            _current_lookup.reset(token)
+
+        cached = None
+        if lookup.get("documents"):
+            # Answers without any retrieved context are not cached; they are usually "I don't know".
+            cached = self.answer_cache.store(lookup["question"], output[self.output_key], lookup["documents"])
+        return {**output, "cache_hit": False, "cached_answer": cached}
+
+    def _get_docs(
+        self,
+        question: str,
+        inputs: Dict[str, Any],
+        *,
+        run_manager: CallbackManagerForChainRun,
+    ) -> List[Document]:
+        lookup = _current_lookup.get()
+        if self.answer_cache is not None and lookup is not None:
+            with tracing.span("answer_cache") as stage:
+                cached, similarity = self.answer_cache.lookup(question)
+                stage.set(hit=cached is not None, similarity=similarity)
+            tracing.set_attributes(answer_cache_hit=cached is not None)
+            dispatch_custom_event(
+                CACHE_EVENT, {"hit": cached is not None, "similarity": similarity}, config={"callbacks": run_manager.get_child()}
+            )
+            if cached is not None:
+                raise _AnswerCacheHit(question, cached)
+        documents = super()._get_docs(question, inputs, run_manager=run_manager)
+        if lookup is not None:
+            lookup.update(question=question, documents=documents)
+        return documents
@@ -1,43 +1,62 @@
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_cerebras import ChatCerebras
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
 from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever, ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import DocumentCompressorPipeline
-from langchain_cohere import CohereRerank
+from langchain.retrievers import ContextualCompressionRetriever
 from langchain.prompts import ChatPromptTemplate
-from langchain.retrievers.document_compressors import LLMChainExtractor
-from langchain_chroma import Chroma
 from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from streamlit_mic_recorder import mic_recorder
-from bhashini_translator import Bhashini #custom module
+from bhashini_translator import AsyncBhashini, countLookups, runAsync, runSync #custom module
+from streaming import ANSWER_TAG, ChainStream, join_wav, pipeline_segments, split_sentences
+import asyncio
 import base64
-from populate_database import load_chunks
+from functools import lru_cache
+from chunk_store import ChunkStore
+from bm25_index import BM25Index, BM25IndexRetriever
+from hybrid_retriever import HybridRetriever
+from metadata_index import EntityExtractor, MetadataIndex
+from directory_lookup import DirectoryLookup, DirectoryRouterChain, DirectoryStore
+from rerankers import get_reranker
+from compressors import get_compressors
+from answer_cache import CachedConversationalRetrievalChain, SemanticAnswerCache
+from conversation_memory import BoundedConversationMemory
+import resources
+import tracing
 from langchain_core.documents import BaseDocumentTransformer, Document
 from pydantic import BaseModel, Field
 from typing import Any, Callable, List, Sequence
 
 def get_embedding_function():
     """
-    Get the OpenAI embedding function for document embeddings.
+    Get the embedding function for document embeddings, shared by every session.
     
     Returns:
-        OpenAIEmbeddings: An instance of OpenAIEmbeddings for creating document embeddings.
+        HuggingFaceEmbeddings: The process-wide embedding model.
     """
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-    return embeddings
+    return resources.get_embedding_function()
 
 # Stored at local paths.
 CHROMA_PATH = "chroma"
+CHUNKS_PATH = "chunk_store"
+BM25_PATH = "bm25_index"
+METADATA_INDEX_PATH = "metadata_index.json"
+DIRECTORY_PATH = "directory.sqlite"
+INDEX_VERSION_PATH = "index_version.txt"
 DATA_PATH = "data"
 
 # Language set by the user.
 sourceLanguage = "hi"
 targetLanguage = "en"
 
+# Stream the answer sentence by sentence through translation and TTS.
+STREAM_RESPONSES = True
+
+# Conversation history sent to the LLMs: a rolling summary plus the last HISTORY_TURNS turns, within HISTORY_TOKEN_BUDGET tokens.
+HISTORY_TURNS = 3
+HISTORY_TOKEN_BUDGET = 1000
+
+# Answers to questions at least this similar (cosine of their embeddings) to an earlier question are served from the cache.
+ANSWER_CACHE_THRESHOLD = 0.95
+
 # Streamlit messages UI templates.
 css = '''
 <style>
@@ -90,16 +109,14 @@ def get_vectorstore():
     Load the vector store from ChromaDB.
 
     Returns:
-        Tuple[Chroma, list[Document]]:
+        Tuple[Chroma, ChunkStore]:
             - Chroma object: The loaded vector store.
-            - list[Document]: The document chunks used to create the vector store.
+            - ChunkStore: The document chunks used to create the vector store.
     """
-    chunks = load_chunks()
-    if chunks is None:
+    if not ChunkStore.exists(CHUNKS_PATH):
         st.error("No saved chunks found. Please run populate_database.py first.")
         return None, None
-    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=get_embedding_function())
-    return db, chunks
+    return resources.get_chroma(CHROMA_PATH), resources.get_chunk_store(CHUNKS_PATH)
 
 class RelevanceScoreFilter(BaseDocumentTransformer, BaseModel):
     """Filter that drops documents below a certain relevance score threshold."""
@@ -133,50 +150,111 @@ def get_improved_retriever(vectorstore, chunks):
 
     Args:
         vectorstore (Chroma): used for semantic search.
-        chunks (list[Document]): used for keyword search.
+        chunks (Iterable[Document]): used for keyword search.
 
     Returns:
         ContextualCompressionRetriever: Improved retriever combining vector and keyword search, as well as a reranker.
     """
-    # Vector store retriever
-    vectorstore_retriever = vectorstore.as_retriever(search_kwargs={"k": 8})
+    # Keyword retriever, backed by the prebuilt index when there is one
+    if BM25Index.exists(BM25_PATH):
+        bm25_retriever = BM25IndexRetriever(index=resources.get_bm25_index(BM25_PATH), chunk_store=chunks, k=8)
+    else:
+        bm25_retriever = BM25Retriever.from_documents(chunks)
+        bm25_retriever.k = 8
     
-    # Keyword retriever
-    bm25_retriever = BM25Retriever.from_documents(chunks)
-    bm25_retriever.k = 8
-    
-    # Ensemble retriever
-    ensemble_retriever = EnsembleRetriever(
-        retrievers=[vectorstore_retriever, bm25_retriever],
-        weights=[0.5, 0.5]
+    # Restricts both searches to the chunks of the states, districts, PINs and centre types named in the question
+    prefilter = None
+    if MetadataIndex.exists(METADATA_INDEX_PATH):
+        prefilter = EntityExtractor(resources.get_metadata_index(METADATA_INDEX_PATH))
+
+    # Hybrid retriever: vector and keyword search run concurrently and are fused with reciprocal rank fusion
+    hybrid_retriever = HybridRetriever(
+        vectorstore=vectorstore,
+        keyword_retriever=bm25_retriever,
+        k=8,
+        weights=(0.5, 0.5),
+        query_embeddings=resources.get_query_embeddings(),
+        prefilter=prefilter
     )
-    cohere_compressor = CohereRerank(model="rerank-english-v3.0", top_n=5)
+    # Cohere by default; set RERANKER_BACKEND=cross-encoder to rerank locally on CPU
+    reranker = get_reranker(top_n=5)
     relevance_filter = RelevanceScoreFilter(relevance_threshold=0.76)
-    llm = ChatCerebras(temperature=0, model="llama3.1-70b")
-    compressor = LLMChainExtractor.from_llm(llm)
+    # Keeps only the matching rows without an LLM call; set COMPRESSOR_MODE=llm for the (concurrent) LLM extractor
+    llm = resources.get_chat_model(temperature=0, model="llama3.1-70b")
+    compressors = get_compressors(
+        llm=llm, embeddings=get_embedding_function(), query_embeddings=resources.get_query_embeddings()
+    )
 
-    pipeline_compressor = DocumentCompressorPipeline(
-        transformers=[cohere_compressor, relevance_filter, compressor]
+    # Each stage runs in its own tracing span
+    pipeline_compressor = tracing.TracedCompressorPipeline(
+        transformers=[reranker, relevance_filter, *compressors],
+        stage_names=["rerank", "relevance_filter", *["compression"] * len(compressors)]
     )
     
+    # Tagged so tracing.TracingCallbackHandler times the whole retrieval as one span
     compression_retriever = ContextualCompressionRetriever(
-        base_compressor=pipeline_compressor, base_retriever=ensemble_retriever
+        base_compressor=pipeline_compressor, base_retriever=hybrid_retriever, tags=["retrieval"]
     )
     return compression_retriever
 
-def get_conversation_chain(retriever):
+def get_shared_retriever():
+    """
+    Get the retriever shared by every session, building it on first use.
+
+    The retriever holds no per-session state, so sessions only differ in their conversation chain and memory.
+    The chunk store and BM25 index it reads from are refreshed on every call to pick up new ingestion runs.
+
+    Returns:
+        ContextualCompressionRetriever: The shared retriever, or None if the database hasn't been populated yet.
+    """
+    if not ChunkStore.exists(CHUNKS_PATH):
+        return None
+    resources.get_chunk_store(CHUNKS_PATH)
+    if BM25Index.exists(BM25_PATH):
+        resources.get_bm25_index(BM25_PATH)
+    # Rebuild once the BM25 or metadata index appears, instead of keeping the fallback without it.
+    return resources.get_resource(
+        f"retriever:{BM25Index.exists(BM25_PATH)}:{MetadataIndex.exists(METADATA_INDEX_PATH)}",
+        lambda: get_improved_retriever(*get_vectorstore()),
+    )
+
+def get_answer_cache():
+    """
+    Get the semantic answer cache shared by every session.
+
+    Returns:
+        SemanticAnswerCache: The cache, invalidated whenever populate_database.py changes the vector store.
+    """
+    def load():
+        # Questions only share an answer when they name the same PINs, places and centre types
+        extractor = None
+        if MetadataIndex.exists(METADATA_INDEX_PATH):
+            extractor = EntityExtractor(resources.get_metadata_index(METADATA_INDEX_PATH))
+        return SemanticAnswerCache(
+            resources.get_query_embeddings(), threshold=ANSWER_CACHE_THRESHOLD, version_path=INDEX_VERSION_PATH,
+            extractor=extractor
+        )
+
+    return resources.get_resource("answer_cache", load)
+
+def get_conversation_chain(retriever, streaming=False):
     """
     Get a conversational chain using the provided retriever.
 
     Args:
         retriever (ContextualCompressionRetriever): The retriever to use in the chain.
+        streaming (bool): Stream the answering LLM's tokens to callbacks (see streaming.ChainStream).
 
     Returns:
-        ConversationalRetrievalChain: A chain that combines the language model, retriever, and conversation memory.
+        Chain: A chain that combines the language model, retriever, and bounded conversation memory,
+        answering repeated questions from the shared answer cache. When the directory has been built,
+        listing questions are answered from it by a DirectoryRouterChain in front.
     """
     system_prompt = """You are a helpful assistant for the Government of India's National Career Service. 
     Provide accurate, concise information about career centers, job opportunities, and related services. 
-    Use simple language and give specific details when available. If unsure, say so without making up information."""
+    Use simple language and give specific details when available. If unsure, say so without making up information.
+    Be relevant. If the context provided isn't necessary, don't add it to your response. However, make your response accurate and complete by only using information from the provided context.
+    Use addresses. Use bullet points for lengthy responses."""
     
     human_prompt = """Context: {context}
     
@@ -196,79 +274,279 @@ def get_conversation_chain(retriever):
         ("human", human_prompt),
     ])
     
-    llm = ChatCerebras(model="llama3.1-70b", temperature=0)
+    llm = resources.get_chat_model(model="llama3.1-70b", temperature=0, streaming=streaming, tags=[ANSWER_TAG])
+    condense_question_llm = resources.get_chat_model(model="llama3.1-70b", temperature=0)
     
-    chain = ConversationalRetrievalChain.from_llm(
+    chain = CachedConversationalRetrievalChain.from_llm(
         llm=llm,
+        condense_question_llm=condense_question_llm,
         retriever=retriever,
-        memory=ConversationBufferMemory(memory_key='chat_history', return_messages=True, output_key='answer'),
+        memory=BoundedConversationMemory(
+            llm=condense_question_llm,
+            memory_key='chat_history',
+            return_messages=True,
+            output_key='answer',
+            max_token_limit=HISTORY_TOKEN_BUDGET,
+            keep_turns=HISTORY_TURNS
+        ),
         combine_docs_chain_kwargs={"prompt": prompt},
         return_source_documents=True,
-        return_generated_question=True 
+        return_generated_question=True,
+        answer_cache=get_answer_cache()
     )
+    # Condensing, retrieval and answer generation are each timed as a span by tracing.TracingCallbackHandler
+    chain.question_generator.tags = ["condense"]
+    chain.combine_docs_chain.tags = ["generation"]
+
+    # Listing questions ("list Model Career Centres in Assam") are answered from the table rows, without the LLM
+    if DirectoryStore.exists(DIRECTORY_PATH) and MetadataIndex.exists(METADATA_INDEX_PATH):
+        directory = DirectoryLookup(
+            DirectoryStore(DIRECTORY_PATH), EntityExtractor(resources.get_metadata_index(METADATA_INDEX_PATH))
+        )
+        chain = DirectoryRouterChain(chain=chain, directory=directory)
     
     return chain
 
-def handle_userinput(user_question):
+@lru_cache(maxsize=None)
+def get_bhashini(source_language, target_language):
+    """
+    Get the shared Bhashini client for a language pair.
+
+    Clients hold no per-conversation state, so one instance per language pair serves every message and session.
+
+    Returns:
+        AsyncBhashini: The client translating from source_language to target_language.
+    """
+    return AsyncBhashini(source_language, target_language)
+
+async def translate_turn(user_content, bot_content, user_translation=None):
+    """
+    Translate one conversation turn back to the user's language and synthesize the bot reply.
+
+    The user message NMT runs concurrently with the bot reply NMT and TTS.
+
+    Args:
+        user_content (str): The user's question in English.
+        bot_content (str): The bot's answer in English.
+        user_translation (str, optional): The question as the user typed it, which skips its translation.
+
+    Returns:
+        Tuple[str, str, bytes]: The translated user message, the translated bot reply and its WAV audio.
+    """
+    to_user_language = get_bhashini("en", sourceLanguage)
+
+    async def translate_question():
+        with tracing.span("question_nmt", chars_in=len(user_content)):
+            return await to_user_language.translate(user_content)
+
+    if user_translation is None:
+        user_translation, (bot_translation, bot_audio) = await asyncio.gather(
+            translate_question(), translate_and_speak(bot_content)
+        )
+    else:
+        bot_translation, bot_audio = await translate_and_speak(bot_content)
+    return user_translation, bot_translation, bot_audio
+
+async def translate_user_message(user_question, original_question=None):
+    """
+    Get the user's message in their own language, translating it back from English when they didn't type it.
+    """
+    if original_question is not None:
+        return original_question
+    with tracing.span("question_nmt", chars_in=len(user_question)):
+        return await get_bhashini("en", sourceLanguage).translate(user_question)
+
+async def translate_and_speak(sentence):
+    """
+    Translate one English sentence to the user's language and synthesize it.
+
+    Returns:
+        Tuple[str, bytes]: The translated sentence and its WAV audio.
+    """
+    with tracing.span("output_nmt", chars_in=len(sentence)) as stage, countLookups() as lookups:
+        translated_sentence = await get_bhashini("en", sourceLanguage).translate(sentence)
+        stage.set(chars_out=len(translated_sentence), result_cache_hit=lookups["hits"] > 0)
+    with tracing.span("tts", chars_in=len(translated_sentence)) as stage, countLookups() as lookups:
+        audio = base64.b64decode(await get_bhashini(sourceLanguage, targetLanguage).tts(translated_sentence))
+        stage.set(audio_bytes=len(audio), result_cache_hit=lookups["hits"] > 0)
+    return translated_sentence, audio
+
+def message_html(template, text):
+    """
+    Fill a chat message template, keeping the line breaks of the text (HTML would collapse them into spaces).
+    """
+    return template.replace("{{MSG}}", text.replace("\n", "<br>"))
+
+def stream_response(user_question, user_translation):
+    """
+    Stream the answer of the conversation chain, translating and voicing each sentence as soon as it is complete.
+
+    The translated text grows in place and an audio clip is shown per sentence while the LLM is still generating.
+
+    Args:
+        user_question (str): The question sent to the conversation chain.
+        user_translation (concurrent.futures.Future): The user message translated to their language.
+
+    Returns:
+        Tuple[dict, str, str, bytes]: The chain output, the translated user message, the translated answer and its joined WAV audio.
+    """
+    user_placeholder = st.empty()
+    bot_placeholder = st.empty()
+    user_text = None
+    translated_segments = []
+    audio_segments = []
+
+    stream = ChainStream(st.session_state.conversation, {'question': user_question}, callbacks=[tracing.TracingCallbackHandler()])
+    sentences = split_sentences(stream)
+    segments = pipeline_segments(sentences, lambda sentence: runAsync(translate_and_speak(sentence[0])))
+    for (_, separator), (translated_sentence, audio) in segments:
+        if user_text is None:
+            user_text = user_translation.result()
+            user_placeholder.write(user_template.replace("{{MSG}}", user_text), unsafe_allow_html=True)
+        # Sentences are rejoined with the separator the LLM put after them, so lists and paragraphs keep their line breaks.
+        translated_segments.append(translated_sentence + separator)
+        audio_segments.append(audio)
+        bot_placeholder.write(message_html(bot_template, "".join(translated_segments)), unsafe_allow_html=True)
+        st.audio(audio, format="audio/wav")
+
+    if not translated_segments and stream.result['answer']:
+        # The answer came from the answer cache or the LLM didn't stream; reuse or make the full translation at once.
+        cached = stream.result.get('cached_answer')
+        translation = cached.get_translation((sourceLanguage, targetLanguage)) if cached is not None else None
+        translated_sentence, audio = translation or runSync(translate_and_speak(stream.result['answer']))
+        translated_segments.append(translated_sentence)
+        audio_segments.append(audio)
+        bot_placeholder.write(message_html(bot_template, translated_sentence), unsafe_allow_html=True)
+        st.audio(audio, format="audio/wav")
+    if user_text is None:
+        user_text = user_translation.result()
+        user_placeholder.write(user_template.replace("{{MSG}}", user_text), unsafe_allow_html=True)
+    bot_audio = join_wav(audio_segments) if audio_segments else None
+    return stream.result, user_text, "".join(translated_segments), bot_audio
+
+def render_message(message_data):
+    """
+    Display one already translated message, with its audio for bot replies.
+
+    Args:
+        message_data (dict): A message from st.session_state.messages.
+    """
+    if message_data['role'] == 'user':
+        st.write(user_template.replace("{{MSG}}", message_data['text']), unsafe_allow_html=True)
+    else:
+        st.write(message_html(bot_template, message_data['text']), unsafe_allow_html=True)
+        if message_data['audio']:
+            st.audio(message_data['audio'], format="audio/wav")
+
+def translate_input(user_question=None, audio_bytes=None):
+    """
+    Get the user's question in English, from their typed text or their voice recording.
+
+    Args:
+        user_question (str, optional): The question as the user typed it in their own language.
+        audio_bytes (bytes, optional): The WAV recording of the question, used when no text is given.
+
+    Returns:
+        Tuple[str, str]: The question in English, and the question as the user typed it (None for a recording).
+    """
+    if user_question:
+        with tracing.span("input_nmt", chars_in=len(user_question)) as stage:
+            question = runSync(get_bhashini(sourceLanguage, "en").translate(user_question))
+            stage.set(chars_out=len(question))
+        return question, user_question
+    audio_base64_string = base64.b64encode(audio_bytes).decode('utf-8')
+    with tracing.span("asr_nmt", audio_bytes=len(audio_bytes)) as stage:
+        question = runSync(get_bhashini(sourceLanguage, targetLanguage).asr_nmt(audio_base64_string))
+        stage.set(chars_out=len(question))
+    return question, None
+
+def answer_question(conversation, user_question, original_question=None):
+    """
+    Answer a question with the conversation chain and translate the turn back to the user's language, without streaming.
+
+    Args:
+        conversation (Chain): The session's conversation chain.
+        user_question (str): The user's question translated to English.
+        original_question (str, optional): The question as the user typed it in their own language.
+
+    Returns:
+        Tuple[dict, str, str, bytes]: The chain output, the translated user message, the translated answer and its WAV audio.
+    """
+    response = conversation.invoke({'question': user_question}, config={"callbacks": [tracing.TracingCallbackHandler()]})
+    cached = response.get('cached_answer')
+    translation = cached.get_translation((sourceLanguage, targetLanguage)) if cached is not None else None
+    if translation is None:
+        user_text, bot_text, bot_audio = runSync(translate_turn(user_question, response['answer'], original_question))
+    else:
+        user_text = runSync(translate_user_message(user_question, original_question))
+        bot_text, bot_audio = translation
+    return response, user_text, bot_text, bot_audio
+
+def finish_turn(response, bot_text, bot_audio):
+    """
+    Record a finished turn on its tracing span, and keep the answer's translation and audio for later answer cache hits.
+    """
+    # Recorded on the turn span instead of printed (see tracing.py for the JSONL export and metrics endpoint).
+    tracing.set_attributes(
+        documents=len(response['source_documents']),
+        generated_question_chars=len(response['generated_question']),
+        answer_chars=len(response['answer']),
+    )
+    cached = response.get('cached_answer')
+    if cached is not None and bot_audio is not None:
+        cached.set_translation((sourceLanguage, targetLanguage), bot_text, bot_audio)
+
+def answer_turn(conversation, user_question=None, audio_bytes=None):
+    """
+    Run one whole chat turn without the Streamlit UI: the same translation, chain, translation back and TTS as a sent message.
+
+    Lets load tests and scripts drive sessions headlessly; answers are not streamed.
+
+    Args:
+        conversation (Chain): The session's conversation chain, from get_conversation_chain().
+        user_question (str, optional): The question as the user typed it in their own language.
+        audio_bytes (bytes, optional): The WAV recording of the question, used when no text is given.
+
+    Returns:
+        Tuple[dict, str, str, bytes]: The chain output, the translated user message, the translated answer and its WAV audio.
+    """
+    with tracing.span("turn", mode="text" if user_question else "voice"):
+        question, original_question = translate_input(user_question, audio_bytes)
+        response, user_text, bot_text, bot_audio = answer_question(conversation, question, original_question)
+        finish_turn(response, bot_text, bot_audio)
+    return response, user_text, bot_text, bot_audio
+
+def handle_userinput(user_question, original_question=None):
     """
     Process user input, generate a response, update the chat history, and display results on the Streamlit application.
 
     This function retrieves Chatbot responses, translates messages, and generates text-to-speech output for the bot's responses.
+    Only the new turn is translated, synthesized and rendered; earlier messages are kept in st.session_state.messages.
 
     Args:
         user_question (str): The user's input question translated to English.
+        original_question (str, optional): The question as the user typed it in their own language.
     """
-    bhashini = Bhashini("en", sourceLanguage)
-    processed_question = f"Be revelant. If the context provided isn't neccessary, don't add it to your response. However, make your response accurate and complete by only using information from the provided context. Use addresses. Use bullet points for lengthy responses.  User: {user_question}"
-
-    response = st.session_state.conversation({'question': processed_question})
+    if STREAM_RESPONSES:
+        user_translation = runAsync(translate_user_message(user_question, original_question))
+        response, user_text, bot_text, bot_audio = stream_response(user_question, user_translation)
+    else:
+        response, user_text, bot_text, bot_audio = answer_question(
+            st.session_state.conversation, user_question, original_question
+        )
     st.session_state.chat_history = response['chat_history']
-    chat_history = response['chat_history']
-
-    print("Retrieved Documents:")
-    for i, doc in enumerate(response['source_documents']):
-        print(f"Document {i+1}:")
-        print(f"Content: {doc.page_content}")
-        print(f"Metadata: {doc.metadata}")
-        print("---------")
-
-    print(f"Generated Question: {response['generated_question']}")
-    translated_new_messages = []
-
-    for index, message in enumerate(chat_history):
-        message_id = str(index)
-        if message_id not in st.session_state.translated_messages_record:
-            st.session_state.translated_messages_record.add(message_id)
-            if hasattr(message, 'content'):
-                if index % 2 == 0:
-                    st.write("Receiving message with original prompt, will cut for translation: ", message)
-                    user_question_content = getattr(message, 'content').split("User: ")[1]
-                    translated_message_content = bhashini.translate(user_question_content)
-                    st.write("User message, no need for audio: ", user_question_content)
-                    base64_aud = ""
-                else:
-                    bot_question_content = getattr(message, 'content')
-                    translated_message_content = bhashini.translate(bot_question_content)
-                    st.write("Bot response, generating audio: ", bot_question_content)
-                    bhashini2 = Bhashini(sourceLanguage, targetLanguage)
-                    base64_aud = bhashini2.tts(translated_message_content)
-
-                translated_new_messages.append({
-                    'text': translated_message_content,
-                    'audio': base64_aud
-                })
-
-    st.session_state.translated_chat_history.extend(translated_new_messages)
-    for i, message_data in enumerate(st.session_state.translated_chat_history):
-        translated_message = message_data['text']
-        base64_aud = message_data['audio']
-
-        if i % 2 == 0:
-            st.write(user_template.replace("{{MSG}}", translated_message), unsafe_allow_html=True)
-        else:
-            st.write(bot_template.replace("{{MSG}}", translated_message), unsafe_allow_html=True)
-            st.audio(base64.b64decode(base64_aud), format="audio/wav")
-            
+    finish_turn(response, bot_text, bot_audio)
+
+    # Only the new turn is appended; earlier messages are already stored translated.
+    new_messages = [
+        {'role': 'user', 'text': user_text, 'audio': None},
+        {'role': 'bot', 'text': bot_text, 'audio': bot_audio},
+    ]
+    for message_data in new_messages:
+        st.session_state.messages.append(message_data)
+        if not STREAM_RESPONSES:
+            render_message(message_data)
+
 def main():
     """
     Main function that runs the Streamlit application.
@@ -276,6 +554,12 @@ def main():
     This function initializes the Streamlit interface, loads the database, and handles user queries and interactions.
     """
     load_dotenv()
+    tracing.setup()
+    # Loads the embedding model and the shared retriever in the background, once per server process.
+    resources.warm_up(
+        lambda: get_embedding_function().embed_query("warm up"),
+        get_shared_retriever,
+    )
     st.set_page_config(page_title="ChauwkBot", page_icon=":books:")
     st.write(css, unsafe_allow_html=True)
 
@@ -283,10 +567,8 @@ def main():
         st.session_state.conversation = None
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = None
-    if "translated_chat_history" not in st.session_state:
-        st.session_state.translated_chat_history = []
-    if "translated_messages_record" not in st.session_state:
-        st.session_state.translated_messages_record = set()
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
 
     st.header("Chauwk Bot")
     user_question = st.text_input("Ask away!")
@@ -297,18 +579,18 @@ def main():
     with send_button_column:
         send_button = st.button("Send", key="send_button")
 
+    # Earlier turns are rendered from stored text and audio bytes, without translating or decoding anything.
+    for message_data in st.session_state.messages:
+        render_message(message_data)
+
     if send_button:
         if user_question:
-            bhashini = Bhashini(sourceLanguage, "en")
-            user_question = bhashini.translate(user_question)
-            handle_userinput(user_question)
+            with tracing.span("turn", mode="text"):
+                handle_userinput(*translate_input(user_question=user_question))
             user_question = None
         elif voice_recording:
-            audio_base64_string = base64.b64encode(voice_recording['bytes']).decode('utf-8')
-            bhashini = Bhashini(sourceLanguage, targetLanguage)
-            text = bhashini.asr_nmt(audio_base64_string)
-            user_question = text
-            handle_userinput(user_question)
+            with tracing.span("turn", mode="voice"):
+                handle_userinput(*translate_input(audio_bytes=voice_recording['bytes']))
             voice_recording = None
 
     if not user_question:
@@ -318,10 +600,12 @@ def main():
     with st.sidebar:
         if st.button("Load Database"):
             with st.spinner("Loading"):
-                vectorstore, chunks = get_vectorstore()
-                retriever = get_improved_retriever(vectorstore, chunks)
-                st.session_state.conversation = get_conversation_chain(retriever)
-                st.write("✅ Loaded the database")
+                retriever = get_shared_retriever()
+                if retriever is None:
+                    st.error("No saved chunks found. Please run populate_database.py first.")
+                else:
+                    st.session_state.conversation = get_conversation_chain(retriever, streaming=STREAM_RESPONSES)
+                    st.write("✅ Loaded the database")
 
 if __name__ == '__main__':
     main()
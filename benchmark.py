@@ -0,0 +1,315 @@
+import argparse
+import importlib.util
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from bhashini_translator import runSync
+from benchmark_rerankers import is_relevant
+import app
+import populate_database
+import resources
+import stubs
+import tracing
+
+# Synthetic corpus: one directory PDF per centre type, with the columns of the real ones.
+CENTRE_TYPES = {
+    "Model_Career_Centres.pdf": "Model Career Centre",
+    "Jan_Shikshan_Sansthan.pdf": "Jan Shikshan Sansthan",
+    "Industrial_Training_Institutes.pdf": "Industrial Training Institute",
+    "Employment_Exchanges.pdf": "Employment Exchange",
+}
+DISTRICTS = {
+    "Assam": ("Kamrup Metro", "Dibrugarh", "Jorhat", "Cachar"),
+    "Bihar": ("Patna", "Gaya", "Muzaffarpur", "Bhagalpur"),
+    "Karnataka": ("Bengaluru Urban", "Mysuru", "Belagavi", "Kalaburagi"),
+    "Maharashtra": ("Pune", "Nagpur", "Nashik", "Aurangabad"),
+    "Odisha": ("Khordha", "Cuttack", "Ganjam", "Sambalpur"),
+    "Rajasthan": ("Jaipur", "Jodhpur", "Udaipur", "Kota"),
+    "Tamil Nadu": ("Chennai", "Madurai", "Coimbatore", "Tiruchirappalli"),
+    "West Bengal": ("Kolkata", "Howrah", "Darjeeling", "Nadia"),
+}
+COLUMNS = ["S.No", "Name", "Type", "State", "District", "Address", "Pin Code", "Contact"]
+STREETS = ("Station Road", "MG Road", "College Road", "Court Road", "Civil Lines", "Industrial Area", "Bazar Road")
+
+# Rows per page of the synthetic tables; continued pages have no header row, like the OCR'd tables.
+ROWS_PER_PAGE = 25
+
+
+def synthetic_corpus(rows, seed=0):
+    """
+    Write the parsed artifacts of a synthetic directory of career centres, as populate_database.py would after OCR.
+
+    Args:
+        rows (int): Number of directory entries, spread over the centre types.
+        seed (int): Seed of the generated values.
+
+    Returns:
+        List[dict]: The entries, with their name, type, state, district and PIN.
+    """
+    generator = random.Random(seed)
+    places = [(state, district) for state, districts in DISTRICTS.items() for district in districts]
+    pins = {place: f"{generator.randint(1, 9)}{generator.randint(10, 99)}{generator.randint(0, 999):03d}" for place in places}
+    entries = []
+    for file_index, (filename, centre_type) in enumerate(CENTRE_TYPES.items()):
+        count = rows // len(CENTRE_TYPES) + (file_index < rows % len(CENTRE_TYPES))
+        file_entries = []
+        for number in range(1, count + 1):
+            state, district = generator.choice(places)
+            file_entries.append({
+                "name": f"{district} {centre_type} {number}",
+                "type": centre_type,
+                "state": state,
+                "district": district,
+                "pin": pins[(state, district)],
+                "address": f"{generator.randint(1, 400)}, {generator.choice(STREETS)}, {district}",
+                "contact": f"9{generator.randint(100000000, 999999999)}",
+            })
+        tables = []
+        for first in range(0, len(file_entries), ROWS_PER_PAGE):
+            table_rows = [COLUMNS] if first == 0 else []
+            for serial, entry in enumerate(file_entries[first:first + ROWS_PER_PAGE], start=first + 1):
+                table_rows.append([
+                    str(serial), entry["name"], entry["type"], entry["state"], entry["district"], entry["address"],
+                    entry["pin"], entry["contact"],
+                ])
+            tables.append((first // ROWS_PER_PAGE, pd.DataFrame(table_rows)))
+        populate_database.write_artifact(filename, populate_database.table_rows(filename, tables))
+        entries.extend(file_entries)
+    return entries
+
+
+def labelled_questions(entries, count, seed=0):
+    """
+    Generate questions with the entries that answer them, in the query file format of benchmark_rerankers.py.
+
+    Returns:
+        List[dict]: Questions with their "query" and "relevant_text" (the names of the answering entries).
+    """
+    generator = random.Random(seed)
+    by_place = {}
+    by_pin = {}
+    for entry in entries:
+        by_place.setdefault((entry["type"], entry["district"], entry["state"]), []).append(entry["name"])
+        by_pin.setdefault((entry["type"], entry["pin"]), []).append(entry["name"])
+
+    questions = []
+    for index in range(count):
+        entry = generator.choice(entries)
+        kind = index % 4
+        if kind == 0:
+            questions.append({"query": f"What is the address of {entry['name']}?", "relevant_text": [entry["name"]]})
+        elif kind == 1:
+            questions.append({
+                "query": f"How can I contact the {entry['type']} in {entry['district']}, {entry['state']}?",
+                "relevant_text": by_place[(entry["type"], entry["district"], entry["state"])],
+            })
+        elif kind == 2:
+            questions.append({
+                "query": f"Is there a {entry['type']} near PIN code {entry['pin']}?",
+                "relevant_text": by_pin[(entry["type"], entry["pin"])],
+            })
+        else:
+            # Listing questions, answered from the directory by the app.
+            questions.append({
+                "query": f"List every {entry['type']} in {entry['district']}, {entry['state']} with addresses",
+                "relevant_text": by_place[(entry["type"], entry["district"], entry["state"])],
+            })
+    return questions
+
+
+def retrieval_quality(item, documents, k):
+    """
+    Returns:
+        Tuple[float, float]: The fraction of the question's relevant texts (at most k) found in the top k documents, and the reciprocal rank
+        of the first relevant document (0 when none is).
+    """
+    top = documents[:k]
+    relevant_ids = item.get("relevant_ids", [])
+    relevant_texts = item.get("relevant_text", [])
+    found = sum(any(document.metadata.get("id") == chunk_id for document in top) for chunk_id in relevant_ids)
+    found += sum(any(text.lower() in document.page_content.lower() for document in top) for text in relevant_texts)
+    labels = len(relevant_ids) + len(relevant_texts)
+    # A question with more relevant texts than k can't find them all in the top k.
+    recall = found / min(labels, k) if labels else 0.0
+    reciprocal_rank = next((1 / rank for rank, document in enumerate(documents, start=1) if is_relevant(item, document)), 0.0)
+    return recall, reciprocal_rank
+
+
+def percentiles(seconds):
+    milliseconds = np.asarray(seconds, dtype=np.float64) * 1000
+    return {
+        "p50_ms": float(np.percentile(milliseconds, 50)),
+        "p95_ms": float(np.percentile(milliseconds, 95)),
+        "p99_ms": float(np.percentile(milliseconds, 99)),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if os.uname().sysname == "Darwin" else 1)
+
+
+def run_ingest(embeddings):
+    start = time.perf_counter()
+    documents = populate_database.load_parsed_documents()
+    chunks = populate_database.ingest(documents, embeddings=embeddings)
+    elapsed = time.perf_counter() - start
+    result = {"documents": len(documents), "chunks": chunks, "seconds": elapsed}
+    if documents:
+        result["documents_per_second"] = len(documents) / elapsed
+    return result
+
+
+def format_ingest(phase, ingest):
+    """
+    Describe one ingest run: its throughput, or only its elapsed time when there was nothing to ingest.
+    """
+    if not ingest["documents"]:
+        return f"{phase}: no new or changed documents, {ingest['chunks']} chunks up to date in {ingest['seconds']:.2f}s"
+    return (
+        f"{phase}: {ingest['documents']} documents, {ingest['chunks']} chunks in {ingest['seconds']:.2f}s "
+        f"({ingest['documents_per_second']:.0f} documents/s)"
+    )
+
+
+def model_available():
+    """
+    Check whether the real embedding model can be loaded, i.e. its packages are installed.
+    """
+    return all(importlib.util.find_spec(name) is not None for name in ("langchain_huggingface", "sentence_transformers"))
+
+
+def main():
+    """
+    Benchmark ingestion and the app's query path offline, against a synthetic career-centre corpus.
+
+    Every remote service is replaced by the deterministic stubs in stubs.py (with configurable injected latency), so runs
+    cost no API quota and are comparable over time. Reports ingest throughput (cold) and time (unchanged re-run), retrieval recall@k
+    and MRR on labelled questions, latency percentiles of retrieval and of whole turns (NMT, chain, NMT and TTS of the answer),
+    the per-stage spans recorded by tracing.py, and peak memory.
+
+    Documents are embedded with the real model when it is installed, since recall and MRR from the stub hashing embeddings
+    only reflect lexical overlap; the retrieval line always says which embeddings (and the stub reranker) produced it.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000, help="Directory entries in the synthetic corpus.")
+    parser.add_argument("--questions", help="JSONL file of labelled questions (see benchmark_rerankers.py); generated when unset.")
+    parser.add_argument("--queries", type=int, default=100, help="Number of generated questions.")
+    parser.add_argument("--k", type=int, default=5, help="Cutoff of recall@k.")
+    parser.add_argument("--embeddings", choices=("hashing", "model"),
+                        help="Stub hashing embeddings, or the real embedding model (loaded locally; the default when installed).")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds before the first token of every LLM call.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between LLM tokens.")
+    parser.add_argument("--reranker-latency", type=float, default=0.0, help="Seconds per rerank call.")
+    parser.add_argument("--bhashini-latency", type=float, default=0.0, help="Seconds per Bhashini request.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Directory to create the benchmark's data stores in (a temporary directory by default).")
+    parser.add_argument("--keep", action="store_true", help="Keep the data stores and traces.jsonl after the run.")
+    parser.add_argument("--output", help="Also write the report as JSON to this file, e.g. to compare runs.")
+    args = parser.parse_args()
+    if args.embeddings is None:
+        args.embeddings = "model" if model_available() else "hashing"
+
+    questions = None
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [json.loads(line) for line in f if line.strip()]
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="chauwk-benchmark-", dir=args.workdir)
+    cwd = os.getcwd()
+    # Every store lives at a path relative to the working directory.
+    os.chdir(workdir)
+    try:
+        report = run(args, questions)
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.keep:
+        print(f"\nData stores and traces kept in {workdir}")
+
+
+def run(args, questions):
+    stubs.install(
+        llm_latency=args.llm_latency, token_latency=args.token_latency, reranker_latency=args.reranker_latency,
+        bhashini_latency=args.bhashini_latency, embeddings=args.embeddings == "hashing", seed=args.seed,
+    )
+    recorder = tracing.Recorder("traces.jsonl" if args.keep else None)
+    tracing.set_recorder(recorder)
+    report = {"rows": args.rows, "embeddings": args.embeddings}
+
+    entries = synthetic_corpus(args.rows, args.seed)
+    embeddings = resources.get_embedding_function() if args.embeddings == "hashing" else None
+    report["ingest_cold"] = run_ingest(embeddings)
+    report["ingest_unchanged"] = run_ingest(embeddings)
+    report["peak_rss_after_ingest_mb"] = peak_rss_mb()
+
+    if questions is None:
+        questions = labelled_questions(entries, args.queries, args.seed)
+    retriever = app.get_shared_retriever()
+    latencies = []
+    recalls = []
+    reciprocal_ranks = []
+    for item in questions:
+        start = time.perf_counter()
+        with tracing.span("query"):
+            documents = retriever.invoke(item["query"], config={"callbacks": [tracing.TracingCallbackHandler()]})
+        latencies.append(time.perf_counter() - start)
+        recall, reciprocal_rank = retrieval_quality(item, documents, args.k)
+        recalls.append(recall)
+        reciprocal_ranks.append(reciprocal_rank)
+    report["retrieval"] = {
+        # The reranker is always the lexical stub, so the scores only compare runs with each other.
+        "embeddings": args.embeddings,
+        "reranker": "stub",
+        "queries": len(questions),
+        f"recall@{args.k}": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        **percentiles(latencies),
+    }
+
+    # Whole turns as in handle_userinput, with the answer cache cleared so every turn takes the uncached path.
+    chain = app.get_conversation_chain(retriever)
+    answer_cache = app.get_answer_cache()
+    latencies = []
+    for item in questions:
+        answer_cache.clear()
+        start = time.perf_counter()
+        with tracing.span("turn", mode="text"):
+            with tracing.span("input_nmt"):
+                question = runSync(app.get_bhashini(app.sourceLanguage, "en").translate(item["query"]))
+            response = chain.invoke({"question": question}, config={"callbacks": [tracing.TracingCallbackHandler()]})
+            runSync(app.translate_turn(question, response["answer"], item["query"]))
+        latencies.append(time.perf_counter() - start)
+    report["turns"] = {"turns": len(questions), **percentiles(latencies)}
+    report["stages"] = recorder.summary()
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    for phase in ("ingest_cold", "ingest_unchanged"):
+        print(format_ingest(phase, report[phase]))
+    retrieval = report["retrieval"]
+    if args.embeddings == "hashing":
+        print("note: recall and MRR come from stub hashing embeddings (word overlap only); use --embeddings model for real quality numbers")
+    print(
+        f"retrieval ({args.embeddings} embeddings, stub reranker): recall@{args.k}={retrieval[f'recall@{args.k}']:.3f} MRR={retrieval['mrr']:.3f} "
+        f"p50={retrieval['p50_ms']:.1f}ms p95={retrieval['p95_ms']:.1f}ms p99={retrieval['p99_ms']:.1f}ms"
+    )
+    turns = report["turns"]
+    print(f"turns: p50={turns['p50_ms']:.1f}ms p95={turns['p95_ms']:.1f}ms p99={turns['p99_ms']:.1f}ms")
+    print(f"peak RSS: {report['peak_rss_after_ingest_mb']:.0f} MB after ingest, {report['peak_rss_mb']:.0f} MB overall\n")
+    tracing.print_summary(report["stages"])
+    return report
+
+
+if __name__ == "__main__":
+    main()
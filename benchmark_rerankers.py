@@ -0,0 +1,133 @@
+import argparse
+import json
+import time
+import numpy as np
+from dotenv import load_dotenv
+from bm25_index import BM25IndexRetriever
+from hybrid_retriever import HybridRetriever
+from rerankers import BACKENDS, CrossEncoderReranker, get_reranker
+import resources
+
+# Stored at local paths, as in app.py.
+CHROMA_PATH = "chroma"
+CHUNKS_PATH = "chunk_store"
+BM25_PATH = "bm25_index"
+
+# Cutoff applied by RelevanceScoreFilter in app.py.
+RELEVANCE_THRESHOLD = 0.76
+
+
+def main():
+    """
+    Compare reranker backends on a labelled query set.
+
+    Each line of the query file is a JSON object with a "query" and the chunks that answer it, as "relevant_ids"
+    and/or "relevant_text" (substrings that only the relevant chunks contain). Candidates come from the same hybrid retriever as the app,
+    so every backend reranks identical lists. For the cross-encoder, the Platt scaling that maps its logits to relevance probabilities
+    is fit on the labels and printed as RERANKER_SCALE / RERANKER_BIAS.
+    """
+    load_dotenv()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("queries", help="JSONL file of labelled queries.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--top-n", type=int, default=5, help="Documents kept by the reranker.")
+    parser.add_argument("--candidates", type=int, default=8, help="Candidates taken from each of the vector and keyword searches.")
+    args = parser.parse_args()
+
+    with open(args.queries, encoding="utf-8") as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+
+    retriever = HybridRetriever(
+        vectorstore=resources.get_chroma(CHROMA_PATH),
+        keyword_retriever=BM25IndexRetriever(
+            index=resources.get_bm25_index(BM25_PATH), chunk_store=resources.get_chunk_store(CHUNKS_PATH), k=args.candidates
+        ),
+        k=args.candidates,
+    )
+    candidates = [retriever.invoke(item["query"]) for item in labelled]
+
+    for backend in args.backends:
+        reranker = get_reranker(backend, top_n=args.top_n)
+        report = evaluate(reranker, labelled, candidates)
+        print(f"\n{backend}")
+        for name, value in report.items():
+            print(f"  {name}: {value:.3f}")
+
+        if isinstance(reranker, CrossEncoderReranker):
+            scale, bias = fit_platt(reranker, labelled, candidates)
+            print(f"  fitted calibration: RERANKER_SCALE={scale:.4f} RERANKER_BIAS={bias:.4f}")
+
+
+def is_relevant(item, document):
+    if document.metadata.get("id") in item.get("relevant_ids", []):
+        return True
+    content = document.page_content.lower()
+    return any(text.lower() in content for text in item.get("relevant_text", []))
+
+
+def evaluate(reranker, labelled, candidates):
+    """
+    Rerank every query's candidates and measure quality and latency.
+
+    Returns:
+        dict: Latency percentiles in milliseconds, recall@top_n (of the relevant candidates), MRR,
+        and the fraction of relevant / irrelevant kept documents passing RELEVANCE_THRESHOLD.
+    """
+    latencies = []
+    recalls = []
+    reciprocal_ranks = []
+    kept_relevant = []
+    kept_irrelevant = []
+    for item, documents in zip(labelled, candidates):
+        start = time.perf_counter()
+        reranked = reranker.compress_documents(documents, item["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        relevant_candidates = sum(is_relevant(item, document) for document in documents)
+        labels = [is_relevant(item, document) for document in reranked]
+        if relevant_candidates:
+            recalls.append(sum(labels) / min(relevant_candidates, len(reranked) or 1))
+        reciprocal_ranks.append(next((1 / rank for rank, label in enumerate(labels, start=1) if label), 0.0))
+        for document, label in zip(reranked, labels):
+            passed = document.metadata.get("relevance_score", 0.0) >= RELEVANCE_THRESHOLD
+            (kept_relevant if label else kept_irrelevant).append(passed)
+
+    return {
+        "latency p50 (ms)": float(np.percentile(latencies, 50)),
+        "latency p95 (ms)": float(np.percentile(latencies, 95)),
+        "recall@top_n": float(np.mean(recalls)) if recalls else 0.0,
+        "MRR": float(np.mean(reciprocal_ranks)),
+        "relevant passing filter": float(np.mean(kept_relevant)) if kept_relevant else 0.0,
+        "irrelevant passing filter": float(np.mean(kept_irrelevant)) if kept_irrelevant else 0.0,
+    }
+
+
+def fit_platt(reranker, labelled, candidates, iterations=50):
+    """
+    Fit sigmoid(scale * logit + bias) to the relevance labels of every candidate with Newton's method.
+
+    Returns:
+        Tuple[float, float]: The fitted scale and bias.
+    """
+    logits = []
+    labels = []
+    for item, documents in zip(labelled, candidates):
+        logits.extend(reranker.logits(item["query"], documents))
+        labels.extend(is_relevant(item, document) for document in documents)
+    x = np.column_stack([np.asarray(logits, dtype=np.float64), np.ones(len(logits))])
+    y = np.asarray(labels, dtype=np.float64)
+    weights = np.array([1.0, 0.0])
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-x @ weights))
+        # A small ridge penalty keeps the fit finite when the labels are perfectly separable.
+        gradient = x.T @ (p - y) + 1e-2 * weights
+        hessian = x.T @ (x * (p * (1 - p))[:, None]) + 1e-2 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return float(weights[0]), float(weights[1])
+
+
+if __name__ == "__main__":
+    main()
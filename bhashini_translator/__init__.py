@@ -1,4 +1,24 @@
 from .bhashini_translator import Bhashini
 from .config import ulcaEndPoint
+from .exceptions import (
+    BhashiniAuthError,
+    BhashiniConnectionError,
+    BhashiniError,
+    BhashiniHTTPError,
+    BhashiniRateLimitError,
+    BhashiniResponseError,
+    BhashiniServerError,
+    BhashiniTimeoutError,
+)
 from .payloads import Payloads
-from .pipeline_config import PipelineConfig
\ No newline at end of file
+from .pipeline_config import PipelineConfig, PipelineConfigCache, pipelineConfigCache
+from .transport import RetryPolicy, Transport, getTransport, setTransport
+from .async_bhashini import (
+    AsyncBhashini,
+    AsyncTransport,
+    getAsyncTransport,
+    runAsync,
+    runSync,
+    setAsyncTransport,
+)
+from .result_cache import ResultCache, countLookups, resultCache
\ No newline at end of file
@@ -0,0 +1,348 @@
+import asyncio
+import contextvars
+import copy
+import threading
+import weakref
+import httpx
+from bhashini_translator import config
+from bhashini_translator.bhashini_translator import Bhashini
+from bhashini_translator.exceptions import (
+    BhashiniAuthError,
+    BhashiniConnectionError,
+    BhashiniResponseError,
+    BhashiniTimeoutError,
+)
+from bhashini_translator.payloads import splitBatches
+from bhashini_translator.transport import RetryPolicy, errorForStatus
+
+# Pipeline configs resolved for the payload currently being built, per asyncio task.
+_resolvedConfigs = contextvars.ContextVar("resolvedConfigs", default=None)
+
+
+class AsyncTransport:
+    """
+    asyncio counterpart of Transport, backed by a pooled httpx.AsyncClient.
+
+    An httpx.AsyncClient is bound to the event loop it was created on, so use
+    getAsyncTransport() to get the instance for the running loop.
+    """
+
+    def __init__(
+        self,
+        connectTimeout: float = config.connectTimeout,
+        readTimeout: float = config.readTimeout,
+        poolSize: int = config.poolSize,
+        retryPolicy: RetryPolicy = None,
+    ) -> None:
+        self.retryPolicy = retryPolicy or RetryPolicy()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(readTimeout, connect=connectTimeout),
+            limits=httpx.Limits(
+                max_connections=poolSize, max_keepalive_connections=poolSize
+            ),
+        )
+
+    async def postJson(self, url: str, data: str, headers: dict) -> dict:
+        attempt = 0
+        while True:
+            retryAfter = None
+            try:
+                response = await self.client.post(url, content=data, headers=headers)
+            except (httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                error = BhashiniConnectionError(f"Timed out connecting to {url}: {e}")
+            except httpx.TimeoutException as e:
+                error = BhashiniTimeoutError(f"Timed out calling {url}: {e}")
+            except httpx.TransportError as e:
+                error = BhashiniConnectionError(f"Could not reach {url}: {e}")
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise BhashiniResponseError(f"{url} returned invalid JSON")
+                error = errorForStatus(response.status_code, url, response.text)
+                retryAfter = response.headers.get("Retry-After")
+
+            if not self.retryPolicy.shouldRetry(error, attempt):
+                raise error
+            await asyncio.sleep(self.retryPolicy.delay(attempt, retryAfter))
+            attempt += 1
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_asyncTransports = weakref.WeakKeyDictionary()
+_asyncTransportOverride = None
+# In-flight getModelsPipeline fetches per loop, so concurrent misses share one request.
+_pendingConfigs = weakref.WeakKeyDictionary()
+
+
+def getAsyncTransport() -> AsyncTransport:
+    """Return the shared AsyncTransport of the running event loop."""
+    if _asyncTransportOverride is not None:
+        return _asyncTransportOverride
+    loop = asyncio.get_running_loop()
+    transport = _asyncTransports.get(loop)
+    if transport is None:
+        transport = _asyncTransports[loop] = AsyncTransport()
+    return transport
+
+
+def setAsyncTransport(transport) -> None:
+    """
+    Use one transport on every event loop, e.g. a stub of the ULCA endpoints.
+
+    Pass None to go back to the per-loop httpx transports.
+    """
+    global _asyncTransportOverride
+    _asyncTransportOverride = transport
+
+
+class AsyncBhashini(Bhashini):
+    """
+    asyncio-native Bhashini client with the same translate/tts/asr surface.
+
+    Every method is a coroutine, so independent calls can be overlapped with
+    asyncio.gather. Pipeline configs come from the same process-wide cache as
+    the blocking client. The constructor takes the same arguments as Bhashini,
+    with transport an AsyncTransport (the running loop's shared one when None).
+
+    The instance holds no per-call state: each request gets the pipeline data
+    (inference endpoint and key) it was built with, so one client can be
+    shared by concurrent calls.
+    """
+
+    def __init__(
+        self, sourceLanguage=None, targetLanguage=None, transport=None, gender="female"
+    ) -> None:
+        super().__init__(sourceLanguage, targetLanguage, gender=gender)
+        self.asyncTransport = transport
+
+    def getAsyncTransport(self) -> AsyncTransport:
+        return self.asyncTransport or getAsyncTransport()
+
+    async def fetchPipeLineConfig(self, taskType):
+        cacheKey = self.getConfigCacheKey(taskType)
+        cached = self.configCache.get(cacheKey)
+        if cached is not None:
+            return cached
+
+        pending = _pendingConfigs.setdefault(asyncio.get_running_loop(), {})
+        if cacheKey not in pending:
+            pending[cacheKey] = asyncio.ensure_future(self.requestPipeLineConfig(taskType))
+            pending[cacheKey].add_done_callback(lambda _: pending.pop(cacheKey, None))
+        taskTypeConfig, pipeLineData = await asyncio.shield(pending[cacheKey])
+        return copy.deepcopy(taskTypeConfig), pipeLineData
+
+    async def requestPipeLineConfig(self, taskType):
+        taskTypeConfig = self.getTaskTypeConfig(taskType)
+        payload, headers = self.getPipeLineConfigRequest(taskTypeConfig)
+        pipeLineData = await self.getAsyncTransport().postJson(
+            self.ulcaEndPoint, data=payload, headers=headers
+        )
+        taskTypeConfig = self.cachePipeLineConfig(taskType, taskTypeConfig, pipeLineData)
+        return taskTypeConfig, pipeLineData
+
+    def getPipeLineConfig(self, taskType):
+        resolved = _resolvedConfigs.get()
+        if resolved is None or taskType not in resolved:
+            raise ValueError("Pipe Line config was not resolved for " + taskType)
+        taskTypeConfig, _ = resolved[taskType]
+        return copy.deepcopy(taskTypeConfig)
+
+    async def fetchServiceIds(self, taskTypes) -> list:
+        configs = await asyncio.gather(
+            *(self.fetchPipeLineConfig(taskType) for taskType in taskTypes)
+        )
+        return [taskTypeConfig["config"]["serviceId"] for taskTypeConfig, _ in configs]
+
+    async def cachedBatch(self, taskTypes, texts, computeMisses) -> list:
+        """Serve texts from the result cache and compute only the (unique) misses."""
+        serviceIds = await self.fetchServiceIds(taskTypes)
+        keys = [self.getResultCacheKey(taskTypes, text, serviceIds) for text in texts]
+        results = [self.resultCache.get(key) for key in keys]
+        misses = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+        if misses:
+            computed = dict(zip(misses, await computeMisses(misses)))
+            for index, text in enumerate(texts):
+                if results[index] is None:
+                    results[index] = computed[text]
+                    self.resultCache.set(keys[index], results[index])
+        return results
+
+    async def cachedCall(self, taskTypes, text, compute) -> str:
+        async def computeOne(misses):
+            return [await compute(misses[0])]
+
+        return (await self.cachedBatch(taskTypes, [text], computeOne))[0]
+
+    async def buildPayload(self, payloadBuilder, taskTypes, *args) -> tuple:
+        """
+        Resolve every task config concurrently, then build the request payload.
+
+        Returns the payload and the pipeline data of its last task, whose
+        inference endpoint compute_response() sends it to.
+        """
+        configs = await asyncio.gather(
+            *(self.fetchPipeLineConfig(taskType) for taskType in taskTypes)
+        )
+        token = _resolvedConfigs.set(dict(zip(taskTypes, configs)))
+        try:
+            return payloadBuilder(*args), configs[-1][1]
+        finally:
+            _resolvedConfigs.reset(token)
+
+    async def translate(self, text) -> str:
+        async def translateOne(text):
+            requestPayload, pipeLineData = await self.buildPayload(
+                self.nmt_payload, ("translation",), text
+            )
+            pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+            return (
+                pipelineResponse.get("pipelineResponse")[0]
+                .get("output")[0]
+                .get("target")
+            )
+
+        return await self.cachedCall(("translation",), text, translateOne)
+
+    async def translate_batch(self, texts: list) -> list:
+        """Translate many texts; the batched requests are sent concurrently."""
+
+        async def translateBatch(batch):
+            requestPayload, pipeLineData = await self.buildPayload(
+                self.nmt_batch_payload, ("translation",), batch
+            )
+            pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+            outputs = pipelineResponse.get("pipelineResponse")[0].get("output")
+            return self.checkBatch(batch, outputs, "target")
+
+        async def translateMisses(misses):
+            batches = await asyncio.gather(
+                *(translateBatch(batch) for batch in splitBatches(misses))
+            )
+            return [translation for batch in batches for translation in batch]
+
+        return await self.cachedBatch(("translation",), texts, translateMisses)
+
+    async def tts(self, text) -> str:
+        async def synthesizeOne(text):
+            requestPayload, pipeLineData = await self.buildPayload(self.tts_payload, ("tts",), text)
+            pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+            return (
+                pipelineResponse.get("pipelineResponse")[0]
+                .get("audio")[0]
+                .get("audioContent")
+            )
+
+        return await self.cachedCall(("tts",), text, synthesizeOne)
+
+    async def tts_batch(self, texts: list) -> list:
+        """Generate speech for many texts; the batched requests are sent concurrently."""
+
+        async def ttsBatch(batch):
+            requestPayload, pipeLineData = await self.buildPayload(
+                self.tts_batch_payload, ("tts",), batch
+            )
+            pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+            outputs = pipelineResponse.get("pipelineResponse")[0].get("audio")
+            return self.checkBatch(batch, outputs, "audioContent")
+
+        async def synthesizeMisses(misses):
+            batches = await asyncio.gather(
+                *(ttsBatch(batch) for batch in splitBatches(misses))
+            )
+            return [audio for batch in batches for audio in batch]
+
+        return await self.cachedBatch(("tts",), texts, synthesizeMisses)
+
+    async def asr_nmt(self, base64String: str) -> str:
+        requestPayload, pipeLineData = await self.buildPayload(
+            self.asr_nmt_payload, ("asr", "translation"), base64String
+        )
+        pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+        return (
+            pipelineResponse.get("pipelineResponse")[1].get("output")[0].get("target")
+        )
+
+    async def asr(self, base64String: str) -> str:
+        requestPayload, pipeLineData = await self.buildPayload(
+            self.asr_payload, ("asr",), base64String
+        )
+        pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+        return (
+            pipelineResponse.get("pipelineResponse")[0].get("output")[0].get("source")
+        )
+
+    async def nmt_tts(self, text: str) -> str:
+        async def translateAndSynthesize(text):
+            requestPayload, pipeLineData = await self.buildPayload(
+                self.nmt_tts_payload, ("translation", "tts"), text
+            )
+            pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+            return (
+                pipelineResponse.get("pipelineResponse")[1]
+                .get("audio")[0]
+                .get("audioContent")
+            )
+
+        return await self.cachedCall(("translation", "tts"), text, translateAndSynthesize)
+
+    async def asr_nmt_tts(self, base64String: str) -> str:
+        requestPayload, pipeLineData = await self.buildPayload(
+            self.asr_nmt_tts_payload, ("asr", "translation", "tts"), base64String
+        )
+        pipelineResponse = await self.compute_response(requestPayload, pipeLineData)
+        return (
+            pipelineResponse.get("pipelineResponse")[2]
+            .get("audio")[0]
+            .get("audioContent")
+        )
+
+    async def compute_response(self, requestPayload: str, pipeLineData: dict) -> dict:
+        callbackUrl, headers = self.getInferenceRequest(pipeLineData)
+
+        try:
+            return await self.getAsyncTransport().postJson(
+                callbackUrl, data=requestPayload, headers=headers
+            )
+        except BhashiniAuthError:
+            # The inference key may have been rotated; refetch it next time.
+            self.invalidatePipeLineConfig()
+            raise
+
+
+class _BackgroundLoop:
+    """A daemon thread running one event loop shared by every runSync() call."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="bhashini-async", daemon=True
+        )
+        self.thread.start()
+
+
+_backgroundLoop = None
+_backgroundLoopLock = threading.Lock()
+
+
+def runAsync(coroutine):
+    """
+    Schedule a coroutine from blocking code and return a concurrent.futures.Future.
+
+    Coroutines run on a long-lived background loop, so the pooled async
+    connections are reused across calls instead of being torn down each time.
+    """
+    global _backgroundLoop
+    if _backgroundLoop is None:
+        with _backgroundLoopLock:
+            if _backgroundLoop is None:
+                _backgroundLoop = _BackgroundLoop()
+    return asyncio.run_coroutine_threadsafe(coroutine, _backgroundLoop.loop)
+
+
+def runSync(coroutine):
+    """Run a coroutine from blocking code (e.g. a Streamlit script thread) and wait for it."""
+    return runAsync(coroutine).result()
@@ -1,7 +1,9 @@
-import requests, os
+import os
 import json
 from bhashini_translator.config import ulcaEndPoint
-from bhashini_translator.payloads import Payloads
+from bhashini_translator.exceptions import BhashiniAuthError, BhashiniResponseError
+from bhashini_translator.payloads import Payloads, splitBatches
+from bhashini_translator.result_cache import resultCache
 from dotenv import load_dotenv
 
 class Bhashini(Payloads):
@@ -12,8 +14,11 @@ class Bhashini(Payloads):
     pipeLineData: dict
     pipeLineId: str
     ulcaEndPoint: str
+    resultCache = resultCache
 
-    def __init__(self, sourceLanguage=None, targetLanguage=None) -> None:
+    def __init__(
+        self, sourceLanguage=None, targetLanguage=None, transport=None, gender="female"
+    ) -> None:
         load_dotenv()
         self.ulcaUserId = os.getenv("userId")
         self.ulcaApiKey = os.getenv("ulcaApiKey")
@@ -25,34 +30,121 @@ class Bhashini(Payloads):
             raise ValueError("Invalid Credentials!")
         self.sourceLanguage = sourceLanguage
         self.targetLanguage = targetLanguage
+        self.transport = transport
+        self.gender = gender
+
+    def getResultCacheKey(self, taskTypes, text, serviceIds) -> str:
+        return self.resultCache.makeKey(
+            "+".join(taskTypes),
+            text,
+            self.sourceLanguage,
+            self.targetLanguage,
+            serviceIds,
+            self.gender if "tts" in taskTypes else None,
+        )
+
+    def getServiceIds(self, taskTypes) -> list:
+        return [
+            self.getPipeLineConfig(taskType)["config"]["serviceId"]
+            for taskType in taskTypes
+        ]
+
+    def cachedBatch(self, taskTypes, texts, serviceIds, computeMisses) -> list:
+        """Serve texts from the result cache and compute only the (unique) misses."""
+        keys = [self.getResultCacheKey(taskTypes, text, serviceIds) for text in texts]
+        results = [self.resultCache.get(key) for key in keys]
+        misses = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+        if misses:
+            computed = dict(zip(misses, computeMisses(misses)))
+            for index, text in enumerate(texts):
+                if results[index] is None:
+                    results[index] = computed[text]
+                    self.resultCache.set(keys[index], results[index])
+        return results
 
     def translate(self, text) -> json:
+        cacheKey = self.getResultCacheKey(
+            ("translation",), text, self.getServiceIds(("translation",))
+        )
+        cached = self.resultCache.get(cacheKey)
+        if cached is not None:
+            return cached
+
         requestPayload = self.nmt_payload(text)
 
         if not self.pipeLineData:
             raise ValueError("Pipe Line data is not available")
 
         pipelineResponse = self.compute_response(requestPayload)
-        return (
+        translation = (
             pipelineResponse.get("pipelineResponse")[0].get("output")[0].get("target")
         )
+        self.resultCache.set(cacheKey, translation)
+        return translation
+
+    def translate_batch(self, texts: list) -> list:
+        """
+        Translate many texts with as few pipeline requests as the limits allow.
+
+        Returns the translations in the same order as the inputs.
+        """
+
+        def translateMisses(misses):
+            translations = []
+            for batch in splitBatches(misses):
+                pipelineResponse = self.compute_response(self.nmt_batch_payload(batch))
+                outputs = pipelineResponse.get("pipelineResponse")[0].get("output")
+                translations.extend(self.checkBatch(batch, outputs, "target"))
+            return translations
+
+        serviceIds = self.getServiceIds(("translation",))
+        return self.cachedBatch(("translation",), texts, serviceIds, translateMisses)
 
     def tts(self, text) -> str:
         """
         TTS (Text-to-Speech) - generates speech from text.
         Generates speech from text in a specific source language.
         """
+        cacheKey = self.getResultCacheKey(("tts",), text, self.getServiceIds(("tts",)))
+        cached = self.resultCache.get(cacheKey)
+        if cached is not None:
+            return cached
+
         requestPayload = self.tts_payload(text)
 
         if not self.pipeLineData:
             raise ValueError("Pipe Line data is not available")
 
         pipelineResponse = self.compute_response(requestPayload)
-        return (
+        audioContent = (
             pipelineResponse.get("pipelineResponse")[0]
             .get("audio")[0]
             .get("audioContent")
         )
+        self.resultCache.set(cacheKey, audioContent)
+        return audioContent
+
+    def tts_batch(self, texts: list) -> list:
+        """Generate speech for many texts; returns base64 audio in input order."""
+
+        def synthesizeMisses(misses):
+            audios = []
+            for batch in splitBatches(misses):
+                pipelineResponse = self.compute_response(self.tts_batch_payload(batch))
+                outputs = pipelineResponse.get("pipelineResponse")[0].get("audio")
+                audios.extend(self.checkBatch(batch, outputs, "audioContent"))
+            return audios
+
+        serviceIds = self.getServiceIds(("tts",))
+        return self.cachedBatch(("tts",), texts, serviceIds, synthesizeMisses)
+
+    @staticmethod
+    def checkBatch(batch: list, outputs: list, field: str) -> list:
+        if not outputs or len(outputs) != len(batch):
+            raise BhashiniResponseError(
+                f"Expected {len(batch)} outputs, got {len(outputs or [])}."
+            )
+        return [output.get(field) for output in outputs]
 
     def asr_nmt(self, base64String: str) -> json:
         """
@@ -85,17 +177,25 @@ class Bhashini(Payloads):
 
     def nmt_tts(self, text: str) -> str:
         # TODO: Fix use of 'gender' in pipeline
+        taskTypes = ("translation", "tts")
+        cacheKey = self.getResultCacheKey(taskTypes, text, self.getServiceIds(taskTypes))
+        cached = self.resultCache.get(cacheKey)
+        if cached is not None:
+            return cached
+
         requestPayload = self.nmt_tts_payload(text)
 
         if not self.pipeLineData:
             raise ValueError("Pipe Line data is not available")
 
         pipelineResponse = self.compute_response(requestPayload)
-        return (
+        audioContent = (
             pipelineResponse.get("pipelineResponse")[1]
             .get("audio")[0]
             .get("audioContent")
         )
+        self.resultCache.set(cacheKey, audioContent)
+        return audioContent
 
     def asr_nmt_tts(self, base64String: str) -> str:
         requestPayload = self.asr_nmt_tts_payload(base64String)
@@ -110,15 +210,21 @@ class Bhashini(Payloads):
             .get("audioContent")
         )
 
-    def compute_response(self, requestPayload: json) -> json:
-        if not self.pipeLineData:
+    def getInferenceRequest(self, pipeLineData=None):
+        """
+        Return the (callbackUrl, headers) of an inference endpoint: the one in
+        pipeLineData, or the last one this client resolved.
+        """
+        if pipeLineData is None:
+            pipeLineData = self.pipeLineData
+        if not pipeLineData:
             raise ValueError("Intitialize pipe line data first!")
 
-        callbackUrl = self.pipeLineData.get("pipelineInferenceAPIEndPoint").get(
+        callbackUrl = pipeLineData.get("pipelineInferenceAPIEndPoint").get(
             "callbackUrl"
         )
         inferenceApiKey = (
-            self.pipeLineData.get("pipelineInferenceAPIEndPoint")
+            pipeLineData.get("pipelineInferenceAPIEndPoint")
             .get("inferenceApiKey")
             .get("value")
         )
@@ -126,12 +232,16 @@ class Bhashini(Payloads):
             "Authorization": inferenceApiKey,
             "Content-Type": "application/json",
         }
+        return callbackUrl, headers
 
-        try:
-            response = requests.post(callbackUrl, data=requestPayload, headers=headers)
-        except Exception as e:
-            raise e
+    def compute_response(self, requestPayload: json) -> json:
+        callbackUrl, headers = self.getInferenceRequest()
 
-        if response.status_code != 200:
-            raise ValueError("Something went wrong")
-        return response.json()
\ No newline at end of file
+        try:
+            return self.getTransport().postJson(
+                callbackUrl, data=requestPayload, headers=headers
+            )
+        except BhashiniAuthError:
+            # The inference key may have been rotated; refetch it next time.
+            self.invalidatePipeLineConfig()
+            raise
@@ -1 +1,28 @@
-ulcaEndPoint = "https://meity-auth.ulcacontrib.org/ulca/apis/v0/model/getModelsPipeline"
+import os
+
+ulcaEndPoint = os.getenv(
+    "ulcaEndPoint",
+    "https://meity-auth.ulcacontrib.org/ulca/apis/v0/model/getModelsPipeline",
+)
+
+# Seconds a getModelsPipeline response stays valid in the shared config cache.
+pipelineConfigTTL = float(os.getenv("pipelineConfigTTL", 6 * 60 * 60))
+
+# HTTP transport settings (seconds / counts).
+connectTimeout = float(os.getenv("bhashiniConnectTimeout", 5))
+readTimeout = float(os.getenv("bhashiniReadTimeout", 60))
+poolSize = int(os.getenv("bhashiniPoolSize", 16))
+maxRetries = int(os.getenv("bhashiniMaxRetries", 3))
+backoffFactor = float(os.getenv("bhashiniBackoffFactor", 0.5))
+backoffMax = float(os.getenv("bhashiniBackoffMax", 8))
+
+# Limits used to split translate_batch/tts_batch inputs into pipeline requests.
+maxBatchSize = int(os.getenv("bhashiniMaxBatchSize", 16))
+maxBatchChars = int(os.getenv("bhashiniMaxBatchChars", 4000))
+
+# Translation/TTS result cache: in-memory LRU entries, optional SQLite file and its size budget.
+resultCacheSize = int(os.getenv("bhashiniCacheSize", 1024))
+# TTS results are base64 WAVs of up to a few MB, so the in-memory tier is bounded by size as well as entries.
+resultCacheMaxMemoryBytes = int(os.getenv("bhashiniCacheMaxMemoryBytes", 64 * 1024 * 1024))
+resultCachePath = os.getenv("bhashiniCachePath")
+resultCacheMaxBytes = int(os.getenv("bhashiniCacheMaxBytes", 256 * 1024 * 1024))
@@ -0,0 +1,40 @@
+class BhashiniError(Exception):
+    """Base class for errors raised while talking to ULCA/Bhashini."""
+
+
+class BhashiniConnectionError(BhashiniError):
+    """The endpoint could not be reached."""
+
+
+class BhashiniTimeoutError(BhashiniConnectionError):
+    """
+    The endpoint did not answer within the configured read timeout.
+
+    The request may have been processed, so it is not retried.
+    """
+
+
+class BhashiniHTTPError(BhashiniError):
+    """The endpoint answered with a non-200 status code."""
+
+    def __init__(self, statusCode: int, url: str, body: str = "") -> None:
+        self.statusCode = statusCode
+        self.url = url
+        self.body = body
+        super().__init__(f"{url} returned HTTP {statusCode}: {body[:200]}")
+
+
+class BhashiniAuthError(BhashiniHTTPError):
+    """Credentials or inference key were rejected (401/403)."""
+
+
+class BhashiniRateLimitError(BhashiniHTTPError):
+    """Too many requests (429)."""
+
+
+class BhashiniServerError(BhashiniHTTPError):
+    """The service failed on its side (5xx)."""
+
+
+class BhashiniResponseError(BhashiniError):
+    """The response body was not the JSON shape we expected."""
@@ -1,7 +1,25 @@
 import json
+from bhashini_translator.config import maxBatchChars, maxBatchSize
 from bhashini_translator.pipeline_config import PipelineConfig
 
 
+def splitBatches(texts, maxItems=maxBatchSize, maxChars=maxBatchChars):
+    """
+    Split texts into consecutive batches within the per-request limits.
+
+    A single text longer than maxChars is sent on its own.
+    """
+    batch, batchChars = [], 0
+    for text in texts:
+        if batch and (len(batch) >= maxItems or batchChars + len(text) > maxChars):
+            yield batch
+            batch, batchChars = [], 0
+        batch.append(text)
+        batchChars += len(text)
+    if batch:
+        yield batch
+
+
 class Payloads(PipelineConfig):
     def nmt_payload(self, text: str) -> json:
         return json.dumps(
@@ -16,6 +34,19 @@ class Payloads(PipelineConfig):
             }
         )
 
+    def nmt_batch_payload(self, texts: list) -> json:
+        return json.dumps(
+            {
+                "pipelineTasks": [
+                    self.getPipeLineConfig("translation"),
+                ],
+                "pipelineRequestConfig": {
+                    "pipelineId": self.pipeLineId,
+                },
+                "inputData": {"input": [{"source": text} for text in texts]},
+            }
+        )
+
     def tts_payload(self, text: str) -> json:
         return json.dumps(
             {
@@ -27,6 +58,17 @@ class Payloads(PipelineConfig):
             }
         )
 
+    def tts_batch_payload(self, texts: list) -> json:
+        return json.dumps(
+            {
+                "pipelineTasks": [self.getPipeLineConfig("tts")],
+                "pipelineRequestConfig": {
+                    "pipelineId": self.pipeLineId,
+                },
+                "inputData": {"input": [{"source": text} for text in texts]},
+            }
+        )
+
     def asr_nmt_payload(self, base64String) -> json:
         payload = {
             "pipelineTasks": [
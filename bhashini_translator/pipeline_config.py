@@ -1,8 +1,65 @@
-import requests
+import copy
+import threading
+import time
 import json
+from bhashini_translator.config import pipelineConfigTTL
+from bhashini_translator.exceptions import BhashiniResponseError
+from bhashini_translator.transport import getTransport
+
+
+class PipelineConfigCache:
+    """
+    Process-wide cache of ULCA pipeline configs.
+
+    Entries are keyed by (taskType, sourceLanguage, targetLanguage, pipeLineId,
+    gender) and hold both the task config (with its serviceId) and the pipeLineData
+    (callback URL and inference key) returned by getModelsPipeline.
+    """
+
+    def __init__(self, ttl: float = pipelineConfigTTL) -> None:
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiresAt, taskTypeConfig, pipeLineData = entry
+            if expiresAt < time.monotonic():
+                del self._entries[key]
+                return None
+        return copy.deepcopy(taskTypeConfig), pipeLineData
+
+    def set(self, key, taskTypeConfig, pipeLineData) -> None:
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl,
+                copy.deepcopy(taskTypeConfig),
+                pipeLineData,
+            )
+
+    def invalidate(self, key=None) -> None:
+        """Drop one entry, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+pipelineConfigCache = PipelineConfigCache()
 
 
 class PipelineConfig:
+    configCache = pipelineConfigCache
+    transport = None
+    gender = "female"
+
+    def getTransport(self):
+        return self.transport or getTransport()
+
     def getTaskTypeConfig(self, taskType):
         taskTypeConfig = {
             "translation": {
@@ -18,7 +75,7 @@ class PipelineConfig:
                 "taskType": "tts",
                 "config": {
                     "language": {"sourceLanguage": self.sourceLanguage},
-                    "gender": "female",
+                    "gender": self.gender,
                 },
             },
             "asr": {
@@ -31,8 +88,18 @@ class PipelineConfig:
         except KeyError:
             raise KeyError("Invalid task type.")
 
-    def getPipeLineConfig(self, taskType):
-        taskTypeConfig = self.getTaskTypeConfig(taskType)
+    def getConfigCacheKey(self, taskType):
+        gender = self.gender if taskType == "tts" else None
+        return (
+            taskType,
+            self.sourceLanguage,
+            self.targetLanguage,
+            self.pipeLineId,
+            gender,
+        )
+
+    def getPipeLineConfigRequest(self, taskTypeConfig):
+        """Build the getModelsPipeline (payload, headers) for one task config."""
         payload = json.dumps(
             {
                 "pipelineTasks": [taskTypeConfig],
@@ -41,25 +108,49 @@ class PipelineConfig:
                 },
             }
         )
-        response = requests.post(
-            self.ulcaEndPoint,
-            data=payload,
-            headers={
-                "ulcaApiKey": self.ulcaApiKey,
-                "userID": self.ulcaUserId,
-                "Content-Type": "application/json",
-            },
-        )
+        headers = {
+            "ulcaApiKey": self.ulcaApiKey,
+            "userID": self.ulcaUserId,
+            "Content-Type": "application/json",
+        }
+        return payload, headers
 
-        if response.status_code != 200:
-            raise ValueError("Something went wrong!")
+    def setPipeLineConfig(self, taskType, taskTypeConfig, pipeLineData):
+        """Attach the serviceId from a getModelsPipeline response, cache it and use its inference endpoint."""
+        taskTypeConfig = self.cachePipeLineConfig(taskType, taskTypeConfig, pipeLineData)
+        self.pipeLineData = pipeLineData
+        return taskTypeConfig
 
-        serviceId = (
-            response.json()["pipelineResponseConfig"][0]
-            .get("config")[0]
-            .get("serviceId")
-        )
+    def cachePipeLineConfig(self, taskType, taskTypeConfig, pipeLineData):
+        """Attach the serviceId from a getModelsPipeline response and cache it."""
+        try:
+            serviceId = (
+                pipeLineData["pipelineResponseConfig"][0]
+                .get("config")[0]
+                .get("serviceId")
+            )
+        except (KeyError, IndexError, TypeError, AttributeError):
+            raise BhashiniResponseError("Unexpected getModelsPipeline response.")
         taskTypeConfig["config"]["serviceId"] = serviceId
-        self.pipeLineData = response.json()
-
+        self.configCache.set(self.getConfigCacheKey(taskType), taskTypeConfig, pipeLineData)
         return taskTypeConfig
+
+    def getPipeLineConfig(self, taskType):
+        cached = self.configCache.get(self.getConfigCacheKey(taskType))
+        if cached is not None:
+            taskTypeConfig, self.pipeLineData = cached
+            return taskTypeConfig
+
+        taskTypeConfig = self.getTaskTypeConfig(taskType)
+        payload, headers = self.getPipeLineConfigRequest(taskTypeConfig)
+        pipeLineData = self.getTransport().postJson(
+            self.ulcaEndPoint, data=payload, headers=headers
+        )
+        return self.setPipeLineConfig(taskType, taskTypeConfig, pipeLineData)
+
+    def invalidatePipeLineConfig(self, taskType=None):
+        """Forget the cached config for one task type, or the whole cache."""
+        if taskType is None:
+            self.configCache.invalidate()
+        else:
+            self.configCache.invalidate(self.getConfigCacheKey(taskType))
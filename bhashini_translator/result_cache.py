@@ -0,0 +1,194 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from bhashini_translator import config
+
+# Lookup counts of the innermost countLookups() block of the current context.
+_lookupCounts = contextvars.ContextVar("resultCacheLookupCounts", default=None)
+
+
+@contextlib.contextmanager
+def countLookups():
+    """
+    Count the result cache hits and misses of the calls made inside the block,
+    e.g. to report them on the caller's own tracing span.
+
+    Yields a dict with "hits" and "misses" that is updated as lookups happen.
+    """
+    counts = {"hits": 0, "misses": 0}
+    token = _lookupCounts.set(counts)
+    try:
+        yield counts
+    finally:
+        _lookupCounts.reset(token)
+
+
+class ResultCache:
+    """
+    Content-addressed cache of translation and TTS results.
+
+    Results live in an in-memory LRU tier bounded by maxEntries and
+    maxMemoryBytes and, when diskPath is set, in a SQLite tier that evicts
+    least-recently-used rows once it grows past maxDiskBytes. Keys hash the text together with the task, languages,
+    serviceIds and voice gender, so a model change never serves a stale result.
+    """
+
+    def __init__(
+        self,
+        maxEntries: int = config.resultCacheSize,
+        diskPath: str = config.resultCachePath,
+        maxDiskBytes: int = config.resultCacheMaxBytes,
+        maxMemoryBytes: int = config.resultCacheMaxMemoryBytes,
+    ) -> None:
+        self.maxEntries = maxEntries
+        self.maxMemoryBytes = maxMemoryBytes
+        self.maxDiskBytes = maxDiskBytes
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memoryBytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._diskBytes = 0
+        if diskPath:
+            self.openDisk(diskPath)
+
+    def openDisk(self, diskPath: str) -> None:
+        directory = os.path.dirname(diskPath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(diskPath, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT, size INTEGER, accessed REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+        )
+        self._db.commit()
+        self._diskBytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+
+    @staticmethod
+    def makeKey(task, text, sourceLanguage, targetLanguage, serviceIds, gender=None):
+        textHash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        keyData = json.dumps(
+            [task, textHash, sourceLanguage, targetLanguage, list(serviceIds), gender]
+        )
+        return hashlib.sha256(keyData.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        value = self._lookup(key)
+        counts = _lookupCounts.get()
+        if counts is not None:
+            counts["hits" if value is not None else "misses"] += 1
+        return value
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE results SET accessed = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self._db.commit()
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    self.diskHits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def set(self, key, value: str) -> None:
+        if value is None:
+            # A missing result (e.g. an empty pipeline output) is not cached; the next call retries it.
+            return
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            size = len(value.encode("utf-8"))
+            previous = self._db.execute(
+                "SELECT size FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._diskBytes += size - (previous[0] if previous else 0)
+            if self._diskBytes > self.maxDiskBytes:
+                self._evictDisk()
+            self._db.commit()
+
+    def _remember(self, key, value) -> None:
+        self._forget(key)
+        size = len(value)
+        if size > self.maxMemoryBytes:
+            # Larger than the whole memory budget: served from disk only.
+            return
+        self._memory[key] = value
+        self._memoryBytes += size
+        while len(self._memory) > self.maxEntries or self._memoryBytes > self.maxMemoryBytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memoryBytes -= len(evicted)
+
+    def _forget(self, key) -> None:
+        value = self._memory.pop(key, None)
+        if value is not None:
+            self._memoryBytes -= len(value)
+
+    def _evictDisk(self) -> None:
+        # Evict down to 90% of the budget so we don't evict on every insert.
+        target = self.maxDiskBytes * 0.9
+        rows = self._db.execute(
+            "SELECT key, size FROM results ORDER BY accessed"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._diskBytes <= target:
+                break
+            evicted.append((key,))
+            self._diskBytes -= size
+        self._db.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memoryBytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._diskBytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "diskHits": self.diskHits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "memoryEntries": len(self._memory),
+                "memoryBytes": self._memoryBytes,
+                "diskBytes": self._diskBytes,
+            }
+
+
+resultCache = ResultCache()
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from bhashini_translator import config
+from bhashini_translator.exceptions import (
+    BhashiniAuthError,
+    BhashiniConnectionError,
+    BhashiniHTTPError,
+    BhashiniRateLimitError,
+    BhashiniResponseError,
+    BhashiniServerError,
+    BhashiniTimeoutError,
+)
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def errorForStatus(statusCode: int, url: str, body: str) -> BhashiniHTTPError:
+    if statusCode in (401, 403):
+        return BhashiniAuthError(statusCode, url, body)
+    if statusCode == 429:
+        return BhashiniRateLimitError(statusCode, url, body)
+    if statusCode >= 500:
+        return BhashiniServerError(statusCode, url, body)
+    return BhashiniHTTPError(statusCode, url, body)
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff."""
+
+    def __init__(
+        self,
+        maxRetries: int = config.maxRetries,
+        backoffFactor: float = config.backoffFactor,
+        backoffMax: float = config.backoffMax,
+    ) -> None:
+        self.maxRetries = maxRetries
+        self.backoffFactor = backoffFactor
+        self.backoffMax = backoffMax
+
+    def shouldRetry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= self.maxRetries:
+            return False
+        if isinstance(error, BhashiniHTTPError):
+            return error.statusCode in RETRY_STATUS_CODES
+        # A read timeout means the request may have been processed (and billed);
+        # inference calls aren't idempotent, so only requests that never got through are retried.
+        return isinstance(error, BhashiniConnectionError) and not isinstance(
+            error, BhashiniTimeoutError
+        )
+
+    def delay(self, attempt: int, retryAfter: str = None) -> float:
+        if retryAfter:
+            try:
+                return min(float(retryAfter), self.backoffMax)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoffMax, self.backoffFactor * 2**attempt))
+
+
+class Transport:
+    """
+    Shared, keep-alive HTTP transport for every ULCA/Bhashini call.
+
+    Wraps a pooled requests.Session with connect/read timeouts, bounded
+    retries on 429/5xx and connection failures, and typed errors.
+    """
+
+    def __init__(
+        self,
+        connectTimeout: float = config.connectTimeout,
+        readTimeout: float = config.readTimeout,
+        poolSize: int = config.poolSize,
+        retryPolicy: RetryPolicy = None,
+    ) -> None:
+        self.timeout = (connectTimeout, readTimeout)
+        self.retryPolicy = retryPolicy or RetryPolicy()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def postJson(self, url: str, data: str, headers: dict) -> dict:
+        attempt = 0
+        while True:
+            retryAfter = None
+            try:
+                response = self.session.post(
+                    url, data=data, headers=headers, timeout=self.timeout
+                )
+            except requests.ConnectTimeout as e:
+                error = BhashiniConnectionError(f"Timed out connecting to {url}: {e}")
+            except requests.Timeout as e:
+                error = BhashiniTimeoutError(f"Timed out calling {url}: {e}")
+            except requests.ConnectionError as e:
+                error = BhashiniConnectionError(f"Could not reach {url}: {e}")
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise BhashiniResponseError(f"{url} returned invalid JSON")
+                error = errorForStatus(response.status_code, url, response.text)
+                retryAfter = response.headers.get("Retry-After")
+
+            if not self.retryPolicy.shouldRetry(error, attempt):
+                raise error
+            time.sleep(self.retryPolicy.delay(attempt, retryAfter))
+            attempt += 1
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_defaultTransport = None
+_defaultTransportLock = threading.Lock()
+
+
+def getTransport() -> Transport:
+    """Return the process-wide transport, creating it on first use."""
+    global _defaultTransport
+    if _defaultTransport is None:
+        with _defaultTransportLock:
+            if _defaultTransport is None:
+                _defaultTransport = Transport()
+    return _defaultTransport
+
+
+def setTransport(transport: Transport) -> None:
+    """Replace the process-wide transport, e.g. with one pointed at a stub server."""
+    global _defaultTransport
+    with _defaultTransportLock:
+        _defaultTransport = transport
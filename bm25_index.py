@@ -0,0 +1,350 @@
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import Counter
+from typing import Any, List, Optional, Set
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+MANIFEST_FILE = "manifest.json"
+
+# Merge all segments into one once there are more than this many, or once this fraction of the indexed rows is deleted.
+MAX_SEGMENTS = 8
+MERGE_DELETED_RATIO = 0.3
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Segment:
+    """
+    One immutable slice of the index, stored as NumPy arrays in its own directory.
+
+    Postings are grouped by term: the postings of term i are docs[offsets[i]:offsets[i + 1]] with the matching term frequencies.
+    The arrays are opened with mmap_mode, so loading a segment only reads its vocabulary and chunk ids.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "vocabulary.json"), encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        self.ids = vocabulary["ids"]
+        self.vocabulary = vocabulary["terms"]
+        self.terms = {term: index for index, term in enumerate(self.vocabulary)}
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.docs = np.load(os.path.join(path, "docs.npy"), mmap_mode="r")
+        self.frequencies = np.load(os.path.join(path, "frequencies.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, "lengths.npy"), mmap_mode="r")
+        self._positions = None
+
+    def mask(self, chunk_ids):
+        """
+        Get a boolean mask over the segment's docs that is True for the given chunk ids.
+        """
+        if self._positions is None:
+            self._positions = {chunk_id: doc for doc, chunk_id in enumerate(self.ids)}
+        mask = np.zeros(len(self.ids), dtype=bool)
+        docs = [self._positions[chunk_id] for chunk_id in chunk_ids if chunk_id in self._positions]
+        mask[docs] = True
+        return mask
+
+    @staticmethod
+    def write(path, ids, terms, offsets, docs, frequencies, lengths):
+        os.makedirs(path)
+        with open(os.path.join(path, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "terms": terms}, f, ensure_ascii=False)
+        np.save(os.path.join(path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(path, "docs.npy"), np.asarray(docs, dtype=np.int32))
+        np.save(os.path.join(path, "frequencies.npy"), np.asarray(frequencies, dtype=np.float32))
+        np.save(os.path.join(path, "lengths.npy"), np.asarray(lengths, dtype=np.float32))
+
+    @classmethod
+    def build(cls, path, chunks):
+        """
+        Tokenize chunks and write them as a new segment.
+        """
+        ids = []
+        lengths = []
+        term_ids = {}
+        posting_terms = []
+        posting_docs = []
+        posting_frequencies = []
+        for doc, chunk in enumerate(chunks):
+            tokens = tokenize(chunk.page_content)
+            ids.append(chunk.metadata["id"])
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+                posting_docs.append(doc)
+                posting_frequencies.append(frequency)
+        cls._write_sorted(
+            path, ids, list(term_ids), np.asarray(posting_terms, dtype=np.int64),
+            np.asarray(posting_docs, dtype=np.int32), np.asarray(posting_frequencies, dtype=np.float32), lengths,
+        )
+        return cls(path)
+
+    @staticmethod
+    def _write_sorted(path, ids, terms, posting_terms, posting_docs, posting_frequencies, lengths):
+        # Sort the vocabulary, then group postings by term (and by doc within a term).
+        term_order = np.argsort(np.asarray(terms, dtype=object)).astype(np.int64)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[term_order] = np.arange(len(terms))
+        posting_terms = rank[posting_terms]
+        order = np.lexsort((posting_docs, posting_terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=len(terms)), out=offsets[1:])
+        Segment.write(
+            path, ids, [terms[i] for i in term_order], offsets,
+            posting_docs[order], posting_frequencies[order], lengths,
+        )
+
+    def postings(self, term):
+        index = self.terms.get(term)
+        if index is None:
+            return None
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.docs[start:end], self.frequencies[start:end]
+
+
+class BM25Index:
+    """
+    Persisted BM25 inverted index over the chunk store, updated incrementally.
+
+    New chunks are written as a new immutable segment and removed chunks are recorded as deletions in the manifest,
+    so an ingestion run only tokenizes the chunks it added. Segments are merged once there are too many of them.
+    The manifest is replaced atomically, so readers always see a consistent set of segments.
+    """
+
+    def __init__(self, path, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._manifest_version = None
+        self.segments = {}
+        self.deleted = set()
+        self._live = {}
+        self._norms = {}
+        self.document_count = 0
+        self.refresh()
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+    def refresh(self):
+        """
+        Reload the manifest if another process changed it since the index was opened.
+        """
+        with self._lock:
+            manifest_path = os.path.join(self.path, MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                return
+            stat = os.stat(manifest_path)
+            version = (stat.st_ino, stat.st_mtime_ns)
+            if version == self._manifest_version:
+                return
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.segments = {
+                name: self.segments.get(name) or Segment(os.path.join(self.path, name))
+                for name in manifest["segments"]
+            }
+            self.deleted = set(manifest["deleted"])
+            self._manifest_version = version
+            self._prepare()
+
+    def _prepare(self):
+        # Precompute per-segment live masks and length normalization, and the corpus statistics.
+        self._live = {}
+        self._norms = {}
+        total_length = 0.0
+        self.document_count = 0
+        for name, segment in self.segments.items():
+            live = np.fromiter((chunk_id not in self.deleted for chunk_id in segment.ids), dtype=bool, count=len(segment.ids))
+            self._live[name] = live
+            self.document_count += int(live.sum())
+            total_length += float(segment.lengths[live].sum())
+        average_length = total_length / self.document_count if self.document_count else 1.0
+        for name, segment in self.segments.items():
+            self._norms[name] = self.k1 * (1 - self.b + self.b * np.asarray(segment.lengths) / max(average_length, 1e-9))
+
+    def __len__(self):
+        return self.document_count
+
+    def ids(self):
+        return {
+            chunk_id
+            for name, segment in self.segments.items()
+            for chunk_id, live in zip(segment.ids, self._live[name])
+            if live
+        }
+
+    def search(self, query, k=8, allowed_ids=None):
+        """
+        Score every live chunk against the query with BM25 and return the best ones.
+
+        With allowed_ids, only those chunks are candidates; term statistics still cover the whole index,
+        so scores don't depend on the filter.
+
+        Args:
+            query (str): The search query.
+            k (int): The number of results to return.
+            allowed_ids (Set[str], optional): The chunk ids to restrict the search to.
+
+        Returns:
+            List[Tuple[str, float]]: (chunk id, score) pairs, best first.
+        """
+        with self._lock:
+            terms = set(tokenize(query))
+            postings = {name: {} for name in self.segments}
+            frequencies = Counter()
+            for name, segment in self.segments.items():
+                allowed = segment.mask(allowed_ids) if allowed_ids is not None else None
+                for term in terms:
+                    found = segment.postings(term)
+                    if found is None:
+                        continue
+                    docs, tfs = found
+                    live = self._live[name][docs]
+                    frequencies[term] += int(live.sum())
+                    if allowed is not None:
+                        live &= allowed[docs]
+                    postings[name][term] = (docs[live], tfs[live])
+
+            candidates = []
+            for name, segment in self.segments.items():
+                if not postings[name]:
+                    continue
+                scores = np.zeros(len(segment.ids), dtype=np.float32)
+                norms = self._norms[name]
+                for term, (docs, tfs) in postings[name].items():
+                    df = frequencies[term]
+                    idf = np.log1p((self.document_count - df + 0.5) / (df + 0.5))
+                    # A doc appears once in a term's postings, so plain fancy-index assignment is safe.
+                    scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norms[docs])
+                hits = np.flatnonzero(scores)
+                if len(hits) > k:
+                    hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+                candidates.extend((segment.ids[doc], float(scores[doc])) for doc in hits)
+        candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+        return candidates[:k]
+
+    def update(self, chunks, deleted_ids):
+        """
+        Add chunks to the index and delete others by id, tokenizing only the chunks it doesn't have yet.
+
+        Chunk ids are content hashes, so a deleted chunk that comes back is simply restored instead of being indexed again.
+
+        Args:
+            chunks (List[Document]): The chunks to add, with 'id' metadata.
+            deleted_ids (Iterable[str]): The ids of the chunks to delete.
+
+        Returns:
+            Tuple[int, int]: The number of added and deleted chunks.
+        """
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            indexed = {chunk_id for segment in self.segments.values() for chunk_id in segment.ids}
+            desired = {chunk.metadata["id"]: chunk for chunk in chunks}
+            new_chunks = [chunk for chunk_id, chunk in desired.items() if chunk_id not in indexed]
+            restored = self.deleted & desired.keys()
+            removed = {chunk_id for chunk_id in deleted_ids if chunk_id in indexed and chunk_id not in self.deleted} - desired.keys()
+
+            segments = list(self.segments)
+            if new_chunks:
+                name = f"segment-{uuid.uuid4().hex[:12]}"
+                self.segments[name] = Segment.build(os.path.join(self.path, name), new_chunks)
+                segments.append(name)
+            self._write_manifest(segments, (self.deleted - restored) | removed)
+
+            indexed_rows = sum(len(segment.ids) for segment in self.segments.values())
+            if len(self.segments) > MAX_SEGMENTS or len(self.deleted) > MERGE_DELETED_RATIO * max(indexed_rows, 1):
+                self.merge()
+            return len(new_chunks) + len(restored), len(removed)
+
+    def merge(self):
+        """
+        Merge every segment into one, dropping deleted chunks.
+        """
+        with self._lock:
+            ids = []
+            terms = {}
+            posting_terms = []
+            posting_docs = []
+            posting_frequencies = []
+            lengths = []
+            for name, segment in self.segments.items():
+                live = self._live[name]
+                # New position of each live doc; deleted docs map to -1.
+                remap = np.full(len(segment.ids), -1, dtype=np.int64)
+                remap[live] = np.arange(len(ids), len(ids) + int(live.sum()))
+                ids.extend(chunk_id for chunk_id, keep in zip(segment.ids, live) if keep)
+                lengths.append(np.asarray(segment.lengths)[live])
+
+                term_map = np.fromiter(
+                    (terms.setdefault(term, len(terms)) for term in segment.vocabulary),
+                    dtype=np.int64, count=len(segment.vocabulary),
+                )
+                counts = np.diff(np.asarray(segment.offsets))
+                docs = remap[np.asarray(segment.docs)]
+                keep = docs >= 0
+                posting_terms.append(np.repeat(term_map, counts)[keep])
+                posting_docs.append(docs[keep].astype(np.int32))
+                posting_frequencies.append(np.asarray(segment.frequencies)[keep])
+
+            name = f"segment-{uuid.uuid4().hex[:12]}"
+            Segment._write_sorted(
+                os.path.join(self.path, name), ids, list(terms),
+                np.concatenate(posting_terms) if posting_terms else np.zeros(0, dtype=np.int64),
+                np.concatenate(posting_docs) if posting_docs else np.zeros(0, dtype=np.int32),
+                np.concatenate(posting_frequencies) if posting_frequencies else np.zeros(0, dtype=np.float32),
+                np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.float32),
+            )
+            old_segments = list(self.segments)
+            self.segments = {name: Segment(os.path.join(self.path, name))}
+            self._write_manifest([name], set())
+            for old in old_segments:
+                # Readers still holding an old segment keep their open memory maps.
+                shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+    def _write_manifest(self, segments, deleted):
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        temporary_path = f"{manifest_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"segments": segments, "deleted": sorted(deleted)}, f)
+        os.replace(temporary_path, manifest_path)
+        self._manifest_version = None
+        self.refresh()
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """Keyword retriever that searches a persisted BM25Index and reads the matching chunks from the chunk store."""
+
+    index: Any
+    """The BM25Index to search."""
+    chunk_store: Any
+    """The ChunkStore holding the chunk text and metadata."""
+    k: int = 8
+    """Number of documents to return."""
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, allowed_ids: Optional[Set[str]] = None
+    ) -> List[Document]:
+        documents = []
+        for chunk_id, _ in self.index.search(query, self.k, allowed_ids=allowed_ids):
+            document = self.chunk_store.get(chunk_id)
+            if document is not None:
+                documents.append(document)
+        return documents
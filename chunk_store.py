@@ -0,0 +1,255 @@
+import json
+import mmap
+import os
+import threading
+import uuid
+from langchain_core.documents import Document
+
+BLOB_FILE = "chunks.bin"
+INDEX_FILE = "index.jsonl"
+
+# Compact when deleted/replaced records take more space than this fraction of the live ones.
+COMPACTION_RATIO = 0.5
+
+
+class ChunkStore:
+    """
+    Append-only on-disk store of document chunks, read through mmap.
+
+    Chunk records (JSON with id, text and metadata) are appended to a blob file, and an index file gets one line per record
+    with its offset, length and source, or a tombstone when a chunk is deleted. The latest index line of an id wins.
+    Opening the store only reads the small index; chunk text is read lazily from the memory-mapped blob,
+    so every session and process shares one copy through the OS page cache.
+
+    Compaction writes a new blob under a new name, recorded in the first line of the new index, so a blob file is never
+    rewritten under a reader holding offsets into it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.blob_path = os.path.join(path, BLOB_FILE)
+        self.index_path = os.path.join(path, INDEX_FILE)
+        self._lock = threading.RLock()
+        self._offsets = {}
+        self._sources = {}
+        self._index_inode = None
+        self._index_position = 0
+        self._mmap = None
+        self._mmap_size = 0
+        self.refresh()
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, INDEX_FILE))
+
+    def refresh(self):
+        """
+        Pick up records appended (or a compaction done) by another process since the store was opened.
+        """
+        with self._lock:
+            if not os.path.exists(self.index_path):
+                return
+            inode = os.stat(self.index_path).st_ino
+            if inode != self._index_inode:
+                self._offsets = {}
+                self._sources = {}
+                self.blob_path = os.path.join(self.path, BLOB_FILE)
+                self._index_inode = inode
+                self._index_position = 0
+                self._close_mmap()
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_position)
+                for line in f:
+                    # A line without its newline is still being written; read it on the next refresh.
+                    if not line.endswith(b"\n"):
+                        break
+                    self._index_position += len(line)
+                    self._apply_index_entry(json.loads(line))
+
+    def _apply_index_entry(self, entry):
+        if "blob" in entry:
+            # A compacted index starts by naming its blob.
+            self.blob_path = os.path.join(self.path, entry["blob"])
+            self._close_mmap()
+            return
+        self._offsets.pop(entry["id"], None)
+        self._sources.pop(entry["id"], None)
+        if not entry.get("deleted"):
+            self._offsets[entry["id"]] = (entry["offset"], entry["length"])
+            # Index lines written before sources were recorded don't have one.
+            if "source" in entry:
+                self._sources[entry["id"]] = entry["source"]
+
+    def _close_mmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mmap_size = 0
+
+    def _read(self, offset, length):
+        if self._mmap is None or offset + length > self._mmap_size:
+            self._close_mmap()
+            with open(self.blob_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmap_size = len(self._mmap)
+        return self._mmap[offset:offset + length]
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._offsets
+
+    def ids(self):
+        return list(self._offsets)
+
+    def sources(self):
+        """
+        Get the 'source' metadata of every chunk from the index, without reading the chunk text.
+
+        Returns:
+            Dict[str, str]: Chunk ids mapped to their source.
+        """
+        with self._lock:
+            sources = {}
+            for chunk_id in self._offsets:
+                if chunk_id in self._sources:
+                    sources[chunk_id] = self._sources[chunk_id]
+                else:
+                    chunk = self.get(chunk_id)
+                    sources[chunk_id] = chunk.metadata.get("source") if chunk is not None else None
+            return sources
+
+    def get(self, chunk_id):
+        """
+        Get one chunk by id.
+
+        Returns:
+            Document: The chunk, or None if there is no chunk with this id.
+        """
+        with self._lock:
+            location = self._offsets.get(chunk_id)
+            if location is None:
+                return None
+            record = self._read_record(chunk_id, location)
+            if record is None:
+                # Another process compacted the store and removed the blob these offsets point into; reload the index once.
+                self.refresh()
+                location = self._offsets.get(chunk_id)
+                record = self._read_record(chunk_id, location) if location is not None else None
+                if record is None:
+                    return None
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    def _read_record(self, chunk_id, location):
+        try:
+            record = json.loads(self._read(*location))
+        except (OSError, ValueError):
+            return None
+        return record if record.get("id") == chunk_id else None
+
+    def __iter__(self):
+        for chunk_id in self.ids():
+            chunk = self.get(chunk_id)
+            if chunk is not None:
+                yield chunk
+
+    def append(self, chunks):
+        """
+        Append chunks (with 'id' metadata); a chunk with an existing id replaces the stored one.
+        """
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            entries = []
+            with open(self.blob_path, "ab") as blob:
+                offset = blob.tell()
+                for chunk in chunks:
+                    record = json.dumps(
+                        {"id": chunk.metadata["id"], "text": chunk.page_content, "metadata": chunk.metadata}
+                    ).encode("utf-8") + b"\n"
+                    blob.write(record)
+                    entries.append({
+                        "id": chunk.metadata["id"], "offset": offset, "length": len(record),
+                        "source": chunk.metadata.get("source"),
+                    })
+                    offset += len(record)
+                blob.flush()
+                os.fsync(blob.fileno())
+            self._write_index(entries)
+
+    def delete(self, chunk_ids):
+        """
+        Delete chunks by id. Their records stay in the blob until the next compaction.
+        """
+        with self._lock:
+            self._write_index([{"id": chunk_id, "deleted": True} for chunk_id in chunk_ids])
+
+    def _write_index(self, entries):
+        if not entries:
+            return
+        with open(self.index_path, "ab") as index:
+            index.write("".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8"))
+        self.refresh()
+
+    def update(self, chunks, deleted_ids):
+        """
+        Append new or changed chunks and delete others by id, compacting once enough of the blob is dead.
+
+        Args:
+            chunks (List[Document]): The chunks to add or replace, with 'id' metadata.
+            deleted_ids (Iterable[str]): The ids of the chunks to delete.
+
+        Returns:
+            Tuple[int, int]: The number of appended and deleted chunks.
+        """
+        with self._lock:
+            deleted = [chunk_id for chunk_id in deleted_ids if chunk_id in self._offsets]
+            self.append(chunks)
+            self.delete(deleted)
+            if self.dead_bytes() > COMPACTION_RATIO * max(self.live_bytes(), 1):
+                self.compact()
+            return len(chunks), len(deleted)
+
+    def live_bytes(self):
+        return sum(length for _, length in self._offsets.values())
+
+    def dead_bytes(self):
+        if not os.path.exists(self.blob_path):
+            return 0
+        return os.path.getsize(self.blob_path) - self.live_bytes()
+
+    def compact(self):
+        """
+        Rewrite the live records into a new blob and replace the index with one pointing at it.
+
+        The new blob gets a new name, and the index naming it is swapped in atomically before the old blob is removed.
+        Readers that already mapped the old blob keep reading it until they see the new index; one that only opens it
+        after it was removed finds it missing, and get() then reloads the index and reads again.
+        """
+        with self._lock:
+            old_blob_path = self.blob_path
+            blob_name = f"chunks-{uuid.uuid4().hex[:12]}.bin"
+            blob_path = os.path.join(self.path, blob_name)
+            index_tmp = f"{self.index_path}.tmp"
+            entries = [{"blob": blob_name}]
+            offset = 0
+            with open(blob_path, "wb") as blob:
+                for chunk_id, location in self._offsets.items():
+                    record = self._read(*location)
+                    blob.write(record)
+                    source = self._sources[chunk_id] if chunk_id in self._sources else json.loads(record)["metadata"].get("source")
+                    entries.append({"id": chunk_id, "offset": offset, "length": len(record), "source": source})
+                    offset += len(record)
+                blob.flush()
+                os.fsync(blob.fileno())
+            with open(index_tmp, "w") as index:
+                index.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            os.replace(index_tmp, self.index_path)
+            self.refresh()
+            # Open memory maps of the old blob stay valid after it is unlinked.
+            if os.path.exists(old_blob_path):
+                os.remove(old_blob_path)
+
+    def close(self):
+        with self._lock:
+            self._close_mmap()
@@ -0,0 +1,186 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, List, Optional, Sequence, cast
+import numpy as np
+from langchain.retrievers.document_compressors import LLMChainExtractor
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from bm25_index import tokenize
+
+MODES = ("extractive", "llm", "none")
+
+# Table rows are separated by newlines; longer text lines are further split into sentences.
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+def split_units(text):
+    """
+    Split a document into the units the extractive compressor keeps or drops: table rows (lines), or sentences of text.
+    """
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            units.extend(sentence for sentence in SENTENCE_END.split(line) if sentence.strip())
+    return units
+
+
+class ExtractiveCompressor(BaseDocumentCompressor):
+    """
+    Compress documents by keeping only their rows or sentences that match the query, without calling an LLM.
+
+    Every unit is scored with BM25 against the query (IDF taken over the units of all the candidate documents), blended with
+    the cosine similarity of unit and query embeddings when an embedding function is given. A document keeps its units scoring
+    at least `relative_threshold` of its best unit, in their original order; such documents are never dropped here, since the
+    reranker and RelevanceScoreFilter have already decided they are relevant.
+
+    A document with a single unit, such as a table row chunk (populate_database.ROWS_PER_CHUNK is 1), can't be shortened.
+    Instead, these rows are scored with BM25 against each other and the ones below `row_threshold` of the best row are dropped
+    whole. Rows are only scored lexically, so they are never embedded; when no row shares a term with the query, all are kept.
+    """
+
+    embeddings: Any = None
+    """Optional embedding function for semantic scoring; lexical BM25 only when None."""
+    query_embeddings: Any = None
+    """A QueryEmbeddingCache shared with the retriever, so the query is embedded once; `embeddings` is used when None."""
+    embedding_weight: float = 0.5
+    """Weight of the embedding similarity in the blended score."""
+    relative_threshold: float = 0.5
+    """Units scoring below this fraction of the document's best unit are dropped."""
+    row_threshold: float = 0.3
+    """Single-unit documents scoring below this fraction of the best one are dropped."""
+    max_units: int = 8
+    """Maximum number of units kept per document."""
+    k1: float = 1.5
+    b: float = 0.75
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def lexical_scores(self, query, units):
+        tokenized = [tokenize(unit) for unit in units]
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return np.zeros(len(units))
+        frequencies = Counter(term for tokens in tokenized for term in set(tokens) if term in query_terms)
+        average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+        scores = np.zeros(len(units))
+        for index, tokens in enumerate(tokenized):
+            counts = Counter(tokens)
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / average_length)
+            for term in query_terms & counts.keys():
+                idf = math.log1p((len(units) - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+                scores[index] += idf * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+        return scores
+
+    def semantic_scores(self, query, units):
+        vectors = np.asarray(self.embeddings.embed_documents(units), dtype=np.float32)
+        query_vector = np.asarray((self.query_embeddings or self.embeddings).embed_query(query), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+        query_vector /= np.linalg.norm(query_vector) + 1e-9
+        return np.clip(vectors @ query_vector, 0.0, None)
+
+    def low_scoring_rows(self, query, document_units):
+        """
+        Get the positions of the single-unit documents whose BM25 score is below `row_threshold` of the best one.
+        """
+        rows = [index for index, unit_list in enumerate(document_units) if len(unit_list) == 1]
+        if len(rows) < 2:
+            return set()
+        scores = self.lexical_scores(query, [document_units[index][0] for index in rows])
+        if scores.max() <= 0:
+            return set()
+        return {index for index, score in zip(rows, scores) if score < self.row_threshold * scores.max()}
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        document_units = [split_units(document.page_content) for document in documents]
+        dropped_rows = self.low_scoring_rows(query, document_units)
+        units = [unit for unit_list in document_units if len(unit_list) > 1 for unit in unit_list]
+        if units:
+            scores = self.lexical_scores(query, units)
+            if scores.max() > 0:
+                scores /= scores.max()
+            if self.embeddings is not None:
+                scores = (1 - self.embedding_weight) * scores + self.embedding_weight * self.semantic_scores(query, units)
+
+        compressed = []
+        start = 0
+        for position, (document, unit_list) in enumerate(zip(documents, document_units)):
+            if len(unit_list) <= 1:
+                if position not in dropped_rows:
+                    compressed.append(document)
+                continue
+            unit_scores = scores[start:start + len(unit_list)]
+            start += len(unit_list)
+            if unit_scores.max() <= 0:
+                compressed.append(document)
+                continue
+            best = np.argsort(-unit_scores)[:self.max_units]
+            keep = sorted(index for index in best if unit_scores[index] >= self.relative_threshold * unit_scores.max())
+            compressed.append(Document(page_content="\n".join(unit_list[index] for index in keep), metadata=document.metadata))
+        return compressed
+
+
+class ConcurrentLLMChainExtractor(LLMChainExtractor):
+    """LLMChainExtractor that runs its per-document LLM calls concurrently instead of one after another."""
+
+    max_concurrency: int = 8
+    """Maximum number of LLM calls in flight."""
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        output_dicts = self.llm_chain.batch(
+            [self.get_input(query, doc) for doc in documents],
+            config={"callbacks": callbacks, "max_concurrency": self.max_concurrency},
+        )
+        compressed_docs = []
+        for doc, output_dict in zip(documents, output_dicts):
+            output = output_dict[self.llm_chain.output_key]
+            if self.llm_chain.prompt.output_parser is not None:
+                output = self.llm_chain.prompt.output_parser.parse(output)
+            if len(output) == 0:
+                continue
+            compressed_docs.append(Document(page_content=cast(str, output), metadata=doc.metadata))
+        return compressed_docs
+
+
+def get_compressors(llm=None, embeddings=None, query_embeddings=None, mode=None) -> List[BaseDocumentCompressor]:
+    """
+    Create the final compression stage of the retrieval pipeline.
+
+    The mode comes from the COMPRESSOR_MODE environment variable unless given: "extractive" (the default, no LLM call),
+    "llm" (an LLM extracts the relevant part of each document, concurrently), or "none".
+
+    Args:
+        llm (BaseLanguageModel): LLM for the "llm" mode.
+        embeddings (Embeddings): Optional embedding function for the "extractive" mode.
+        query_embeddings (QueryEmbeddingCache): Optional shared query embedding cache for the "extractive" mode.
+        mode (str): "extractive", "llm" or "none".
+
+    Returns:
+        List[BaseDocumentCompressor]: The compressors to append to the pipeline (empty for "none").
+    """
+    mode = mode or os.getenv("COMPRESSOR_MODE", "extractive")
+    if mode == "extractive":
+        return [ExtractiveCompressor(embeddings=embeddings, query_embeddings=query_embeddings)]
+    if mode == "llm":
+        if llm is None:
+            raise ValueError("COMPRESSOR_MODE=llm needs an LLM")
+        return [ConcurrentLLMChainExtractor.from_llm(llm)]
+    if mode == "none":
+        return []
+    raise ValueError(f"Unknown compressor mode {mode!r}, expected one of {MODES}")
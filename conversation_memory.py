@@ -0,0 +1,154 @@
+import threading
+import traceback
+from typing import Any, Dict, List
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.pydantic_v1 import PrivateAttr
+
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Count tokens with tiktoken's cl100k_base encoding, a close enough estimate for the Llama tokenizer.
+
+    tiktoken downloads the encoding on first use; without network access, tokens are estimated as 4 characters each.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text))
+
+
+def truncate_tokens(text, limit):
+    """
+    Keep the end of a text that fits in `limit` tokens, as counted by count_tokens().
+    """
+    if count_tokens(text) <= limit:
+        return text
+    if _encoding is False:
+        return text[len(text) - 4 * max(limit - 1, 0):].lstrip()
+    return _encoding.decode(_encoding.encode(text)[-limit:]).lstrip()
+
+
+class BoundedConversationMemory(BaseChatMemory):
+    """
+    Conversation memory that stays within a token budget: a rolling summary of older turns plus the last few turns verbatim.
+
+    Turns beyond `keep_turns`, or that don't fit in `max_token_limit`, are moved out of the buffer and folded into the summary
+    by the LLM on a background thread, so summarizing never adds latency to a turn. Until a summary is ready,
+    the moved turns are still returned as far as the budget allows. The summary itself is held to `summary_ratio` of the budget
+    by keeping its most recent part, and a summary still being written when the memory is cleared is discarded.
+    """
+
+    llm: Any = None
+    """LLM that writes the rolling summary; older turns are simply dropped when None."""
+    memory_key: str = "chat_history"
+    max_token_limit: int = 1000
+    """Token budget of the summary and the returned messages together."""
+    summary_ratio: float = 0.5
+    """Share of max_token_limit the summary may take."""
+    keep_turns: int = 3
+    """Number of most recent turns (question and answer) kept verbatim."""
+    summary: str = ""
+    """Summary of the turns moved out of the buffer."""
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _summarizing: bool = PrivateAttr(default=False)
+    # Incremented by clear(), so a summary of the cleared turns is never stored.
+    _generation: int = PrivateAttr(default=0)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            summary = self.summary
+            pending = list(self._pending)
+            recent = list(self.chat_memory.messages)
+
+        budget = self.max_token_limit - (count_tokens(summary) if summary else 0)
+        # The newest messages are kept first; older ones are dropped once the budget runs out.
+        messages = []
+        for message in reversed(pending + recent):
+            budget -= count_tokens(message.content)
+            if budget < 0 and messages:
+                break
+            messages.append(message)
+        messages.reverse()
+        if summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        with self._lock:
+            messages = self.chat_memory.messages
+            evict = max(len(messages) - 2 * self.keep_turns, 0)
+            # Keep the last turn even if it alone is over the budget.
+            while evict < len(messages) - 2 and sum(count_tokens(m.content) for m in messages[evict:]) > self.max_token_limit:
+                evict += 2
+            if not evict:
+                return
+            self._pending.extend(messages[:evict])
+            remaining = messages[evict:]
+            self.chat_memory.clear()
+            self.chat_memory.add_messages(remaining)
+            if self.llm is None:
+                self._pending.clear()
+                return
+            if self._summarizing:
+                return
+            self._summarizing = True
+            generation = self._generation
+        threading.Thread(target=self._summarize, args=(generation,), name="memory-summary", daemon=True).start()
+
+    def _summarize(self, generation):
+        while True:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                pending = list(self._pending)
+                summary = self.summary
+                if not pending:
+                    self._summarizing = False
+                    return
+            try:
+                new_summary = (SUMMARY_PROMPT | self.llm | StrOutputParser()).invoke(
+                    {"summary": summary, "new_lines": get_buffer_string(pending)}
+                )
+            except Exception:
+                # Keep the moved turns; they are retried with the next ones.
+                traceback.print_exc()
+                with self._lock:
+                    if generation == self._generation:
+                        self._summarizing = False
+                return
+            with self._lock:
+                if generation != self._generation:
+                    # The memory was cleared while the LLM was writing; the summary is of turns that are gone.
+                    return
+                self.summary = truncate_tokens(new_summary, int(self.max_token_limit * self.summary_ratio))
+                del self._pending[:len(pending)]
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self._pending.clear()
+            self.summary = ""
+            self._generation += 1
+            # A running summary thread sees the new generation and stops; the next eviction starts a new one.
+            self._summarizing = False
@@ -0,0 +1,295 @@
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional
+from langchain.chains.base import Chain
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.pydantic_v1 import PrivateAttr
+from metadata_index import METADATA_COLUMNS, extract_text_fields, parse_record
+
+# Name of the custom callback event sent for every question the router sees.
+LOOKUP_EVENT = "directory_lookup"
+
+# Rows per page of a lookup answer.
+PAGE_SIZE = 10
+
+# Fields stored (and indexed) per row, in the order they are searched by.
+FIELDS = ("state", "district", "pin", "centre_type")
+
+NAME_COLUMN = re.compile(r"\bname\b", re.IGNORECASE)
+SERIAL_COLUMN = re.compile(r"^\s*(s\.? ?no|sl\.? ?no|sr\.? ?no|serial( no| number)?)\.?\s*$", re.IGNORECASE)
+
+# Questions asking for a listing of centres, as opposed to explanations.
+LOOKUP_PATTERN = re.compile(
+    r"^\s*(please\s+)?(list|show|give|find|display|tell me|get|which|what are|where are|are there|how many|name)\b"
+    r"|\b(list of|addresses|address of|contact details|phone numbers?)\b",
+    re.IGNORECASE,
+)
+NOT_LOOKUP_PATTERN = re.compile(
+    r"\b(how (do|can|to|does)|why|eligib\w*|apply|application|fees?|courses?|benefits?|salary|schemes?|process|"
+    r"documents? required|what is|difference)\b",
+    re.IGNORECASE,
+)
+# Follow-ups asking for the next page of the previous lookup.
+MORE_PATTERN = re.compile(r"^\s*(show |load |see )?(more|next|next page|more results|continue)\W*$", re.IGNORECASE)
+
+
+class DirectoryStore:
+    """
+    The extracted table rows in an indexed SQLite table, one row per directory entry.
+
+    Rows keep their normalized state, district, PIN and centre type (see metadata_index) in indexed columns next to
+    the original "Column: value" cells. populate_database.py updates the rows of changed chunks in a single transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(path)
+
+    @staticmethod
+    def update(path, chunks, deleted_ids=()):
+        """
+        Replace the rows of the given chunks (and delete those of deleted chunks) in the SQLite table at path, in one transaction.
+
+        The table is created on first use.
+
+        Args:
+            path (str): The SQLite file.
+            chunks (List[Document]): The added or changed chunks; only table rows are stored.
+            deleted_ids (Iterable[str]): The ids of the chunks whose rows are removed.
+
+        Returns:
+            int: The number of rows written.
+        """
+        rows = []
+        for chunk in chunks:
+            if chunk.metadata.get("chunk_type") != "table_row":
+                continue
+            source = chunk.metadata.get("source", "")
+            for line in chunk.page_content.splitlines():
+                cells = parse_record(line)
+                if not cells:
+                    continue
+                fields = extract_text_fields(line, source)
+                rows.append((
+                    chunk.metadata.get("id"), source, chunk.metadata.get("page"),
+                    *(min(fields[field]) if field in fields else None for field in FIELDS),
+                    entry_name(cells), line,
+                ))
+        dropped = sorted(set(deleted_ids) | {chunk.metadata["id"] for chunk in chunks})
+        db = sqlite3.connect(path)
+        try:
+            with db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries (chunk_id TEXT, source TEXT, page INTEGER, state TEXT, district TEXT, "
+                    "pin TEXT, centre_type TEXT, name TEXT, record TEXT)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS entries_chunk_id ON entries (chunk_id)")
+                for field in FIELDS:
+                    db.execute(f"CREATE INDEX IF NOT EXISTS entries_{field} ON entries ({field})")
+                # Below SQLite's limit on query parameters.
+                for first in range(0, len(dropped), 500):
+                    batch = dropped[first:first + 500]
+                    db.execute(f"DELETE FROM entries WHERE chunk_id IN ({','.join('?' * len(batch))})", batch)
+                db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            db.close()
+        return len(rows)
+
+    def search(self, filters, offset=0, limit=PAGE_SIZE):
+        """
+        Find the rows matching every field filter.
+
+        Args:
+            filters (Dict[str, Set[str]]): Accepted normalized values per field.
+            offset (int): Number of matching rows to skip.
+            limit (int): Maximum number of rows to return.
+
+        Returns:
+            Tuple[int, List[str]]: The total number of matching rows and the "Column: value" records of the requested ones.
+        """
+        conditions = []
+        parameters = []
+        for field in FIELDS:
+            if filters.get(field):
+                values = sorted(filters[field])
+                conditions.append(f"{field} IN ({','.join('?' * len(values))})")
+                parameters.extend(values)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # A connection per search: it's cheap for a local file, and always reads the latest update.
+        db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            total = db.execute(f"SELECT COUNT(*) FROM entries {where}", parameters).fetchone()[0]
+            records = [
+                record for (record,) in db.execute(
+                    f"SELECT record FROM entries {where} ORDER BY state, district, name, rowid LIMIT ? OFFSET ?",
+                    [*parameters, limit, offset],
+                )
+            ]
+        finally:
+            db.close()
+        return total, records
+
+
+def entry_name(cells):
+    """
+    Get the name of a directory entry: its name column, or else its first value that isn't a serial number.
+    """
+    for column, value in cells:
+        if NAME_COLUMN.search(column) and not any(pattern.search(column) for pattern in METADATA_COLUMNS.values()):
+            return value
+    for column, value in cells:
+        if not SERIAL_COLUMN.match(column):
+            return value
+    return ""
+
+
+def format_entry(number, record):
+    cells = parse_record(record)
+    name = entry_name(cells)
+    details = "; ".join(
+        f"{column}: {value}" for column, value in cells if value != name and not SERIAL_COLUMN.match(column)
+    )
+    return f"{number}. {name} - {details}" if details else f"{number}. {name}"
+
+
+def describe(filters):
+    """
+    Describe a lookup for the answer header, e.g. "Model Career Centre in Kamrup Metro, Assam".
+    """
+    what = " / ".join(sorted(value.title() for value in filters.get("centre_type", ()))) or "centres"
+    places = [value.title() for field in ("district", "state") for value in sorted(filters.get(field, ()))]
+    places.extend(f"PIN {pin}" for pin in sorted(filters.get("pin", ())))
+    return f"{what} in {', '.join(places)}" if places else what
+
+
+class Lookup:
+    """One page of a directory lookup, with what is needed to fetch the next page."""
+
+    def __init__(self, filters, page, total, answer):
+        self.filters = filters
+        self.page = page
+        self.total = total
+        self.answer = answer
+
+
+class DirectoryLookup:
+    """
+    Answer listing questions ("list Model Career Centres in Assam with addresses") straight from the DirectoryStore.
+
+    A question is a lookup when it asks for a listing, doesn't ask for an explanation, and names at least one state,
+    district, PIN or centre type known to the EntityExtractor. The answer is a templated, paginated list of the matching rows.
+    """
+
+    def __init__(self, store, extractor, page_size=PAGE_SIZE):
+        self.store = store
+        self.extractor = extractor
+        self.page_size = page_size
+
+    def is_lookup(self, question):
+        return bool(LOOKUP_PATTERN.search(question)) and not NOT_LOOKUP_PATTERN.search(question)
+
+    def answer(self, question, previous=None):
+        """
+        Answer a question from the directory, if it is a lookup.
+
+        Args:
+            question (str): The user's question in English.
+            previous (Lookup, optional): The session's last lookup, continued when the question asks for more.
+
+        Returns:
+            Lookup: The page of results, or None if the question should go to the RAG chain.
+        """
+        if previous is not None and MORE_PATTERN.match(question):
+            return self.page(previous.filters, previous.page + 1)
+        if not self.is_lookup(question):
+            return None
+        _, filters = self.extractor.resolve(question)
+        if not filters:
+            return None
+        lookup = self.page(filters, 0)
+        # Nothing matched at the row level; let the RAG chain try.
+        return lookup if lookup.total else None
+
+    def page(self, filters, page):
+        total, records = self.store.search(filters, offset=page * self.page_size, limit=self.page_size)
+        first = page * self.page_size
+        description = describe(filters)
+        if not records:
+            answer = f"That's all {total} results for {description}."
+        else:
+            lines = [
+                f"Found {total} {'result' if total == 1 else 'results'} for {description}. "
+                f"Showing {first + 1}-{first + len(records)}:"
+            ]
+            lines.extend(format_entry(first + number, record) for number, record in enumerate(records, start=1))
+            remaining = total - first - len(records)
+            if remaining > 0:
+                lines.append(f'Say "more" to see the next {min(remaining, self.page_size)}.')
+            answer = "\n".join(lines)
+        return Lookup(filters, page, total, answer)
+
+
+class DirectoryRouterChain(Chain):
+    """
+    Route each question either to a DirectoryLookup or to the conversation chain behind it.
+
+    Lookups skip retrieval and every LLM call. Their turns are still saved to the conversation chain's memory,
+    and the output has the same keys as the conversation chain's, plus "lookup" (the page of results, or None).
+    The router is per session: it remembers the last lookup so that "more" continues it.
+    """
+
+    chain: Chain
+    """The conversation chain answering everything that isn't a lookup."""
+    directory: Any
+    """The DirectoryLookup."""
+
+    _last_lookup: Any = PrivateAttr(default=None)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["question"]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return self.chain.output_keys
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        question = inputs["question"]
+        lookup = self.directory.answer(question, self._last_lookup)
+        dispatch_custom_event(
+            LOOKUP_EVENT,
+            {"hit": lookup is not None, "total": lookup.total if lookup else None, "page": lookup.page if lookup else None},
+            config={"callbacks": _run_manager.get_child()},
+        )
+        self._last_lookup = lookup
+        if lookup is None:
+            result = self.chain.invoke({"question": question}, config={"callbacks": _run_manager.get_child()})
+            return {**result, "lookup": None}
+
+        memory = self.chain.memory
+        if memory is not None:
+            memory.save_context({"question": question}, {"answer": lookup.answer})
+        output = {
+            "answer": lookup.answer,
+            "source_documents": [],
+            "generated_question": question,
+            "cache_hit": False,
+            "cached_answer": None,
+            "lookup": lookup,
+        }
+        if memory is not None:
+            output.update(memory.load_memory_variables({}))
+        return output
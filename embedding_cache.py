@@ -0,0 +1,120 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite"
+
+# Below this many texts to encode, a multi-process pool costs more to start than it saves.
+MIN_TEXTS_FOR_POOL = 256
+
+# SQLite limits the number of bound parameters per statement.
+LOOKUP_BATCH_SIZE = 500
+
+
+def normalize_text(text):
+    """
+    Normalize chunk text before hashing and encoding, so whitespace-only changes hit the cache.
+    """
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Sentence-transformers embeddings with a persistent cache and multi-process CPU encoding.
+
+    Vectors are cached in SQLite keyed by (model name, SHA-256 of the normalized text), so unchanged chunks are never encoded again,
+    even after a database reset or a change of chunk ids. Texts missing from the cache are encoded in batches of batch_size,
+    across `processes` worker processes when there are enough of them.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, cache_path=EMBEDDING_CACHE_PATH, batch_size=64, processes=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes or os.cpu_count() or 1
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self._db.commit()
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def cache_key(self, text):
+        return hashlib.sha256(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                for key, vector in self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def _store(self, keys, vectors):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in zip(keys, vectors)],
+            )
+            self._db.commit()
+
+    def _encode(self, texts):
+        start = time.perf_counter()
+        if self.processes > 1 and len(texts) >= MIN_TEXTS_FOR_POOL:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            vectors = self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size)
+        self.encode_seconds += time.perf_counter() - start
+        return vectors
+
+    def embed_documents(self, texts):
+        normalized = [normalize_text(text) for text in texts]
+        keys = [self.cache_key(text) for text in normalized]
+        vectors = self._lookup(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, normalized):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        self.hits += len(keys) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_keys = list(missing)
+            encoded = self._encode([missing[key] for key in missing_keys])
+            self._store(missing_keys, encoded)
+            vectors.update(zip(missing_keys, (np.asarray(vector, dtype=np.float32) for vector in encoded)))
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        return self.model.encode(text).tolist()
+
+    def close(self):
+        """
+        Stop the encoding worker processes, if any were started.
+        """
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Tuple
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.pydantic_v1 import PrivateAttr
+
+# Name of the custom callback event carrying the per-stage timings of each retrieval.
+TIMINGS_EVENT = "retrieval_timings"
+
+# Vector searches run here while the calling thread runs the keyword search.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-search")
+_timings = threading.local()
+
+
+def get_last_timings():
+    """
+    Get the per-stage timings of the last retrieval run on the current thread.
+
+    Returns:
+        dict: Seconds spent per stage (prefilter, query_embedding, vector_search, keyword_search, fusion, total),
+        or {} if nothing ran yet.
+    """
+    return getattr(_timings, "last", {})
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU cache of query embeddings, keyed by whitespace-normalized query text."""
+
+    def __init__(self, embeddings, max_entries=1024):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_query(self, query):
+        key = " ".join(query.split())
+        with self._lock:
+            if key in self._vectors:
+                self._vectors.move_to_end(key)
+                return self._vectors[key]
+        vector = self.embeddings.embed_query(key)
+        with self._lock:
+            self._vectors[key] = vector
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+        return vector
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Hybrid retriever that runs the vector and keyword searches concurrently and fuses them with reciprocal rank fusion.
+
+    Results are deduplicated by chunk id, so a chunk found by both searches is scored once with both ranks.
+    With a prefilter, both searches are restricted to the chunks matching the places and centre types named in the query,
+    falling back to the unfiltered searches when the restricted ones find nothing.
+    Per-stage timings are sent to callbacks as a custom event and kept for get_last_timings().
+    """
+
+    vectorstore: Any
+    """The vector store (e.g. Chroma) for semantic search."""
+    keyword_retriever: BaseRetriever
+    """The keyword (BM25) retriever."""
+    k: int = 8
+    """Number of results taken from each search."""
+    weights: Tuple[float, float] = (0.5, 0.5)
+    """Weights of the vector and keyword rankings in the fusion."""
+    c: int = 60
+    """Rank constant of reciprocal rank fusion; larger values flatten the difference between ranks."""
+    query_cache_size: int = 1024
+    """Number of query embeddings to keep."""
+    query_embeddings: Any = None
+    """A QueryEmbeddingCache shared with other components (e.g. the answer cache); a private one is created when None."""
+    prefilter: Any = None
+    """An EntityExtractor whose filters(query) restricts the searches; the whole corpus is searched when None."""
+
+    _query_cache: QueryEmbeddingCache = PrivateAttr()
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._query_cache = self.query_embeddings or QueryEmbeddingCache(self.vectorstore.embeddings, self.query_cache_size)
+
+    def _vector_search(self, query, where=None):
+        start = time.perf_counter()
+        embedding = self._query_cache.embed_query(query)
+        embedded = time.perf_counter()
+        documents = self.vectorstore.similarity_search_by_vector(embedding, k=self.k, filter=where)
+        return documents, embedded - start, time.perf_counter() - embedded
+
+    def _search(self, query, run_manager, allowed_ids=None, where=None):
+        vector_future = _executor.submit(self._vector_search, query, where)
+
+        keyword_start = time.perf_counter()
+        # Keyword retrievers that don't take allowed_ids (e.g. the in-memory BM25Retriever) ignore it.
+        keyword_documents = self.keyword_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child(tag="keyword_search")}, allowed_ids=allowed_ids
+        )
+        keyword_seconds = time.perf_counter() - keyword_start
+        vector_documents, embedding_seconds, vector_seconds = vector_future.result()
+        return vector_documents, keyword_documents, embedding_seconds, vector_seconds, keyword_seconds
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        start = time.perf_counter()
+        filters = self.prefilter.filters(query) if self.prefilter is not None else None
+        prefilter_seconds = time.perf_counter() - start
+
+        if filters is not None:
+            allowed_ids, where = filters
+            results = self._search(query, run_manager, allowed_ids, where)
+            if not results[0] and not results[1]:
+                filters = None
+        if filters is None:
+            results = self._search(query, run_manager)
+        vector_documents, keyword_documents, embedding_seconds, vector_seconds, keyword_seconds = results
+
+        fusion_start = time.perf_counter()
+        documents = self.fuse([vector_documents, keyword_documents])
+        end = time.perf_counter()
+
+        timings = {
+            "prefilter": prefilter_seconds,
+            "query_embedding": embedding_seconds,
+            "vector_search": vector_seconds,
+            "keyword_search": keyword_seconds,
+            "fusion": end - fusion_start,
+            "total": end - start,
+        }
+        _timings.last = timings
+        dispatch_custom_event(TIMINGS_EVENT, timings, config={"callbacks": run_manager.get_child()})
+        return documents
+
+    def fuse(self, rankings: List[List[Document]]) -> List[Document]:
+        """
+        Combine rankings with weighted reciprocal rank fusion, deduplicating by chunk id.
+
+        Args:
+            rankings (List[List[Document]]): The vector and keyword results, best first.
+
+        Returns:
+            List[Document]: The unique documents, sorted by fused score.
+        """
+        scores = {}
+        documents = {}
+        for ranking, weight in zip(rankings, self.weights):
+            for rank, document in enumerate(ranking, start=1):
+                key = document.metadata.get("id") or document.page_content
+                scores[key] = scores.get(key, 0.0) + weight / (rank + self.c)
+                documents.setdefault(key, document)
+        return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
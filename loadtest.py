@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+import numpy as np
+from benchmark import labelled_questions, peak_rss_mb, percentiles, run_ingest, synthetic_corpus
+import app
+import resources
+import stubs
+import tracing
+
+# A level is saturated when adding sessions raises throughput by less than this fraction.
+SATURATION_GAIN = 0.1
+
+
+def current_rss_mb():
+    """
+    Get the resident memory of this process, falling back to its peak where /proc isn't available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return peak_rss_mb()
+
+
+class Session:
+    """
+    One simulated user: loads the database like the sidebar button, then sends text and voice turns with think times in between.
+    """
+
+    def __init__(self, index, questions, audio, args, start_barrier):
+        self.index = index
+        self.questions = questions
+        self.audio = audio
+        self.args = args
+        self.start_barrier = start_barrier
+        self.random = random.Random(args.seed * 100003 + index)
+        self.conversation = None
+        self.load_seconds = None
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.conversation = app.get_conversation_chain(app.get_shared_retriever())
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+        self.load_seconds = time.perf_counter() - start
+        self.start_barrier.wait()
+        if self.conversation is None:
+            return
+        for _ in range(self.args.turns):
+            if self.args.think_time:
+                time.sleep(self.random.expovariate(1 / self.args.think_time))
+            question = self.random.choice(self.questions)
+            voice = self.random.random() < self.args.voice_ratio
+            start = time.perf_counter()
+            try:
+                if voice:
+                    app.answer_turn(self.conversation, audio_bytes=self.audio[question])
+                else:
+                    app.answer_turn(self.conversation, user_question=question)
+            except Exception:
+                self.errors += 1
+                traceback.print_exc()
+                continue
+            self.latencies.append(time.perf_counter() - start)
+
+
+def run_level(sessions, questions, audio, args):
+    """
+    Run concurrent sessions to completion.
+
+    Returns:
+        dict: Throughput in turns per second, turn latency percentiles, errors, database load time,
+        resident memory per session, and the per-stage summary of the recorded spans.
+    """
+    recorder = tracing.Recorder()
+    tracing.set_recorder(recorder)
+    # Answers cached by the previous level would make this one look faster.
+    app.get_answer_cache().clear()
+    rss_before = current_rss_mb()
+    start_barrier = threading.Barrier(sessions + 1)
+    runners = [Session(index, questions, audio, args, start_barrier) for index in range(sessions)]
+    threads = [threading.Thread(target=runner.run, name=f"session-{runner.index}", daemon=True) for runner in runners]
+    for thread in threads:
+        thread.start()
+    # Turns start together once every session has loaded, so the load time doesn't count against throughput.
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    # Sessions (and their conversation memory) are still referenced here.
+    rss_after = current_rss_mb()
+
+    latencies = [latency for runner in runners for latency in runner.latencies]
+    turns = len(latencies)
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "errors": sum(runner.errors for runner in runners),
+        "seconds": elapsed,
+        "throughput": turns / elapsed if elapsed else 0.0,
+        **(percentiles(latencies) if latencies else {}),
+        "load_p95_ms": float(np.percentile([runner.load_seconds for runner in runners], 95)) * 1000,
+        "rss_per_session_mb": (rss_after - rss_before) / sessions,
+        "stages": recorder.summary(),
+    }
+
+
+def saturation_point(levels, gain=SATURATION_GAIN):
+    """
+    Get the first session count at which throughput stopped growing with the number of sessions.
+
+    Returns:
+        int: The session count of the saturated level, or None if throughput grew up to the last level.
+    """
+    for previous, level in zip(levels, levels[1:]):
+        expected = previous["throughput"] * (1 + gain)
+        if level["throughput"] < expected:
+            return level["sessions"]
+    return None
+
+
+def main():
+    """
+    Load test one app process with concurrent simulated sessions.
+
+    Each session loads the database and sends text and voice turns through app.answer_turn(), with exponentially distributed
+    think times, against the local stubs of stubs.py whose injected latencies stand in for Cerebras, Cohere and Bhashini.
+    Session counts are stepped up level by level; every level reports throughput, tail latency and resident memory per session,
+    and the saturation point is the first level where more sessions stop adding throughput.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Concurrent sessions per level.")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between a session's turns (0 for none).")
+    parser.add_argument("--voice-ratio", type=float, default=0.3, help="Fraction of turns sent as voice recordings.")
+    parser.add_argument("--rows", type=int, default=2000, help="Directory entries in the synthetic corpus.")
+    parser.add_argument("--questions", type=int, default=200, help="Distinct questions sessions pick from.")
+    parser.add_argument("--embeddings", choices=("hashing", "model"), default="hashing",
+                        help="Stub hashing embeddings, or the real embedding model (loaded locally).")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds before the first token of every LLM call.")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds between LLM tokens.")
+    parser.add_argument("--reranker-latency", type=float, default=0.15, help="Seconds per rerank call.")
+    parser.add_argument("--bhashini-latency", type=float, default=0.3, help="Seconds per Bhashini request.")
+    parser.add_argument("--bhashini-jitter", type=float, default=0.2, help="Extra random seconds per Bhashini request, at most.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Directory to create the data stores in (a temporary directory by default).")
+    parser.add_argument("--output", help="Also write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="chauwk-load-test-", dir=args.workdir)
+    cwd = os.getcwd()
+    # Every store lives at a path relative to the working directory.
+    os.chdir(workdir)
+    try:
+        report = run(args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+def run(args):
+    transport = stubs.install(
+        llm_latency=args.llm_latency, token_latency=args.token_latency, reranker_latency=args.reranker_latency,
+        bhashini_latency=args.bhashini_latency, bhashini_jitter=args.bhashini_jitter,
+        embeddings=args.embeddings == "hashing", seed=args.seed,
+    )
+    entries = synthetic_corpus(args.rows, args.seed)
+    run_ingest(resources.get_embedding_function() if args.embeddings == "hashing" else None)
+    questions = [item["query"] for item in labelled_questions(entries, args.questions, args.seed)]
+    # A distinct recording per question, which the stub ASR transcribes back to it.
+    audio = {}
+    for index, question in enumerate(questions):
+        audio[question] = stubs.silent_wav(0.5 + index / stubs.STUB_SAMPLE_RATE)
+        transport.register_audio(audio[question], question)
+    app.get_shared_retriever()
+
+    levels = []
+    print(f"{'sessions':>8}{'turns':>7}{'errors':>7}{'turns/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'MB/session':>12}")
+    for sessions in args.sessions:
+        level = run_level(sessions, questions, audio, args)
+        levels.append(level)
+        print(
+            f"{sessions:>8}{level['turns']:>7}{level['errors']:>7}{level['throughput']:>9.2f}{level.get('p50_ms', 0):>9.0f}"
+            f"{level.get('p95_ms', 0):>9.0f}{level.get('p99_ms', 0):>9.0f}{level['rss_per_session_mb']:>12.2f}"
+        )
+
+    saturation = saturation_point(levels)
+    if saturation is None:
+        print(f"\nNot saturated: throughput still grew at {levels[-1]['sessions']} sessions.")
+    else:
+        print(f"\nSaturated at {saturation} sessions: throughput grew by less than {SATURATION_GAIN:.0%} over the previous level.")
+    print(f"Peak RSS: {peak_rss_mb():.0f} MB\n")
+    print(f"Stages at {levels[-1]['sessions']} sessions:")
+    tracing.print_summary(levels[-1]["stages"])
+    return {"levels": levels, "saturation_sessions": saturation}
+
+
+if __name__ == "__main__":
+    main()
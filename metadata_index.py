@@ -0,0 +1,407 @@
+import json
+import os
+import re
+import threading
+
+# Table columns whose values become location / centre-type metadata, matched on the column name.
+METADATA_COLUMNS = {
+    "state": re.compile(r"\bstate\b", re.IGNORECASE),
+    "district": re.compile(r"\b(district|location|city)\b", re.IGNORECASE),
+    "pin": re.compile(r"\b(pin|pincode|pin code|postal code)\b", re.IGNORECASE),
+    "centre_type": re.compile(r"\btype\b", re.IGNORECASE),
+}
+
+# Contact columns, whose numbers (e.g. the landline "0863 222333") are never read as PINs.
+CONTACT_COLUMNS = re.compile(r"\b(phone|mobile|tel|telephone|landline|fax|contact|helpline|std)\b", re.IGNORECASE)
+
+# Fields in the order they narrow a query down: a field is skipped when it would leave no candidates.
+FILTER_FIELDS = ("pin", "district", "centre_type", "state")
+
+# Up to this many candidate ids, Chroma is filtered on the chunk ids themselves; beyond it, on the metadata fields.
+MAX_WHERE_IDS = 2000
+
+# Six digits (optionally split 3 + 3), not part of a longer number or following an STD code ("0863 222333", "0863-222333").
+PIN_PATTERN = re.compile(r"(?<!\d)(?<!\d[ -])([1-9]\d{2}) ?(\d{3})(?!\d)")
+# A PIN in plain text only counts after its label, since a bare six-digit number there is as likely a phone number.
+LABELLED_PIN_PATTERN = re.compile(
+    r"\b(?:pin|pincode|pin code|postal code)\b\W{0,3}" + PIN_PATTERN.pattern, re.IGNORECASE
+)
+
+STATES = (
+    "andaman and nicobar islands", "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chandigarh", "chhattisgarh",
+    "dadra and nagar haveli and daman and diu", "delhi", "goa", "gujarat", "haryana", "himachal pradesh", "jammu and kashmir",
+    "jharkhand", "karnataka", "kerala", "ladakh", "lakshadweep", "madhya pradesh", "maharashtra", "manipur", "meghalaya",
+    "mizoram", "nagaland", "odisha", "puducherry", "punjab", "rajasthan", "sikkim", "tamil nadu", "telangana", "tripura",
+    "uttar pradesh", "uttarakhand", "west bengal",
+)
+
+STATE_ALIASES = {
+    "andaman and nicobar": "andaman and nicobar islands",
+    "a and n islands": "andaman and nicobar islands",
+    "chattisgarh": "chhattisgarh",
+    "dadra and nagar haveli": "dadra and nagar haveli and daman and diu",
+    "daman and diu": "dadra and nagar haveli and daman and diu",
+    "nct of delhi": "delhi",
+    "j and k": "jammu and kashmir",
+    "orissa": "odisha",
+    "pondicherry": "puducherry",
+    "uttaranchal": "uttarakhand",
+}
+
+CENTRE_TYPE_ALIASES = {
+    "model career centre": ("mcc", "mccs", "model career centre", "model careers centre"),
+    "jan shikshan sansthan": ("jss", "jan shikshan sansthan", "jan shiksha sansthan"),
+    "national career service centre": ("ncs centre", "national career service centre", "national career services centre"),
+    "employment exchange": ("employment exchange", "employment exchanges", "district employment exchange"),
+    "industrial training institute": ("iti", "itis", "industrial training institute", "industrial training institutes"),
+    "rural self employment training institute": ("rseti", "rural self employment training institute"),
+    "pradhan mantri kaushal kendra": ("pmkk", "pradhan mantri kaushal kendra"),
+}
+
+# Spelling variants unified in every normalized name.
+WORD_VARIANTS = {"center": "centre", "centers": "centre", "centres": "centre", "&": "and"}
+
+# District values too generic to be recognized as a district mention in a question.
+DISTRICT_STOPWORDS = {"city", "central", "east", "west", "north", "south", "new", "rural", "urban", "na", "nil"}
+
+_centre_types = {alias: canonical for canonical, aliases in CENTRE_TYPE_ALIASES.items() for alias in aliases}
+_states = {**{state: state for state in STATES}, **STATE_ALIASES}
+
+
+def normalize_name(text):
+    """
+    Lowercase a name and reduce it to plain words, so "Jammu & Kashmir" and "JAMMU AND KASHMIR." compare equal.
+    """
+    words = re.sub(r"[^\w&]+|_", " ", text.lower().replace("&", " & ")).split()
+    return " ".join(WORD_VARIANTS.get(word, word) for word in words)
+
+
+def normalize_state(value):
+    name = normalize_name(value)
+    return _states.get(name, name)
+
+
+def normalize_district(value):
+    return re.sub(r"\s+(district|dist)$", "", normalize_name(value))
+
+
+def normalize_centre_type(value):
+    name = normalize_name(value)
+    return _centre_types.get(name, name)
+
+
+def normalize_pin(value):
+    match = PIN_PATTERN.search(value)
+    return match.group(1) + match.group(2) if match else None
+
+
+NORMALIZERS = {
+    "state": normalize_state,
+    "district": normalize_district,
+    "pin": normalize_pin,
+    "centre_type": normalize_centre_type,
+}
+
+
+def _phrase_pattern(phrases):
+    # Longest phrases first, so "west bengal" wins over a shorter overlapping name.
+    alternatives = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in alternatives) + r")\b")
+
+
+_state_pattern = _phrase_pattern(_states)
+_centre_type_pattern = _phrase_pattern(_centre_types)
+
+
+def parse_record(line):
+    """
+    Parse one table row written by populate_database.table_to_documents ("Column: value; Column: value").
+
+    Returns:
+        List[Tuple[str, str]]: The (column, value) pairs, empty for a line of plain text.
+    """
+    cells = []
+    for cell in line.split("; "):
+        column, separator, value = cell.partition(": ")
+        if separator and value.strip():
+            cells.append((column.strip(), value.strip()))
+    return cells
+
+
+def extract_text_fields(text, source=""):
+    """
+    Extract the normalized state, district, PIN and centre type values of a text.
+
+    Table rows ("Column: value; ...") give the values of their matching columns. PINs are also found in the other cells
+    (e.g. an address ending in "Guntur-522001") except contact columns, and after a PIN label in lines of plain text.
+    States and centre types are recognized by name in the text (and the source file name) when no column gives them.
+
+    Args:
+        text (str): The chunk or row text.
+        source (str): The source file of the text.
+
+    Returns:
+        Dict[str, Set[str]]: The values found per field; fields without values are left out.
+    """
+    fields = {field: set() for field in METADATA_COLUMNS}
+    for line in text.splitlines():
+        cells = parse_record(line)
+        if not cells:
+            fields["pin"].update(first + last for first, last in LABELLED_PIN_PATTERN.findall(line))
+        for column, value in cells:
+            if not CONTACT_COLUMNS.search(column):
+                fields["pin"].update(first + last for first, last in PIN_PATTERN.findall(value))
+            for field, pattern in METADATA_COLUMNS.items():
+                if pattern.search(column):
+                    normalized = NORMALIZERS[field](value)
+                    if normalized:
+                        fields[field].add(normalized)
+                    break
+
+    normalized_text = normalize_name(text)
+    if not fields["state"]:
+        fields["state"].update(_states[name] for name in _state_pattern.findall(normalized_text))
+    if not fields["centre_type"]:
+        source = normalize_name(os.path.basename(str(source)))
+        fields["centre_type"].update(
+            _centre_types[name] for name in _centre_type_pattern.findall(f"{source} {normalized_text}")
+        )
+    return {field: values for field, values in fields.items() if values}
+
+
+def extract_fields(document):
+    """
+    Extract the normalized state, district, PIN and centre type values of a chunk (see extract_text_fields()).
+    """
+    return extract_text_fields(document.page_content, document.metadata.get("source", ""))
+
+
+def annotate(document):
+    """
+    Set the normalized fields of a chunk in its metadata, for the fields that have a single value.
+
+    Chroma metadata holds scalars only, so a chunk spanning several values (e.g. rows from two districts)
+    is found for each of them through the MetadataIndex instead, and matched by id in EntityExtractor.filters().
+
+    Returns:
+        Dict[str, Set[str]]: The extracted fields, as returned by extract_fields().
+    """
+    fields = extract_fields(document)
+    for field in METADATA_COLUMNS:
+        values = fields.get(field, ())
+        if len(values) == 1:
+            document.metadata[field] = next(iter(values))
+        else:
+            document.metadata.pop(field, None)
+    return fields
+
+
+class MetadataIndex:
+    """
+    Inverted index from normalized state, district, PIN and centre type values to the ids of the chunks that mention them.
+
+    Updated by populate_database.py as one JSON file next to the other stores, and replaced atomically. The file also maps
+    each chunk id to its values, so removing a chunk only touches the value lists it is in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fields = {field: {} for field in METADATA_COLUMNS}
+        self.chunks = {}
+        self.version = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(path)
+
+    @staticmethod
+    def update(path, chunks, deleted_ids=()):
+        """
+        Add chunks to the index at path and drop others by id, then write it back atomically.
+
+        A chunk that is already indexed is re-indexed from its new text. Removed chunks are looked up in the per-chunk values,
+        so only the value lists that contain them are rewritten.
+
+        Returns:
+            Dict[str, int]: The number of distinct values per field.
+        """
+        stored = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        fields = {field: stored.get("fields", {}).get(field, {}) for field in METADATA_COLUMNS}
+        chunk_fields = stored.get("chunks")
+        if chunk_fields is None:
+            chunk_fields = _chunk_fields(fields)
+
+        removed = {}
+        for chunk_id in set(deleted_ids) | {chunk.metadata["id"] for chunk in chunks}:
+            for field, values in chunk_fields.pop(chunk_id, {}).items():
+                for value in values:
+                    removed.setdefault((field, value), set()).add(chunk_id)
+        for (field, value), chunk_ids in removed.items():
+            remaining = [chunk_id for chunk_id in fields[field].get(value, ()) if chunk_id not in chunk_ids]
+            if remaining:
+                fields[field][value] = remaining
+            else:
+                fields[field].pop(value, None)
+
+        for chunk in chunks:
+            extracted = extract_fields(chunk)
+            if extracted:
+                chunk_fields[chunk.metadata["id"]] = {field: sorted(values) for field, values in extracted.items()}
+            for field, values in extracted.items():
+                for value in values:
+                    fields[field].setdefault(value, []).append(chunk.metadata["id"])
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"fields": fields, "chunks": chunk_fields}, f, ensure_ascii=False)
+        os.replace(temporary_path, path)
+        return {field: len(values) for field, values in fields.items()}
+
+    def refresh(self):
+        """
+        Reload the index if populate_database.py rewrote it since it was opened.
+        """
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            stat = os.stat(self.path)
+            version = (stat.st_ino, stat.st_mtime_ns)
+            if version == self.version:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            fields = stored["fields"]
+            chunks = stored.get("chunks")
+            if chunks is None:
+                chunks = _chunk_fields(fields)
+            self.fields = {field: {value: set(ids) for value, ids in fields.get(field, {}).items()} for field in METADATA_COLUMNS}
+            self.chunks = chunks
+            self.version = version
+
+    def ids(self, field, values):
+        index = self.fields.get(field, {})
+        return set().union(*(index.get(value, ()) for value in values))
+
+    def annotated(self, chunk_id, fields):
+        """
+        Whether a chunk has a single value for each of the fields, so annotate() wrote them to its Chroma metadata.
+        """
+        values = self.chunks.get(chunk_id, {})
+        return all(len(values.get(field, ())) == 1 for field in fields)
+
+
+def _chunk_fields(fields):
+    # Per-chunk values of an index written before they were stored, rebuilt from the value lists.
+    chunk_fields = {}
+    for field, index in fields.items():
+        for value, chunk_ids in index.items():
+            for chunk_id in chunk_ids:
+                chunk_fields.setdefault(chunk_id, {}).setdefault(field, []).append(value)
+    return chunk_fields
+
+
+class EntityExtractor:
+    """
+    Recognize places, PINs and centre types in a question and turn them into retrieval filters.
+
+    Mentions are matched against the values actually present in the MetadataIndex (plus the known state and centre-type aliases),
+    so a district is recognized as soon as it appears in the data. Fields are applied in FILTER_FIELDS order and intersected;
+    a field that would leave no candidates is skipped rather than failing the search.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._phrases = {}
+        self._pattern = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _load_phrases(self):
+        self.index.refresh()
+        with self._lock:
+            if self._version == self.index.version:
+                return
+            phrases = {}
+            for field, normalize, aliases in (
+                ("state", normalize_state, _states),
+                ("district", normalize_district, {}),
+                ("centre_type", normalize_centre_type, _centre_types),
+            ):
+                for value in self.index.fields.get(field, {}):
+                    phrases.setdefault(value, set()).add((field, value))
+                for alias, value in aliases.items():
+                    if value in self.index.fields.get(field, {}):
+                        phrases.setdefault(alias, set()).add((field, value))
+            for value in list(phrases):
+                if len(value) < 3 or value in DISTRICT_STOPWORDS:
+                    del phrases[value]
+            self._phrases = phrases
+            self._pattern = _phrase_pattern(phrases) if phrases else None
+            self._version = self.index.version
+
+    def extract(self, query):
+        """
+        Find the mentions of indexed values in a question.
+
+        Returns:
+            Dict[str, Set[str]]: The normalized values mentioned, per field.
+        """
+        self._load_phrases()
+        mentions = {}
+        for first, last in PIN_PATTERN.findall(query):
+            mentions.setdefault("pin", set()).add(first + last)
+        if self._pattern is not None:
+            for phrase in self._pattern.findall(normalize_name(query)):
+                for field, value in self._phrases[phrase]:
+                    mentions.setdefault(field, set()).add(value)
+        return mentions
+
+    def resolve(self, query):
+        """
+        Narrow the index down by the mentions in a question, field by field in FILTER_FIELDS order.
+
+        Returns:
+            Tuple[Set[str], Dict[str, Set[str]]]: The ids of the matching chunks (None if nothing was recognized)
+            and the mentions that were applied, per field.
+        """
+        mentions = self.extract(query)
+        candidates = None
+        applied = {}
+        for field in FILTER_FIELDS:
+            if field not in mentions:
+                continue
+            ids = self.index.ids(field, mentions[field])
+            narrowed = ids if candidates is None else candidates & ids
+            if narrowed:
+                candidates = narrowed
+                applied[field] = mentions[field]
+        return candidates, applied
+
+    def filters(self, query):
+        """
+        Get the candidate chunk ids and the Chroma where filter for a question.
+
+        Up to MAX_WHERE_IDS candidates, the filter lists their ids. Beyond it, the filter matches the annotated metadata
+        fields, plus the ids of the candidates with several values for an applied field, which have no metadata to match.
+
+        Returns:
+            Tuple[Set[str], dict]: The ids of the chunks matching the recognized mentions and the equivalent Chroma filter,
+            or None if the question mentions nothing in the index.
+        """
+        candidates, applied = self.resolve(query)
+        if not candidates:
+            return None
+
+        if len(candidates) <= MAX_WHERE_IDS:
+            where = {"id": {"$in": sorted(candidates)}}
+        else:
+            conditions = [{field: {"$in": sorted(values)}} for field, values in applied.items()]
+            where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+            unannotated = sorted(chunk_id for chunk_id in candidates if not self.index.annotated(chunk_id, applied))
+            if unannotated:
+                where = {"$or": [where, {"id": {"$in": unannotated}}]}
+        return candidates, where
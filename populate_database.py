@@ -1,8 +1,11 @@
 import argparse
+import hashlib
 import os
 import glob
 import shutil
 import json
+import re
+import time
 from langchain_community.document_loaders import DirectoryLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
@@ -10,31 +13,61 @@ from langchain_chroma import Chroma
 from dotenv import load_dotenv
 from llama_parse import LlamaParse
 from llama_index.core import SimpleDirectoryReader
-from langchain_community.document_loaders import UnstructuredFileLoader
-import pickle
+import pandas as pd
 from img2table.ocr import TesseractOCR
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from img2table.document import PDF
+from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from embedding_cache import EMBEDDING_CACHE_PATH, EMBEDDING_MODEL, CachedEmbeddings
+from chunk_store import ChunkStore
+from bm25_index import BM25Index
+from metadata_index import MetadataIndex, annotate
+from directory_lookup import DirectoryStore
+import resources
+import tracing
 
 # Stored at local paths.
 CHROMA_PATH = "chroma"
 DATA_PATH = "./data/"
 PARSING_DATA_PATH = "./parsing_data/"
-CHUNKS_PATH = "processed_chunks.pkl"
+CHUNKS_PATH = "chunk_store"
+BM25_PATH = "bm25_index"
+METADATA_INDEX_PATH = "metadata_index.json"
+DIRECTORY_PATH = "directory.sqlite"
+# Rewritten whenever the vector store changes, so the app drops answers cached from older data.
+INDEX_VERSION_PATH = "index_version.txt"
+LEGACY_CHUNKS_PATH = "processed_chunks.pkl"
 PARSED_FILES_LIST = "parsed_files.json"
+ARTIFACTS_PATH = "llama_parsed/artifacts/"
+INGESTED_ARTIFACTS_LIST = "llama_parsed/ingested_artifacts.json"
+
+# Texts per embedding model batch, and chunks per Chroma insert (Chroma caps a single insert at ~5k records).
+EMBEDDING_BATCH_SIZE = 64
+CHROMA_INSERT_BATCH_SIZE = 4096
+
+# Pages of one PDF handed to a worker process at a time.
+PAGES_PER_TASK = 4
+
+# Table rows per chunk; 1 gives one "Column: value; ..." record per chunk, which the extractive compressor keeps or drops whole.
+ROWS_PER_CHUNK = 1
+
+# Words that mark a table row as the header row.
+HEADER_KEYWORDS = re.compile(r"\b(s\.? ?no|sl\.? ?no|name|state|district|address|location|type|email|mobile|pin)\b", re.IGNORECASE)
+
+# Per-process OCR instance, created lazily in each worker.
+_ocr = None
 
 # LlamaParse API key from .env file.
 llamaparse_api_key = os.getenv("LLAMA_CLOUD_API_KEY")
 
 def get_embedding_function():
     """
-    Get the OpenAI embedding function for document embeddings.
+    Get the embedding function for document embeddings, shared within the process.
     
     Returns:
-        OpenAIEmbeddings: An instance of OpenAIEmbeddings for creating document embeddings.
+        HuggingFaceEmbeddings: The process-wide embedding model.
     """
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-    return embeddings
+    return resources.get_embedding_function()
 
 def main():
     """
@@ -42,12 +75,16 @@ def main():
 
     To add files with text paragraphs, change the extract_tables_from_pdf() call with load_documents() and run 'python populate_database.py' without the reset flag.
 
+    Changed or removed files are synced into the database incrementally, so '--reset' is not needed to pick them up.
     Run the populate_database.py script with the '--reset" flag to fully clear the database before adding files in the data path.
+    The embedding cache is kept on reset, so re-ingesting identical text doesn't encode it again.
     """
     load_dotenv()
     # Check if the database should be cleared (using the --reset flag).
     parser = argparse.ArgumentParser()
     parser.add_argument("--reset", action="store_true", help="Reset the database.")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Texts per embedding batch.")
+    parser.add_argument("--embedding-processes", type=int, default=None, help="CPU processes used to encode embeddings (default: all available cores).")
     args = parser.parse_args()
 
     os.makedirs('llama_parsed', exist_ok=True)
@@ -57,28 +94,79 @@ def main():
         print("✨ Clearing Database")
         clear_database()
 
-    # Update data store.
     documents = extract_tables_from_pdf(DATA_PATH) # switch this with the load_documents() function for PDF files with text paragraphs.
-    chunks = split_documents(documents)
-    save_chunks(chunks)
-    add_to_chroma(chunks)
+    ingest(documents, batch_size=args.batch_size, processes=args.embedding_processes)
+
+def ingest(documents, batch_size=EMBEDDING_BATCH_SIZE, processes=None, embeddings=None):
+    """
+    Update every data store with the documents of new or changed artifacts.
+
+    Only the chunks of artifacts that are new or changed since the last run are built and annotated. Previously saved chunks
+    are known by the ids and sources in the chunk store's index, so the stores only receive the chunks that were added or
+    changed and the ids of the chunks whose artifact changed or was removed; a full rebuild only happens after '--reset'.
+    Chroma is reconciled against the full set of chunk ids instead, so it also drops ids left over from older runs.
+    Each stage runs in a tracing span, so benchmarks can report where ingestion time goes.
+
+    Args:
+        documents (List[Document]): The documents of new or changed artifacts, from extract_tables_from_pdf().
+        batch_size (int): Number of texts encoded per model batch.
+        processes (int, optional): Number of CPU encoding processes; defaults to the available cores.
+        embeddings (Embeddings, optional): Embedding function to use instead of the cached model, e.g. a stub in a benchmark.
+
+    Returns:
+        int: The number of chunks now in the stores.
+    """
+    with tracing.span("ingest_chunking", documents=len(documents)) as stage:
+        stale_sources = get_stale_sources()
+        previous_sources = load_chunk_sources()
+        new_chunks = calculate_chunk_ids(split_documents(documents))
+        for chunk in new_chunks:
+            annotate(chunk)
+        new_ids = {chunk.metadata["id"] for chunk in new_chunks}
+        deleted_ids = [
+            chunk_id for chunk_id, source in previous_sources.items() if source in stale_sources and chunk_id not in new_ids
+        ]
+        chunks = changed_chunks(new_chunks, previous_sources)
+        stored_ids = (previous_sources.keys() - set(deleted_ids)) | new_ids
+        stage.set(new_chunks=len(new_chunks), changed_chunks=len(chunks), deleted_chunks=len(deleted_ids))
+    with tracing.span("ingest_chroma"):
+        if sync_chroma(chunks, stored_ids, batch_size=batch_size, processes=processes, embeddings=embeddings):
+            write_atomically(INDEX_VERSION_PATH, f"{time.time()}\n")
+    with tracing.span("ingest_chunk_store"):
+        chunk_count = save_chunks(chunks, deleted_ids)
+    with tracing.span("ingest_bm25"):
+        update_bm25_index(chunks, deleted_ids)
+    with tracing.span("ingest_metadata_index"):
+        update_metadata_index(chunks, deleted_ids)
+    with tracing.span("ingest_directory"):
+        update_directory(chunks, deleted_ids)
+    mark_artifacts_ingested()
+    return chunk_count
 
 def extract_tables_from_pdf(directory_path):
     """
     Extract ONLY tables from a PDF document using img2table and return structured data - use for PDFs with only tables.
 
     If the PDF contains text paragraphs, this function will not extract it. Instead, use the load_documents() functionLlamaParse.
+
+    Only new or changed files (by content hash) are parsed. Pages are OCR'd in parallel across a process pool,
+    and each file's tables are written atomically to its own artifact as soon as the file is done, so an interrupted run resumes where it stopped.
     
     Returns:
-        List[dict]: A dictionary of extracted tables keyed by file name.
+        List[Documents]: The parsed content of new or changed artifacts.
     """
     parsed_files = load_parsed_files()
-    files_to_parse = []
-
-    for file in os.listdir(DATA_PATH):
-        if file not in parsed_files:
-            files_to_parse.append(file)
-            shutil.copy(os.path.join(DATA_PATH, file), PARSING_DATA_PATH)
+    pdf_files = sorted(file for file in os.listdir(directory_path) if file.endswith(".pdf"))
+    file_hashes = {file: file_hash(os.path.join(directory_path, file)) for file in pdf_files}
+    files_to_parse = [file for file in pdf_files if parsed_files.get(file) != file_hashes[file]]
+
+    removed_files = [file for file in parsed_files if not os.path.exists(os.path.join(directory_path, file))]
+    for file in removed_files:
+        if os.path.exists(artifact_path(file)):
+            os.remove(artifact_path(file))
+        del parsed_files[file]
+    if removed_files:
+        save_parsed_files(parsed_files)
 
     if not files_to_parse:
         print("No new files to parse.")
@@ -87,47 +175,303 @@ def extract_tables_from_pdf(directory_path):
         print(f"Parsing {len(files_to_parse)} new file...")
     else:
         print(f"Parsing {len(files_to_parse)} new files...")
-    ocr = TesseractOCR(n_threads=1, lang="eng")
-    all_extracted_tables = []
-    for filename in os.listdir(directory_path):
-        if filename.endswith(".pdf"):
-            pdf_path = os.path.join(directory_path, filename)
-            doc = PDF(pdf_path)
-            extracted_tables = doc.extract_tables(ocr=ocr, implicit_rows=False, borderless_tables=False, min_confidence=50)
-            
-            all_extracted_tables.append({filename: extracted_tables})
-            
-            with open('llama_parsed/output.md', 'a') as f:
-                for key, value_list in extracted_tables.items():
-                    for value in value_list:
-                        table_df = value.df
-                        f.write(f"Table {key} from {filename}:\n")
-                        f.write(table_df.to_string())
-                        f.write("\n\n")
-    
-    parsed_files.extend(files_to_parse)
-    save_parsed_files(parsed_files)
 
-    for file in os.listdir(PARSING_DATA_PATH):
-        os.remove(os.path.join(PARSING_DATA_PATH, file))
+    tasks = []
+    for file in files_to_parse:
+        page_count = len(PdfReader(os.path.join(directory_path, file)).pages)
+        if page_count == 0:
+            # Nothing to OCR; record the file as parsed so it isn't picked up again on every run.
+            write_artifact(file, [])
+            parsed_files[file] = file_hashes[file]
+            save_parsed_files(parsed_files)
+            print(f"✅ Parsed {file} (no pages)")
+            continue
+        for first_page in range(0, page_count, PAGES_PER_TASK):
+            pages = list(range(first_page, min(first_page + PAGES_PER_TASK, page_count)))
+            tasks.append((file, pages))
+    if not tasks:
+        return load_parsed_documents()
+
+    pending_tasks = {file: 0 for file in files_to_parse}
+    for file, _ in tasks:
+        pending_tasks[file] += 1
+    file_tables = {file: [] for file in files_to_parse}
+
+    with ProcessPoolExecutor(max_workers=min(available_cores(), len(tasks))) as executor:
+        futures = {
+            executor.submit(extract_tables_from_pages, os.path.join(directory_path, file), pages): file
+            for file, pages in tasks
+        }
+        for future in as_completed(futures):
+            file = futures[future]
+            file_tables[file].extend(future.result())
+            pending_tasks[file] -= 1
+            if pending_tasks[file] == 0:
+                tables = sorted(file_tables.pop(file), key=lambda table: table[0])
+                write_artifact(file, table_rows(file, tables))
+                parsed_files[file] = file_hashes[file]
+                save_parsed_files(parsed_files)
+                print(f"✅ Parsed {file}")
+
     return load_parsed_documents()
 
+def extract_tables_from_pages(pdf_path, pages):
+    """
+    Extract the tables of some pages of a PDF. Runs in a worker process.
+
+    Args:
+        pdf_path (str): Path of the PDF file.
+        pages (list[int]): Zero-based page indexes to extract.
+
+    Returns:
+        list[tuple[int, pandas.DataFrame]]: The extracted tables with the page they were found on, in page order.
+    """
+    global _ocr
+    if _ocr is None:
+        _ocr = TesseractOCR(n_threads=1, lang="eng")
+    doc = PDF(pdf_path, pages=pages)
+    extracted_tables = doc.extract_tables(ocr=_ocr, implicit_rows=False, borderless_tables=False, min_confidence=50)
+    return [(page, table.df) for page, tables in sorted(extracted_tables.items()) for table in tables]
+
+def artifact_path(filename):
+    """
+    Get the path of the parsed artifact (JSON lines) of one source file.
+    """
+    return os.path.join(ARTIFACTS_PATH, f"{filename}.jsonl")
+
+def source_path(filename):
+    """
+    Get the 'source' metadata value of a file in the data directory, e.g. "data/Model_Career_Centres.pdf".
+    """
+    return os.path.normpath(os.path.join(DATA_PATH, filename))
+
+def table_rows(filename, tables):
+    """
+    Convert extracted tables into artifact rows, one row per table row with its provenance.
+
+    Args:
+        filename (str): The PDF file name.
+        tables (list[tuple[int, pandas.DataFrame]]): The extracted tables and their page.
+
+    Returns:
+        List[dict]: The artifact rows.
+    """
+    rows = []
+    for table_index, (page, table_df) in enumerate(tables):
+        columns = [str(column) for column in table_df.columns]
+        for row_index, values in enumerate(table_df.itertuples(index=False)):
+            rows.append({
+                "kind": "table_row",
+                "source": source_path(filename),
+                "page": page,
+                "table": table_index,
+                "row": row_index,
+                "columns": columns,
+                "values": ["" if pd.isna(value) else str(value) for value in values],
+            })
+    return rows
+
+def write_artifact(filename, rows):
+    """
+    Atomically write the artifact of one source file.
+
+    Args:
+        filename (str): The source file name.
+        rows (List[dict]): The artifact rows.
+    """
+    os.makedirs(ARTIFACTS_PATH, exist_ok=True)
+    write_atomically(artifact_path(filename), "".join(json.dumps(row) + "\n" for row in rows))
+
+def iter_artifact_rows(path):
+    """
+    Stream the rows of one artifact without reading the whole file into memory.
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def artifact_documents(path):
+    """
+    Build documents from one artifact: compact row-level records for tables, one document per page of text.
+
+    Args:
+        path (str): The artifact path.
+
+    Returns:
+        List[Document]: The documents of the artifact, with source/page metadata.
+    """
+    documents = []
+    table_key, table_rows_buffer = None, []
+    header = None
+
+    def flush_table():
+        nonlocal header
+        if table_rows_buffer:
+            first = table_rows_buffer[0]
+            table_df = pd.DataFrame([row["values"] for row in table_rows_buffer], columns=first["columns"])
+            table_documents, header = table_to_documents(
+                table_df, {"source": first["source"], "page": first["page"], "table": first["table"]}, header
+            )
+            documents.extend(table_documents)
+            table_rows_buffer.clear()
+
+    for row in iter_artifact_rows(path):
+        if row["kind"] == "table_row":
+            if (row["source"], row["table"]) != table_key:
+                flush_table()
+                table_key = (row["source"], row["table"])
+            table_rows_buffer.append(row)
+        else:
+            documents.append(Document(page_content=row["text"], metadata={"source": row["source"], "page": row["page"]}))
+    flush_table()
+    return documents
+
+def clean_cell(value):
+    """
+    Collapse the line breaks and padding OCR leaves inside a table cell.
+    """
+    if value is None or pd.isna(value):
+        return ""
+    return " ".join(str(value).split())
+
+def is_header_row(values):
+    """
+    Guess whether a table row holds column names rather than data.
+    """
+    cells = [value for value in values if value]
+    if len(cells) < 2 or any(any(character.isdigit() for character in cell) for cell in cells):
+        return False
+    return any(HEADER_KEYWORDS.search(cell) for cell in cells)
+
+def table_to_documents(table_df, metadata, header=None):
+    """
+    Turn an extracted table into compact row-level documents: "Column: value; Column: value".
+
+    img2table returns tables with numbered columns and the header as the first row.
+    A table without its own header row (e.g. continued on the next page) reuses the previous table's header when the column count matches.
+    Rows are grouped ROWS_PER_CHUNK at a time; their state, district, PIN and centre type are added to the metadata later by annotate().
+
+    Args:
+        table_df (pandas.DataFrame): The extracted table.
+        metadata (dict): Metadata of the table (source, page, table).
+        header (list[str], optional): The header of the previous table.
+
+    Returns:
+        Tuple[List[Document], list[str]]: The row documents, and the header to carry over to the next table.
+    """
+    rows = [[clean_cell(value) for value in row] for row in table_df.itertuples(index=False)]
+    columns = [clean_cell(column) for column in table_df.columns]
+    if all(column.isdigit() for column in columns):
+        if rows and is_header_row(rows[0]):
+            columns, rows = rows[0], rows[1:]
+        elif header is not None and len(header) == len(columns):
+            columns = header
+    columns = [column or f"Column {index + 1}" for index, column in enumerate(columns)]
+
+    documents = []
+    for first_row in range(0, len(rows), ROWS_PER_CHUNK):
+        group = [row for row in rows[first_row:first_row + ROWS_PER_CHUNK] if any(row)]
+        if not group:
+            continue
+        records = ["; ".join(f"{column}: {value}" for column, value in zip(columns, row) if value) for row in group]
+        row_metadata = {**metadata, "row": first_row, "chunk_type": "table_row"}
+        documents.append(Document(page_content="\n".join(records), metadata=row_metadata))
+    return documents, columns
+
+def current_artifacts():
+    """
+    Get every artifact in the store with the hash of its content.
+
+    Returns:
+        Dict[str, str]: Artifact file names mapped to their SHA-256.
+    """
+    if not os.path.exists(ARTIFACTS_PATH):
+        return {}
+    return {
+        artifact: file_hash(os.path.join(ARTIFACTS_PATH, artifact))
+        for artifact in sorted(os.listdir(ARTIFACTS_PATH))
+        if artifact.endswith(".jsonl")
+    }
+
+def load_ingested_artifacts():
+    """
+    Load the artifacts that were already chunked and embedded, with their hash at that time.
+
+    Returns:
+        Dict[str, str]: Artifact file names mapped to their SHA-256.
+    """
+    if os.path.exists(INGESTED_ARTIFACTS_LIST):
+        with open(INGESTED_ARTIFACTS_LIST, 'r') as f:
+            return json.load(f)
+    return {}
+
+def get_stale_sources():
+    """
+    Get the sources whose previously ingested chunks are outdated: their artifact changed or was removed.
+
+    Returns:
+        Set[str]: The 'source' metadata values to drop before adding the new chunks.
+    """
+    ingested = load_ingested_artifacts()
+    current = current_artifacts()
+    stale_artifacts = [artifact for artifact, digest in ingested.items() if current.get(artifact) != digest]
+    return {source_path(artifact[:-len(".jsonl")]) for artifact in stale_artifacts}
+
+def mark_artifacts_ingested():
+    """
+    Record the current artifacts as ingested, once their chunks are stored.
+    """
+    write_atomically(INGESTED_ARTIFACTS_LIST, json.dumps(current_artifacts()))
+
+def write_atomically(path, content):
+    """
+    Write a text file through a temporary file and a rename, so readers never see a partial file.
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w') as f:
+        f.write(content)
+    os.replace(temporary_path, path)
+
+def available_cores():
+    """
+    Get the number of CPU cores this process may run on (respecting container / affinity limits).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def file_hash(path):
+    """
+    Compute the SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def load_parsed_documents():
     """
-    Load all parsed documents from the 'output.md' file.
+    Load the parsed documents of the artifacts that are new or changed since they were last ingested.
 
     Returns:
-        List[Documents]: A list containing the parsed content.
+        List[Documents]: A list containing the parsed content, with source/page metadata.
     """
-    loader = UnstructuredFileLoader('llama_parsed/output.md')
-    documents = loader.load()
-    print("Loaded parsed documents")
+    ingested = load_ingested_artifacts()
+    documents = []
+    for artifact, digest in current_artifacts().items():
+        if ingested.get(artifact) != digest:
+            documents.extend(artifact_documents(os.path.join(ARTIFACTS_PATH, artifact)))
+    print(f"Loaded {len(documents)} new parsed documents")
     return documents
 
 def split_documents(documents: list[Document]):
     """
     Split the input documents into smaller chunks for processing.
 
+    Table rows are already compact row-level records and are kept as they are; only text documents are split.
+
     Args:
         documents (List[Document]): A list of documents to be split.
 
@@ -137,50 +481,122 @@ def split_documents(documents: list[Document]):
     text_splitter = RecursiveCharacterTextSplitter(
         separators=["\n\n"]
     )
-    return text_splitter.split_documents(documents)
+    row_chunks = [doc for doc in documents if doc.metadata.get("chunk_type") == "table_row"]
+    text_documents = [doc for doc in documents if doc.metadata.get("chunk_type") != "table_row"]
+    return row_chunks + text_splitter.split_documents(text_documents)
 
-def save_chunks(chunks: list[Document]):
+def save_chunks(chunks: list[Document], deleted_ids: list[str]):
     """
-    Save processed document chunks to a pickle file.
+    Append new or changed document chunks to the chunk store and delete the removed ones.
 
     Args:
-        chunks (List[Document]): A list containing the processed chunks.
+        chunks (List[Document]): The added or changed chunks.
+        deleted_ids (List[str]): The ids of the chunks to delete.
+
+    Returns:
+        int: The number of chunks in the store.
     """
-    with open(CHUNKS_PATH, 'wb') as f:
-            pickle.dump(chunks, f)
-    print(f"✅ Saved {len(chunks)} chunks to {CHUNKS_PATH}")
+    store = ChunkStore(CHUNKS_PATH)
+    appended, deleted = store.update(chunks, deleted_ids)
+    chunk_count = len(store)
+    store.close()
+    print(f"✅ Saved {chunk_count} chunks to {CHUNKS_PATH} ({appended} appended, {deleted} deleted)")
+    return chunk_count
+
+def update_bm25_index(chunks: list[Document], deleted_ids: list[str]):
+    """
+    Update the persisted BM25 keyword index with the added chunks and removed chunk ids.
+
+    Only chunks the index doesn't have yet are tokenized; removed chunks are marked deleted.
 
-def load_chunks():
+    Args:
+        chunks (List[Document]): The added or changed chunks.
+        deleted_ids (List[str]): The ids of the removed chunks.
     """
-    Load previously saved document chunks from the pickle file.
+    start = time.perf_counter()
+    added, deleted = BM25Index(BM25_PATH).update(chunks, deleted_ids)
+    print(f"✅ Updated BM25 index in {BM25_PATH} ({added} added, {deleted} deleted) in {time.perf_counter() - start:.1f}s")
 
-    Returns:
-        None: If no saved chunks are found
+def update_metadata_index(chunks: list[Document], deleted_ids: list[str]):
+    """
+    Update the inverted index of normalized state, district, PIN and centre type values used to pre-filter retrieval.
 
-        or
+    Args:
+        chunks (List[Document]): The added or changed chunks.
+        deleted_ids (List[str]): The ids of the removed chunks.
+    """
+    start = time.perf_counter()
+    counts = MetadataIndex.update(METADATA_INDEX_PATH, chunks, deleted_ids)
+    summary = ", ".join(f"{count} {field} values" for field, count in counts.items())
+    print(f"✅ Updated metadata index in {METADATA_INDEX_PATH} ({summary}) in {time.perf_counter() - start:.1f}s")
 
-        List[Document]: A list containing the processed chunks.
+def update_directory(chunks: list[Document], deleted_ids: list[str]):
     """
-    if os.path.exists(CHUNKS_PATH):
-        with open(CHUNKS_PATH, 'rb') as f:
-            chunks = pickle.load(f)
-        print(f"✅ Loaded {len(chunks)} chunks from {CHUNKS_PATH}")
-        return chunks
+    Update the SQLite table of directory entries (one per table row) that answers listing questions without the LLM.
+
+    Args:
+        chunks (List[Document]): The added or changed chunks.
+        deleted_ids (List[str]): The ids of the removed chunks.
+    """
+    start = time.perf_counter()
+    rows = DirectoryStore.update(DIRECTORY_PATH, chunks, deleted_ids)
+    print(f"✅ Updated directory in {DIRECTORY_PATH} ({rows} rows written) in {time.perf_counter() - start:.1f}s")
+
+def load_chunk_sources():
+    """
+    Get the ids and sources of the previously saved chunks from the chunk store's index, without reading their text.
+
+    Returns:
+        Dict[str, str]: Chunk ids mapped to their 'source' metadata; empty if no chunks are saved yet.
+    """
+    if ChunkStore.exists(CHUNKS_PATH):
+        store = ChunkStore(CHUNKS_PATH)
+        sources = store.sources()
+        store.close()
+        print(f"✅ Found {len(sources)} saved chunks in {CHUNKS_PATH}")
+        return sources
     else:
+        if os.path.exists(LEGACY_CHUNKS_PATH):
+            print(f"ℹ️ Ignoring legacy {LEGACY_CHUNKS_PATH}; run with --reset to rebuild the chunk store.")
         print("❌ No saved chunks found.")
-        return None
+        return {}
+
+def changed_chunks(chunks: list[Document], previous_sources: dict):
+    """
+    Get the chunks that are new, or whose text or metadata (e.g. page) differs from the saved chunk with the same id.
+
+    Args:
+        chunks (List[Document]): The chunks of the new or changed artifacts, with 'id' metadata.
+        previous_sources (Dict[str, str]): The saved chunks, from load_chunk_sources().
+
+    Returns:
+        List[Document]: The chunks the stores need to add or replace.
+    """
+    if not any(chunk.metadata["id"] in previous_sources for chunk in chunks):
+        return list(chunks)
+    store = ChunkStore(CHUNKS_PATH)
+    changed = []
+    for chunk in chunks:
+        stored = store.get(chunk.metadata["id"]) if chunk.metadata["id"] in previous_sources else None
+        if stored is None or stored.page_content != chunk.page_content or stored.metadata != chunk.metadata:
+            changed.append(chunk)
+    store.close()
+    return changed
 
 def load_parsed_files():
     """
-    Load the list of previously parsed files.
+    Load the previously parsed files and the content hash they were parsed at.
 
     Returns:
-        List[str]: A list of filenames that have already been parsed.
+        Dict[str, str]: File names mapped to their SHA-256 when they were parsed.
     """
     if os.path.exists(PARSED_FILES_LIST):
         with open(PARSED_FILES_LIST, 'r') as f:
-            return json.load(f)
-    return []
+            parsed_files = json.load(f)
+        # Older runs stored a plain list of names without hashes; those files are parsed again once.
+        if isinstance(parsed_files, dict):
+            return parsed_files
+    return {}
 
 def load_documents(directory_path):
     """
@@ -192,12 +608,13 @@ def load_documents(directory_path):
         List[Documents]: A list containing the parsed content.
     """
     parsed_files = load_parsed_files()
-    files_to_parse = []
+    files_to_parse = {}
 
-    for file in os.listdir(DATA_PATH):
-        if file not in parsed_files:
-            files_to_parse.append(file)
-            shutil.copy(os.path.join(DATA_PATH, file), PARSING_DATA_PATH)
+    for file in os.listdir(directory_path):
+        current_hash = file_hash(os.path.join(directory_path, file))
+        if parsed_files.get(file) != current_hash:
+            files_to_parse[file] = current_hash
+            shutil.copy(os.path.join(directory_path, file), PARSING_DATA_PATH)
 
     if not files_to_parse:
         print("No new files to parse.")
@@ -222,11 +639,19 @@ def load_documents(directory_path):
     file_extractor = {".pdf": parser}
     llama_documents = SimpleDirectoryReader(input_dir=PARSING_DATA_PATH, file_extractor=file_extractor).load_data()
     print("created llama_parse documents")
-    with open('llama_parsed/output.md', 'a') as f: 
-        for doc in llama_documents:
-            f.write(doc.text + '\n')
+    file_rows = {file: [] for file in files_to_parse}
+    for doc in llama_documents:
+        file_name = doc.metadata["file_name"]
+        file_rows[file_name].append({
+            "kind": "text",
+            "source": source_path(file_name),
+            "page": doc.metadata.get("page_label", len(file_rows[file_name])),
+            "text": doc.text,
+        })
+    for file, rows in file_rows.items():
+        write_artifact(file, rows)
     
-    parsed_files.extend(files_to_parse)
+    parsed_files.update(files_to_parse)
     save_parsed_files(parsed_files)
 
     for file in os.listdir(PARSING_DATA_PATH):
@@ -236,79 +661,92 @@ def load_documents(directory_path):
 
 def save_parsed_files(parsed_files):
     """
-    Save the list of parsed files.
+    Save the parsed files and their content hashes.
 
     Args:
-        parsed_files (List[str]): A list of filenames that have been parsed.
+        parsed_files (Dict[str, str]): File names mapped to the SHA-256 they were parsed at.
     """
-    with open(PARSED_FILES_LIST, 'w') as f:
-        json.dump(parsed_files, f)
+    write_atomically(PARSED_FILES_LIST, json.dumps(parsed_files))
 
-def add_to_chroma(chunks: list[Document]):
+def sync_chroma(chunks: list[Document], stored_ids: set[str], batch_size=EMBEDDING_BATCH_SIZE, processes=None, embeddings=None):
     """
-    Add new document chunks to the Chroma vector store.
+    Reconcile the Chroma vector store with the chunks: add or replace the given chunks, and make its ids match stored_ids.
 
-    This function only adds new documents that don't already exist in the database using chunk IDs.
+    Only the ids already in Chroma are read. Ids that aren't chunk ids anymore are deleted, including the positional
+    'source:page:index' ids of stores built before ids were content hashes, and chunks missing from Chroma
+    (e.g. after an interrupted run) are added back from the chunk store.
+    Chunk ids are content hashes, so a chunk whose metadata changed (e.g. a row moved to another page) keeps its id
+    and is replaced in place; its text embedding comes from the embedding cache.
 
     Args:
-        chunks (List[Document]): A list of document chunks to be added to the database.
+        chunks (List[Document]): The added or changed chunks, with 'id' metadata.
+        stored_ids (Set[str]): The ids of every chunk that should be in the store once it is synced.
+        batch_size (int): Number of texts encoded per model batch.
+        processes (int, optional): Number of CPU encoding processes; defaults to the available cores.
+        embeddings (Embeddings, optional): Embedding function to use instead of the cached model.
+
+    Returns:
+        bool: Whether any chunk was added, replaced or deleted.
     """
+    owned_embeddings = embeddings is None
+    if owned_embeddings:
+        embeddings = CachedEmbeddings(EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, batch_size=batch_size, processes=processes or available_cores())
     db = Chroma(
-        persist_directory=CHROMA_PATH, embedding_function=get_embedding_function()
+        persist_directory=CHROMA_PATH, embedding_function=embeddings
     )
 
-    chunks_with_ids = calculate_chunk_ids(chunks)
-
-    existing_items = db.get(include=[])
-    existing_ids = set(existing_items["ids"])
-    print(f"Number of existing documents in DB: {len(existing_ids)}")
-
-    # only add documents that don't exist in the database
-    new_chunks = []
-    for chunk in chunks_with_ids:
-        if chunk.metadata["id"] not in existing_ids:
-            new_chunks.append(chunk)
-
-    if len(new_chunks):
-        print(f"👉 Adding new documents: {len(new_chunks)}")
-        new_chunk_ids = [chunk.metadata["id"] for chunk in new_chunks]
-        db.add_documents(new_chunks, ids=new_chunk_ids)
-    else:
-        print("✅ No new documents to add")
-
+    existing_ids = set(db.get(include=[])["ids"])
+    deleted_ids = sorted(existing_ids - stored_ids)
+    missing_ids = stored_ids - existing_ids - {chunk.metadata["id"] for chunk in chunks}
+    if missing_ids:
+        store = ChunkStore(CHUNKS_PATH)
+        chunks = chunks + [chunk for chunk in map(store.get, sorted(missing_ids)) if chunk is not None]
+        store.close()
+    if not chunks and not deleted_ids:
+        print("✅ Database already up to date")
+        if owned_embeddings:
+            embeddings.close()
+        return False
+
+    start = time.perf_counter()
+    for first in range(0, len(deleted_ids), CHROMA_INSERT_BATCH_SIZE):
+        db.delete(ids=deleted_ids[first:first + CHROMA_INSERT_BATCH_SIZE])
+    for first in range(0, len(chunks), CHROMA_INSERT_BATCH_SIZE):
+        batch = chunks[first:first + CHROMA_INSERT_BATCH_SIZE]
+        # Chroma upserts by id, so a chunk that is already stored is replaced.
+        db.add_documents(batch, ids=[chunk.metadata["id"] for chunk in batch])
+    elapsed = time.perf_counter() - start
+
+    print(f"👉 Added or replaced {len(chunks)} ({len(missing_ids)} missing), deleted {len(deleted_ids)} documents in {elapsed:.1f}s")
+    if chunks and owned_embeddings:
+        print(
+            f"⚡ {len(chunks) / elapsed:.1f} chunks/s (embedding cache hits: {embeddings.hits}, encoded: {embeddings.misses})"
+        )
+    if owned_embeddings:
+        embeddings.close()
+    return True
 
 def calculate_chunk_ids(chunks):
     """
-    Calculate unique IDs for each document chunk.
+    Calculate stable, content-based IDs for each document chunk.
 
-    Page Source : Page Number : Chunk Index 
-    "data/Model_Career_Centres.pdf:6:2"
+    The ID is a hash of the chunk's source and text, so inserting or removing a table elsewhere doesn't change the IDs of other chunks.
+    Chunks with the same source and text get the same ID and are kept once.
 
     Args:
         chunks (List[Document]): A list of document chunks objects to assign IDs to.
 
     Returns:
-        List[Document]: The input list of document chunk objects with added 'id' metadata.
+        List[Document]: The unique chunks, with added 'id' metadata.
     """
-    last_page_id = None
-    current_chunk_index = 0
-
+    unique_chunks = {}
     for chunk in chunks:
         source = chunk.metadata.get("source")
-        page = chunk.metadata.get("page")
-        current_page_id = f"{source}:{page}"
-
-        if current_page_id == last_page_id:
-            current_chunk_index += 1
-        else:
-            current_chunk_index = 0
-
-        chunk_id = f"{current_page_id}:{current_chunk_index}"
-        last_page_id = current_page_id
-
+        content = " ".join(chunk.page_content.split())
+        chunk_id = hashlib.sha256(f"{source}\n{content}".encode("utf-8")).hexdigest()[:32]
         chunk.metadata["id"] = chunk_id
-
-    return chunks
+        unique_chunks.setdefault(chunk_id, chunk)
+    return list(unique_chunks.values())
 
 def clear_database():
     """
@@ -319,17 +757,27 @@ def clear_database():
     if os.path.exists(CHROMA_PATH):
         shutil.rmtree(CHROMA_PATH)
     if os.path.exists(CHUNKS_PATH):
-        os.remove(CHUNKS_PATH)
-    output_path = 'llama_parsed/output.md'
-    if os.path.exists(output_path):
-        with open(output_path, 'w') as f:
-            f.write('')
+        shutil.rmtree(CHUNKS_PATH)
+    if os.path.exists(LEGACY_CHUNKS_PATH):
+        os.remove(LEGACY_CHUNKS_PATH)
+    if os.path.exists(BM25_PATH):
+        shutil.rmtree(BM25_PATH)
+    if os.path.exists(INDEX_VERSION_PATH):
+        os.remove(INDEX_VERSION_PATH)
+    if os.path.exists(METADATA_INDEX_PATH):
+        os.remove(METADATA_INDEX_PATH)
+    if os.path.exists(DIRECTORY_PATH):
+        os.remove(DIRECTORY_PATH)
+    if os.path.exists(ARTIFACTS_PATH):
+        shutil.rmtree(ARTIFACTS_PATH)
+    if os.path.exists(INGESTED_ARTIFACTS_LIST):
+        os.remove(INGESTED_ARTIFACTS_LIST)
     if os.path.exists(PARSED_FILES_LIST):
         os.remove(PARSED_FILES_LIST)
     if os.path.exists(PARSING_DATA_PATH):
         shutil.rmtree(PARSING_DATA_PATH)
         os.makedirs(PARSING_DATA_PATH)
-    print("✨ Cleared database, chunks, parsed files, and output.md")
+    print("✨ Cleared database, chunks, parsed files, and artifacts")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.pydantic_v1 import PrivateAttr
+
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+COHERE_RERANK_MODEL = "rerank-english-v3.0"
+
+BACKENDS = ("cohere", "cross-encoder")
+
+_reranker_factory = None
+
+
+class ScoreCache:
+    """Thread-safe LRU cache of cross-encoder scores per (query, chunk) pair."""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, document):
+        chunk_key = document.metadata.get("id") or hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+        return " ".join(query.split()), chunk_key
+
+    def get(self, key):
+        with self._lock:
+            if key in self._scores:
+                self._scores.move_to_end(key)
+                return self._scores[key]
+            return None
+
+    def set(self, key, score):
+        with self._lock:
+            self._scores[key] = score
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+
+class CrossEncoderReranker(BaseDocumentCompressor):
+    """
+    Rerank documents locally with a sentence-transformers cross-encoder on CPU.
+
+    Candidates are scored in batches, and scores are cached per (query, chunk) pair, so a repeated question
+    only scores the chunks it hasn't seen yet. The raw logits are calibrated with Platt scaling into a `relevance_score`
+    between 0 and 1, which RelevanceScoreFilter thresholds like Cohere's scores.
+    """
+
+    model_name: str = CROSS_ENCODER_MODEL
+    """Name of the cross-encoder model."""
+    top_n: int = 5
+    """Number of documents to return."""
+    batch_size: int = 32
+    """Number of (query, document) pairs scored per forward pass."""
+    scale: float = 1.0
+    """Platt scaling slope applied to the logits (fit it with benchmark_rerankers.py)."""
+    bias: float = 0.0
+    """Platt scaling intercept applied to the logits."""
+    cache_size: int = 50000
+    """Number of (query, chunk) scores to keep."""
+
+    _model: Any = PrivateAttr(default=None)
+    _model_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _cache: ScoreCache = PrivateAttr()
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._cache = ScoreCache(self.cache_size)
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name, device="cpu")
+            return self._model
+
+    def logits(self, query: str, documents: Sequence[Document]) -> list:
+        """
+        Score documents against the query, computing only the pairs that aren't cached.
+
+        Returns:
+            list[float]: The raw cross-encoder logit of each document.
+        """
+        keys = [self._cache.key(query, document) for document in documents]
+        scores = [self._cache.get(key) for key in keys]
+        missing = [index for index, score in enumerate(scores) if score is None]
+        if missing:
+            from torch import nn
+            computed = self.model.predict(
+                [(query, documents[index].page_content) for index in missing],
+                batch_size=self.batch_size,
+                activation_fct=nn.Identity(),
+                show_progress_bar=False,
+            )
+            for index, score in zip(missing, computed):
+                scores[index] = float(score)
+                self._cache.set(keys[index], scores[index])
+        return scores
+
+    def calibrate(self, logit: float) -> float:
+        return 1.0 / (1.0 + math.exp(-(self.scale * logit + self.bias)))
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        scored = sorted(zip(documents, self.logits(query, documents)), key=lambda pair: pair[1], reverse=True)
+        reranked = []
+        for document, logit in scored[:self.top_n]:
+            metadata = dict(document.metadata, relevance_score=self.calibrate(logit))
+            reranked.append(Document(page_content=document.page_content, metadata=metadata))
+        return reranked
+
+
+def set_reranker_factory(factory):
+    """
+    Create rerankers with factory(top_n=...) instead of the configured backend, e.g. a local stub in a benchmark.
+    """
+    global _reranker_factory
+    _reranker_factory = factory
+
+
+def get_reranker(backend=None, top_n=5):
+    """
+    Create the reranker of the configured backend.
+
+    The backend comes from the RERANKER_BACKEND environment variable unless given: "cohere" (remote API, the default)
+    or "cross-encoder" (local CPU model that works offline, calibrated with RERANKER_SCALE and RERANKER_BIAS).
+
+    Args:
+        backend (str): "cohere" or "cross-encoder".
+        top_n (int): Number of documents to keep.
+
+    Returns:
+        BaseDocumentCompressor: A reranker that sets `relevance_score` metadata.
+    """
+    if _reranker_factory is not None:
+        return _reranker_factory(top_n=top_n)
+    backend = backend or os.getenv("RERANKER_BACKEND", "cohere")
+    if backend == "cross-encoder":
+        return CrossEncoderReranker(
+            top_n=top_n,
+            scale=float(os.getenv("RERANKER_SCALE", "1.0")),
+            bias=float(os.getenv("RERANKER_BIAS", "0.0")),
+        )
+    if backend == "cohere":
+        from langchain_cohere import CohereRerank
+        return CohereRerank(model=COHERE_RERANK_MODEL, top_n=top_n)
+    raise ValueError(f"Unknown reranker backend {backend!r}, expected one of {BACKENDS}")
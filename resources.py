@@ -0,0 +1,180 @@
+import threading
+import traceback
+from embedding_cache import EMBEDDING_MODEL
+
+# Shared objects are created once per process and reused by every Streamlit session.
+# Streamlit re-executes app.py on every rerun, so they live in this imported module rather than in app.py.
+_resources = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_warm_up_thread = None
+_chat_model_factory = None
+
+
+def get_resource(name, factory):
+    """
+    Get a process-wide shared resource, creating it on first use.
+
+    Concurrent first calls for the same name wait for a single factory call instead of each loading their own copy.
+
+    Args:
+        name (str): Key of the resource.
+        factory (Callable[[], Any]): Creates the resource if it doesn't exist yet.
+
+    Returns:
+        Any: The shared resource.
+    """
+    if name in _resources:
+        return _resources[name]
+    with _registry_lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _resources:
+            _resources[name] = factory()
+        return _resources[name]
+
+
+def set_resource(name, resource):
+    """
+    Replace a shared resource, e.g. with a stub in a benchmark.
+    """
+    _resources[name] = resource
+
+
+def clear_resource(name):
+    """
+    Drop a shared resource so the next get_resource() call creates it again.
+    """
+    _resources.pop(name, None)
+
+
+def get_embedding_function():
+    """
+    Get the shared HuggingFace embedding function used to embed queries.
+
+    Returns:
+        HuggingFaceEmbeddings: The process-wide embedding model.
+    """
+    def load():
+        from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+    return get_resource("embedding_function", load)
+
+
+def get_query_embeddings():
+    """
+    Get the shared cache of query embeddings, so the answer cache and the retriever embed a question only once.
+
+    Returns:
+        QueryEmbeddingCache: LRU cache over the shared embedding function.
+    """
+    from hybrid_retriever import QueryEmbeddingCache
+    return get_resource("query_embeddings", lambda: QueryEmbeddingCache(get_embedding_function()))
+
+
+def get_chroma(path):
+    """
+    Get the shared Chroma client of the vector store at path.
+
+    Returns:
+        Chroma: The vector store, using the shared embedding function.
+    """
+    def load():
+        from langchain_chroma import Chroma
+        return Chroma(persist_directory=path, embedding_function=get_embedding_function())
+
+    return get_resource(f"chroma:{path}", load)
+
+
+def get_chunk_store(path):
+    """
+    Get the shared chunk store at path, refreshed to pick up the latest ingestion run.
+
+    Returns:
+        ChunkStore: The chunk store; its memory-mapped chunk text is shared by every session.
+    """
+    from chunk_store import ChunkStore
+    store = get_resource(f"chunk_store:{path}", lambda: ChunkStore(path))
+    store.refresh()
+    return store
+
+
+def get_bm25_index(path):
+    """
+    Get the shared BM25 index at path, refreshed to pick up the latest ingestion run.
+
+    Returns:
+        BM25Index: The keyword index.
+    """
+    from bm25_index import BM25Index
+    index = get_resource(f"bm25_index:{path}", lambda: BM25Index(path))
+    index.refresh()
+    return index
+
+
+def get_metadata_index(path):
+    """
+    Get the shared metadata index at path, refreshed to pick up the latest ingestion run.
+
+    Returns:
+        MetadataIndex: The inverted index of states, districts, PINs and centre types.
+    """
+    from metadata_index import MetadataIndex
+    index = get_resource(f"metadata_index:{path}", lambda: MetadataIndex(path))
+    index.refresh()
+    return index
+
+
+def set_chat_model_factory(factory):
+    """
+    Create chat models with factory instead of ChatCerebras, e.g. a local stub in a benchmark.
+
+    Chat models created before are dropped, so the next get_chat_model() call uses the factory.
+    """
+    global _chat_model_factory
+    _chat_model_factory = factory
+    for name in [name for name in _resources if name.startswith("chat_model:")]:
+        clear_resource(name)
+
+
+def get_chat_model(**kwargs):
+    """
+    Get a shared ChatCerebras client for the given settings.
+
+    The client only holds settings and a pooled HTTP connection, so sessions can call it concurrently.
+
+    Returns:
+        ChatCerebras: The chat model.
+    """
+    def load():
+        if _chat_model_factory is not None:
+            return _chat_model_factory(**kwargs)
+        from langchain_cerebras import ChatCerebras
+        return ChatCerebras(**kwargs)
+
+    return get_resource(f"chat_model:{sorted(kwargs.items())}", load)
+
+
+def warm_up(*loaders):
+    """
+    Load shared resources on a background thread, once per process, so the first session doesn't wait for them.
+
+    Args:
+        loaders (Callable[[], Any]): Functions that load a shared resource, called in order.
+    """
+    global _warm_up_thread
+    with _registry_lock:
+        if _warm_up_thread is not None:
+            return
+        _warm_up_thread = threading.Thread(target=_run_loaders, args=(loaders,), name="warm-up", daemon=True)
+    _warm_up_thread.start()
+
+
+def _run_loaders(loaders):
+    for loader in loaders:
+        try:
+            loader()
+        except Exception:
+            # A failed warm-up just means the resource is loaded (and the error shown) on first use instead.
+            traceback.print_exc()
@@ -0,0 +1,182 @@
+import contextvars
+import io
+import queue
+import re
+import threading
+import wave
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Tag put on the answering LLM so its tokens can be told apart from the question-condensing LLM.
+ANSWER_TAG = "answer"
+
+# A sentence ends at ., ! or ? (not after a digit, so "1." list markers don't split), the Devanagari danda, or a newline.
+# The match is the whitespace separating it from the next sentence.
+SENTENCE_END = re.compile(r"(?<=[^\d\s][.!?])\s+|(?<=।)\s*|\s*\n\s*")
+
+_DONE = object()
+
+
+class AnswerTokenHandler(BaseCallbackHandler):
+    """Callback handler that forwards the answering LLM's tokens into a queue."""
+
+    def __init__(self, token_queue):
+        self.token_queue = token_queue
+        self.answer_runs = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        if tags and ANSWER_TAG in tags:
+            self.answer_runs.add(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        if tags and ANSWER_TAG in tags:
+            self.answer_runs.add(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self.answer_runs:
+            self.token_queue.put(token)
+
+
+class ChainStream:
+    """
+    Run a conversation chain in a background thread and iterate over its answer tokens.
+
+    Once iteration finishes, the chain's full output dict is available as `result`.
+    """
+
+    def __init__(self, chain, inputs, callbacks=None):
+        self.result = None
+        self._error = None
+        self._tokens = queue.Queue()
+        # The chain runs in a copy of the caller's context, so it sees the caller's current tracing span.
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run, chain, inputs, callbacks or []), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, chain, inputs, callbacks):
+        try:
+            self.result = chain.invoke(inputs, config={"callbacks": [AnswerTokenHandler(self._tokens), *callbacks]})
+        except Exception as e:
+            self._error = e
+        finally:
+            self._tokens.put(_DONE)
+
+    def __iter__(self):
+        while True:
+            token = self._tokens.get()
+            if token is _DONE:
+                break
+            yield token
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def separator_of(whitespace):
+    """
+    Normalize the whitespace between two sentences: its line breaks if it has any, otherwise a single space (or nothing).
+    """
+    if "\n" in whitespace:
+        return "\n" * whitespace.count("\n")
+    return " " if whitespace else ""
+
+
+def split_sentences(tokens, min_chars=40):
+    """
+    Group a stream of tokens into sentences as soon as each one is complete.
+
+    Sentences shorter than min_chars are merged with the next one on the same line so that very short fragments don't each
+    cost a Bhashini call. A line break always ends a sentence, so lists and paragraphs keep their layout.
+
+    Args:
+        tokens (Iterable[str]): The streamed LLM tokens.
+        min_chars (int): Minimum length of an emitted sentence within a line (the last one of a line may be shorter).
+
+    Yields:
+        Tuple[str, str]: The next complete sentence and the separator that followed it ("" after the last one).
+    """
+    buffer = ""
+    pending = ""
+    pending_separator = ""
+    for token in tokens:
+        buffer += token
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            # Whitespace running up to the end of the buffer may still grow into a line break.
+            if match.end() == len(buffer):
+                break
+            sentence = buffer[start:match.start()].strip()
+            start = match.end()
+            if not sentence:
+                continue
+            separator = separator_of(match.group())
+            if pending:
+                sentence = f"{pending}{pending_separator}{sentence}"
+            if "\n" in separator or len(sentence) >= min_chars:
+                yield sentence, separator
+                pending = ""
+            else:
+                pending, pending_separator = sentence, separator
+        buffer = buffer[start:]
+    sentence = buffer.strip()
+    if pending:
+        sentence = f"{pending}{pending_separator}{sentence}" if sentence else pending
+    if sentence:
+        yield sentence, ""
+
+
+def pipeline_segments(sentences, process):
+    """
+    Process sentences concurrently while the answer is still streaming, yielding results in order.
+
+    Sentences are read on a background thread, so a finished segment is yielded as soon as it is ready instead of waiting for the next sentence.
+
+    Args:
+        sentences (Iterable[Any]): The sentences as they become available.
+        process (Callable[[Any], concurrent.futures.Future]): Starts translation and TTS of one sentence.
+
+    Yields:
+        Tuple[Any, Any]: Each sentence with the result of its future, in sentence order.
+    """
+    futures = queue.Queue()
+
+    def feed():
+        try:
+            for sentence in sentences:
+                futures.put((sentence, process(sentence)))
+        except Exception as e:
+            futures.put(e)
+        finally:
+            futures.put(_DONE)
+
+    threading.Thread(target=contextvars.copy_context().run, args=(feed,), daemon=True).start()
+    while True:
+        item = futures.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        sentence, future = item
+        yield sentence, future.result()
+
+
+def join_wav(segments):
+    """
+    Concatenate WAV clips that share the same format into a single WAV.
+
+    Args:
+        segments (list[bytes]): The WAV clips, in order.
+
+    Returns:
+        bytes: One WAV file containing every clip.
+    """
+    if len(segments) == 1:
+        return segments[0]
+    output = io.BytesIO()
+    with wave.open(output, "wb") as joined:
+        for index, segment in enumerate(segments):
+            with wave.open(io.BytesIO(segment), "rb") as clip:
+                if index == 0:
+                    joined.setparams(clip.getparams())
+                joined.writeframes(clip.readframes(clip.getnframes()))
+    return output.getvalue()
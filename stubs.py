@@ -0,0 +1,283 @@
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import wave
+import zlib
+from typing import Any, Iterator, List, Optional, Sequence
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun, Callbacks
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Deterministic local stand-ins for the embedding model, ChatCerebras, the Cohere reranker and the ULCA/Bhashini endpoints,
+# so benchmarks and load tests run offline without spending API quota. install() plugs them into the app.
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "for", "give", "i", "in", "is", "list", "me", "of", "on", "please", "show", "the", "there",
+    "to", "what", "where", "which", "with",
+}
+
+# Rows of the retrieved context quoted by the stub answers.
+ANSWER_LINES = 3
+
+# Sample rate of the silent audio returned by the stub TTS.
+STUB_SAMPLE_RATE = 8000
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings from hashed word unigrams and bigrams: deterministic, instant, and close enough to rank lexically similar texts.
+    """
+
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = tokenize(text)
+        for feature in tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            vector[digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model answering the app's prompts without an API call, after an injected latency.
+
+    It recognizes the prompts it is sent by their wording: condensing returns the follow-up question as it is, answering quotes
+    the first rows of the context, and summarizing keeps the last lines of the conversation. Anything else gets "NO_OUTPUT",
+    which the LLM extractor reads as "nothing relevant".
+    """
+
+    model: str = "stub"
+    temperature: float = 0
+    streaming: bool = False
+    latency: float = 0.0
+    """Seconds before the first token."""
+    token_latency: float = 0.0
+    """Seconds between tokens."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def respond(self, prompt):
+        if "Follow Up Input:" in prompt:
+            question = prompt.split("Follow Up Input:", 1)[1]
+            return question.split("Standalone question", 1)[0].strip()
+        if "Context:" in prompt:
+            context = prompt.split("Context:", 1)[1].split("Human:", 1)[0]
+            lines = [line.strip() for line in context.splitlines() if line.strip()][:ANSWER_LINES]
+            if not lines:
+                return "I don't know, the documents don't say."
+            return "Here is what I found. " + " ".join(f"{line.rstrip('.')}." for line in lines)
+        if "New summary:" in prompt:
+            # The prompt's example also has these headings; the conversation is under the last ones.
+            summary, new_lines = prompt.rsplit("Current summary:", 1)[1].split("New lines of conversation:", 1)
+            lines = [line.strip() for line in (summary + new_lines).splitlines() if line.strip()]
+            return " ".join(line for line in lines if not line.startswith("New summary"))[-500:]
+        return "NO_OUTPUT"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        text = self.respond("\n".join(str(message.content) for message in messages))
+        time.sleep(self.latency + self.token_latency * len(text.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self.respond("\n".join(str(message.content) for message in messages))
+        time.sleep(self.latency)
+        for token in re.findall(r"\S+\s*", text):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class StubReranker(BaseDocumentCompressor):
+    """
+    Reranker scoring documents by the fraction of the query's words they contain, after an injected latency.
+
+    Scores are in [0, 1] like Cohere's relevance scores, so the app's RelevanceScoreFilter keeps working.
+    """
+
+    top_n: int = 5
+    latency: float = 0.0
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        time.sleep(self.latency)
+        query_tokens = set(tokenize(query))
+        scored = []
+        for document in documents:
+            overlap = len(query_tokens & set(tokenize(document.page_content)))
+            scored.append((overlap / len(query_tokens) if query_tokens else 0.0, document))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        reranked = []
+        for score, document in scored[:self.top_n]:
+            document = Document(page_content=document.page_content, metadata={**document.metadata, "relevance_score": score})
+            reranked.append(document)
+        return reranked
+
+
+def silent_wav(seconds):
+    """
+    Get a silent mono 16-bit WAV of the given length.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(STUB_SAMPLE_RATE)
+        f.writeframes(b"\x00\x00" * int(seconds * STUB_SAMPLE_RATE))
+    return buffer.getvalue()
+
+
+class StubULCA:
+    """
+    Answers ULCA getModelsPipeline and inference requests locally: translation returns the text as it is,
+    TTS returns silence (a tenth of a second per word), and ASR returns the transcript registered for the audio.
+
+    Every request waits `latency` seconds, plus up to `jitter` more, drawn from a seeded generator.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, default_transcript="Where is the nearest Model Career Centre?"):
+        self.latency = latency
+        self.jitter = jitter
+        self.default_transcript = default_transcript
+        self.requests = 0
+        self._transcripts = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def register_audio(self, audio, transcript):
+        """
+        Make ASR of the given WAV bytes return transcript.
+        """
+        self._transcripts[base64.b64encode(audio).decode("utf-8")] = transcript
+
+    def delay(self):
+        with self._lock:
+            self.requests += 1
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def respond(self, url, data):
+        payload = json.loads(data)
+        tasks = [task["taskType"] for task in payload["pipelineTasks"]]
+        if "inputData" not in payload:
+            return {
+                "pipelineResponseConfig": [{"config": [{"serviceId": f"stub-{tasks[0]}"}]}],
+                "pipelineInferenceAPIEndPoint": {"callbackUrl": "stub://inference", "inferenceApiKey": {"value": "stub"}},
+            }
+
+        input_data = payload["inputData"]
+        if "audio" in input_data:
+            texts = [self._transcripts.get(audio["audioContent"], self.default_transcript) for audio in input_data["audio"]]
+        else:
+            texts = [item["source"] for item in input_data["input"]]
+        responses = []
+        for task in tasks:
+            if task == "tts":
+                audio = [
+                    {"audioContent": base64.b64encode(silent_wav(0.1 * len(text.split()))).decode("utf-8")} for text in texts
+                ]
+                responses.append({"taskType": task, "audio": audio})
+            else:
+                responses.append({"taskType": task, "output": [{"source": text, "target": text} for text in texts]})
+        return {"pipelineResponse": responses}
+
+
+class StubULCATransport(StubULCA):
+    """Drop-in for bhashini_translator.Transport; see StubULCA."""
+
+    def postJson(self, url, data, headers):
+        time.sleep(self.delay())
+        return self.respond(url, data)
+
+    def close(self):
+        pass
+
+
+class StubAsyncULCATransport(StubULCA):
+    """Drop-in for bhashini_translator.AsyncTransport; see StubULCA."""
+
+    async def postJson(self, url, data, headers):
+        await asyncio.sleep(self.delay())
+        return self.respond(url, data)
+
+    async def close(self):
+        pass
+
+
+def install(llm_latency=0.0, token_latency=0.0, reranker_latency=0.0, bhashini_latency=0.0, bhashini_jitter=0.0,
+            embeddings=True, seed=0):
+    """
+    Replace every remote service of the app with the local stubs, for this process.
+
+    Args:
+        llm_latency (float): Seconds before the first token of every chat model call.
+        token_latency (float): Seconds between tokens of every chat model call.
+        reranker_latency (float): Seconds per rerank call.
+        bhashini_latency (float): Seconds per ULCA request.
+        bhashini_jitter (float): Extra random seconds per ULCA request, at most.
+        embeddings (bool): Also replace the embedding model with HashingEmbeddings.
+        seed (int): Seed of the ULCA latency jitter.
+
+    Returns:
+        StubAsyncULCATransport: The transport used by the app's (async) Bhashini clients, to register ASR transcripts on.
+    """
+    import resources
+    from bhashini_translator import setAsyncTransport, setTransport
+    from rerankers import set_reranker_factory
+
+    # Bhashini clients refuse to start without credentials; the stubs never check them.
+    os.environ.setdefault("userId", "stub")
+    os.environ.setdefault("ulcaApiKey", "stub")
+    async_transport = StubAsyncULCATransport(bhashini_latency, bhashini_jitter, seed)
+    setTransport(StubULCATransport(bhashini_latency, bhashini_jitter, seed))
+    setAsyncTransport(async_transport)
+    resources.set_chat_model_factory(
+        lambda **kwargs: StubChatModel(latency=llm_latency, token_latency=token_latency, **kwargs)
+    )
+    set_reranker_factory(lambda top_n: StubReranker(top_n=top_n, latency=reranker_latency))
+    if embeddings:
+        resources.set_resource("embedding_function", HashingEmbeddings())
+    return async_transport
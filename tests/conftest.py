@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+
+class StubServer:
+    """
+    Local HTTP server answering each path with a queue of (status, body, delay) responses; the last one repeats.
+
+    A callable body is called with the decoded request payload and returns the response body.
+    """
+
+    def __init__(self, responses):
+        self.responses = {path: list(queue) for path, queue in responses.items()}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests.append(self.path)
+                queue = stub.responses[self.path]
+                status, body, delay = queue.pop(0) if len(queue) > 1 else queue[0]
+                time.sleep(delay)
+                if callable(body):
+                    body = body(json.loads(data))
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(responses):
+        servers.append(StubServer(responses))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def echo_inference(request, delay=None):
+    """
+    Answer an inference request like ULCA: translations are the uppercased sources, audio is "audio:<source>".
+
+    delay(sources), if given, is called first and may sleep, e.g. to make some batches slower than others.
+    """
+    sources = [item["source"] for item in request["inputData"]["input"]]
+    if delay is not None:
+        delay(sources)
+    taskType = request["pipelineTasks"][0]["taskType"]
+    if taskType == "tts":
+        return {"pipelineResponse": [{"audio": [{"audioContent": f"audio:{source}"} for source in sources]}]}
+    return {"pipelineResponse": [{"output": [{"source": source, "target": source.upper()} for source in sources]}]}
+
+
+@pytest.fixture
+def ulca_server(stub_server, monkeypatch):
+    """
+    Start a stub of the getModelsPipeline ("/config") and inference ("/inference") endpoints, with credentials set.
+    """
+    monkeypatch.setenv("userId", "user")
+    monkeypatch.setenv("ulcaApiKey", "key")
+
+    def start(delay=None):
+        server = stub_server({})
+        pipeline = {
+            "pipelineResponseConfig": [{"config": [{"serviceId": "service"}]}],
+            "pipelineInferenceAPIEndPoint": {"callbackUrl": f"{server.url}/inference", "inferenceApiKey": {"value": "key"}},
+        }
+        server.responses = {
+            "/config": [(200, pipeline, 0)],
+            "/inference": [(200, lambda request: echo_inference(request, delay), 0)],
+        }
+        return server
+
+    return start
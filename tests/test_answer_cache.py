@@ -0,0 +1,143 @@
+import re
+from typing import List
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.retrievers import BaseRetriever
+from answer_cache import CachedConversationalRetrievalChain, SemanticAnswerCache
+from metadata_index import EntityExtractor, MetadataIndex
+
+SYNONYMS = {"show": "list", "centers": "centres", "center": "centres"}
+VOCABULARY = ["list", "jss", "centres", "near", "in", "assam", "mcc", "where", "is"]
+
+
+class WordEmbeddings(Embeddings):
+    """
+    Bag-of-words embeddings over a small vocabulary: synonyms embed alike, and PINs and district names don't count at all,
+    like sentence embeddings that barely move when only a number or a place name changes.
+    """
+
+    def embed_query(self, text):
+        vector = np.zeros(len(VOCABULARY))
+        for word in re.findall(r"\w+", text.lower()):
+            word = SYNONYMS.get(word, word)
+            if word in VOCABULARY:
+                vector[VOCABULARY.index(word)] += 1
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def make_extractor(tmp_path):
+    path = str(tmp_path / "metadata_index.json")
+    rows = [
+        ("a", "Name: JSS Guntur; District: Guntur; State: Andhra Pradesh; Pin Code: 522001"),
+        ("b", "Name: JSS Ongole; District: Prakasam; State: Andhra Pradesh; Pin Code: 523002"),
+    ]
+    MetadataIndex.update(path, [
+        Document(page_content=text, metadata={"id": chunk_id, "source": "data/Jan_Shikshan_Sansthan.pdf"})
+        for chunk_id, text in rows
+    ])
+    return EntityExtractor(MetadataIndex(path))
+
+
+def make_cache(tmp_path, **kwargs):
+    return SemanticAnswerCache(WordEmbeddings(), extractor=make_extractor(tmp_path), **kwargs)
+
+
+def test_paraphrase_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("List JSS centres in Guntur", "JSS Guntur", [Document(page_content="row")])
+
+    cached, similarity = cache.lookup("show jss centers in guntur")
+
+    assert cached is not None and cached.answer == "JSS Guntur"
+    assert similarity > 0.99
+
+
+def test_different_pin_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("JSS centres near 522001", "JSS Guntur", [])
+
+    assert cache.lookup("JSS centres near 522002")[0] is None
+    assert cache.lookup("JSS centres near 522001")[0] is not None
+
+
+def test_different_district_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("List JSS in Guntur", "JSS Guntur", [])
+
+    assert cache.lookup("List JSS in Prakasam")[0] is None
+    # The embeddings alone can't tell the two apart.
+    without_extractor = SemanticAnswerCache(WordEmbeddings())
+    without_extractor.store("List JSS in Guntur", "JSS Guntur", [])
+    assert without_extractor.lookup("List JSS in Prakasam")[0] is not None
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    entry = cache.store("List JSS in Guntur", "JSS Guntur", [])
+    assert cache.lookup("List JSS in Guntur")[0] is entry
+
+    entry.created -= 61
+
+    assert cache.lookup("List JSS in Guntur")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.store("List JSS in Guntur", "Guntur", [])
+    cache.store("List JSS in Prakasam", "Prakasam", [])
+    assert cache.lookup("List JSS in Guntur")[0] is not None
+
+    cache.store("List JSS in Assam", "Assam", [])
+
+    assert cache.lookup("List JSS in Prakasam")[0] is None
+    assert cache.lookup("List JSS in Guntur")[0].answer == "Guntur"
+    assert cache.lookup("List JSS in Assam")[0].answer == "Assam"
+
+
+def test_version_change_invalidates(tmp_path):
+    version_path = tmp_path / "index_version.txt"
+    version_path.write_text("1\n")
+    cache = make_cache(tmp_path, version_path=str(version_path))
+    cache.store("List JSS in Guntur", "JSS Guntur", [])
+    assert cache.lookup("List JSS in Guntur")[0] is not None
+
+    version_path.write_text("2\n")
+
+    assert cache.lookup("List JSS in Guntur")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+class CountingRetriever(BaseRetriever):
+    calls: int = 0
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        self.calls += 1
+        return [Document(page_content="Name: JSS Guntur; District: Guntur")]
+
+
+def test_chain_answers_repeated_question_from_cache(tmp_path):
+    retriever = CountingRetriever()
+    chain = CachedConversationalRetrievalChain.from_llm(
+        llm=FakeListLLM(responses=["JSS Guntur is on Station Road."]),
+        retriever=retriever,
+        return_source_documents=True,
+        return_generated_question=True,
+        answer_cache=make_cache(tmp_path),
+    )
+
+    first = chain.invoke({"question": "List JSS in Guntur", "chat_history": []})
+    second = chain.invoke({"question": "Show JSS in Guntur", "chat_history": []})
+
+    assert first["cache_hit"] is False and second["cache_hit"] is True
+    assert second["answer"] == first["answer"] == "JSS Guntur is on Station Road."
+    assert second["cached_answer"] is first["cached_answer"]
+    assert second["source_documents"] == first["source_documents"]
+    assert second["generated_question"] == "Show JSS in Guntur"
+    assert retriever.calls == 1
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from conftest import echo_inference
+from bhashini_translator import AsyncBhashini, AsyncTransport, PipelineConfigCache, ResultCache, RetryPolicy
+
+
+def start_server(stub_server, monkeypatch, received):
+    """
+    Stub ULCA whose translation and TTS pipelines have different inference endpoints; the TTS endpoint answers slowly.
+    """
+    monkeypatch.setenv("userId", "user")
+    monkeypatch.setenv("ulcaApiKey", "key")
+    server = stub_server({})
+
+    def config(request):
+        taskType = request["pipelineTasks"][0]["taskType"]
+        return {
+            "pipelineResponseConfig": [{"config": [{"serviceId": f"{taskType}-service"}]}],
+            "pipelineInferenceAPIEndPoint": {"callbackUrl": f"{server.url}/{taskType}", "inferenceApiKey": {"value": "key"}},
+        }
+
+    def inference(request):
+        received.append(request)
+        return echo_inference(request)
+
+    def slowInference(request):
+        time.sleep(0.2)
+        return inference(request)
+
+    server.responses = {
+        "/config": [(200, config, 0)],
+        "/translation": [(200, inference, 0)],
+        "/tts": [(200, slowInference, 0)],
+    }
+    return server
+
+
+def run(server, calls, **kwargs):
+    async def main():
+        transport = AsyncTransport(retryPolicy=RetryPolicy(maxRetries=0))
+        client = AsyncBhashini("hi", "en", transport=transport, **kwargs)
+        client.ulcaEndPoint = f"{server.url}/config"
+        client.configCache = PipelineConfigCache()
+        client.resultCache = ResultCache(diskPath=None)
+        try:
+            return client, await asyncio.gather(*(call(client) for call in calls))
+        finally:
+            await transport.close()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_use_their_own_pipeline(stub_server, monkeypatch):
+    received = []
+    server = start_server(stub_server, monkeypatch, received)
+
+    client, results = run(server, [
+        lambda client: client.tts("namaste"),
+        lambda client: client.translate("dhanyavaad"),
+        lambda client: client.tts_batch(["ek", "do"]),
+        lambda client: client.translate_batch(["teen", "char"]),
+    ])
+
+    assert results == ["audio:namaste", "DHANYAVAAD", ["audio:ek", "audio:do"], ["TEEN", "CHAR"]]
+    assert sorted(server.requests) == sorted(["/config"] * 2 + ["/translation"] * 2 + ["/tts"] * 2)
+    # Nothing about the last request is left on the shared client.
+    assert "pipeLineData" not in vars(client)
+
+
+def test_constructor_takes_gender(stub_server, monkeypatch):
+    received = []
+    server = start_server(stub_server, monkeypatch, received)
+
+    client, (audio,) = run(server, [lambda client: client.tts("namaste")], gender="male")
+
+    assert audio == "audio:namaste"
+    assert client.gender == "male"
+    assert received[0]["pipelineTasks"][0]["config"]["gender"] == "male"
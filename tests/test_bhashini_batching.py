@@ -0,0 +1,105 @@
+import asyncio
+import time
+from bhashini_translator import (
+    AsyncBhashini,
+    AsyncTransport,
+    Bhashini,
+    PipelineConfigCache,
+    ResultCache,
+    RetryPolicy,
+    Transport,
+)
+from bhashini_translator.config import maxBatchChars, maxBatchSize
+from bhashini_translator.payloads import splitBatches
+
+
+def test_split_batches_by_item_count():
+    texts = [f"text {index}" for index in range(7)]
+
+    assert list(splitBatches(texts, maxItems=3, maxChars=1000)) == [texts[0:3], texts[3:6], texts[6:7]]
+
+
+def test_split_batches_by_characters():
+    texts = ["aaaa", "bbbb", "cc", "dddd", "e"]
+
+    assert list(splitBatches(texts, maxItems=10, maxChars=10)) == [["aaaa", "bbbb", "cc"], ["dddd", "e"]]
+
+
+def test_oversized_text_is_sent_alone():
+    texts = ["short", "x" * 50, "tail"]
+
+    assert list(splitBatches(texts, maxItems=10, maxChars=20)) == [["short"], ["x" * 50], ["tail"]]
+    assert list(splitBatches(["x" * 50], maxItems=10, maxChars=20)) == [["x" * 50]]
+    assert list(splitBatches([])) == []
+
+
+def test_default_limits():
+    batches = list(splitBatches(["word"] * (maxBatchSize + 1)))
+    assert [len(batch) for batch in batches] == [maxBatchSize, 1]
+    batches = list(splitBatches(["x" * (maxBatchChars // 2 + 1)] * 2))
+    assert len(batches) == 2
+
+
+def make_client(cls, server, **kwargs):
+    client = cls("hi", "en", **kwargs)
+    client.ulcaEndPoint = f"{server.url}/config"
+    client.configCache = PipelineConfigCache()
+    client.resultCache = ResultCache(diskPath=None)
+    return client
+
+
+def fast_transport():
+    return Transport(readTimeout=5, retryPolicy=RetryPolicy(maxRetries=0))
+
+
+def texts(count):
+    return [f"line {index}" for index in range(count)]
+
+
+def test_translate_batch_keeps_order_across_requests(ulca_server):
+    server = ulca_server()
+    client = make_client(Bhashini, server, transport=fast_transport())
+    inputs = texts(2 * maxBatchSize + 3)
+    client.resultCache.set(
+        client.getResultCacheKey(("translation",), inputs[5], client.getServiceIds(("translation",))), "CACHED"
+    )
+
+    translations = client.translate_batch(inputs + [inputs[0]])
+
+    expected = [text.upper() for text in inputs]
+    expected[5] = "CACHED"
+    assert translations == expected + [inputs[0].upper()]
+    # One config fetch, then the uncached, de-duplicated texts in as few requests as the limits allow.
+    assert server.requests == ["/config"] + ["/inference"] * 3
+
+
+def test_tts_batch_keeps_order_across_requests(ulca_server):
+    server = ulca_server()
+    client = make_client(Bhashini, server, transport=fast_transport())
+    inputs = texts(maxBatchSize + 1)
+
+    assert client.tts_batch(inputs) == [f"audio:{text}" for text in inputs]
+    assert server.requests.count("/inference") == 2
+
+
+def test_async_batches_keep_order_when_later_requests_finish_first(ulca_server):
+    def firstBatchSlow(sources):
+        if "line 0" in sources:
+            time.sleep(0.3)
+
+    server = ulca_server(delay=firstBatchSlow)
+    inputs = texts(3 * maxBatchSize)
+
+    async def run():
+        transport = AsyncTransport(retryPolicy=RetryPolicy(maxRetries=0))
+        client = make_client(AsyncBhashini, server, transport=transport)
+        try:
+            return await asyncio.gather(client.translate_batch(inputs), client.tts_batch(inputs))
+        finally:
+            await transport.close()
+
+    translations, audios = asyncio.run(run())
+
+    assert translations == [text.upper() for text in inputs]
+    assert audios == [f"audio:{text}" for text in inputs]
+    assert server.requests.count("/inference") == 6
@@ -0,0 +1,53 @@
+import pytest
+from bhashini_translator import (
+    Bhashini,
+    BhashiniAuthError,
+    BhashiniTimeoutError,
+    PipelineConfigCache,
+    ResultCache,
+    RetryPolicy,
+    Transport,
+)
+
+
+def fast_transport(readTimeout=5):
+    return Transport(readTimeout=readTimeout, retryPolicy=RetryPolicy(maxRetries=3, backoffFactor=0))
+
+
+def test_retries_503_then_succeeds(stub_server):
+    server = stub_server({"/inference": [(503, {}, 0), (200, {"ok": True}, 0)]})
+
+    assert fast_transport().postJson(f"{server.url}/inference", data="{}", headers={}) == {"ok": True}
+    assert server.requests == ["/inference", "/inference"]
+
+
+def test_read_timeout_is_not_retried(stub_server):
+    server = stub_server({"/inference": [(200, {"ok": True}, 1)]})
+
+    with pytest.raises(BhashiniTimeoutError):
+        fast_transport(readTimeout=0.2).postJson(f"{server.url}/inference", data="{}", headers={})
+    assert server.requests == ["/inference"]
+
+
+def test_401_invalidates_pipeline_config(stub_server, monkeypatch):
+    monkeypatch.setenv("userId", "user")
+    monkeypatch.setenv("ulcaApiKey", "key")
+    server = stub_server({})
+    pipeline = {
+        "pipelineResponseConfig": [{"config": [{"serviceId": "nmt-service"}]}],
+        "pipelineInferenceAPIEndPoint": {"callbackUrl": f"{server.url}/inference", "inferenceApiKey": {"value": "old"}},
+    }
+    server.responses = {"/config": [(200, pipeline, 0)], "/inference": [(401, {}, 0)]}
+
+    client = Bhashini("hi", "en", transport=fast_transport())
+    client.ulcaEndPoint = f"{server.url}/config"
+    client.configCache = PipelineConfigCache()
+    client.resultCache = ResultCache(diskPath=None)
+
+    with pytest.raises(BhashiniAuthError):
+        client.translate("namaste")
+    assert client.configCache.get(client.getConfigCacheKey("translation")) is None
+    # The next call fetches a fresh config (and inference key) instead of reusing the rejected one.
+    with pytest.raises(BhashiniAuthError):
+        client.translate("namaste")
+    assert server.requests == ["/config", "/inference", "/config", "/inference"]
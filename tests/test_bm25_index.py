@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from bm25_index import BM25Index, tokenize
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+ROWS = {
+    "a": "Name: JSS Guntur; District: Guntur; State: Andhra Pradesh; Pin Code: 522001",
+    "b": "Name: JSS Ongole; District: Prakasam; State: Andhra Pradesh; Pin Code: 523002",
+    "c": "Name: Model Career Centre Guwahati; District: Kamrup; State: Assam",
+    "d": "Name: Model Career Centre Jorhat; District: Jorhat; State: Assam; Career counselling and job fairs",
+    "e": "Name: JSS Kamrup; District: Kamrup; State: Assam; Vocational training for adults",
+    "f": "Skill India centres offer vocational training and career guidance in every state",
+}
+QUERIES = ["JSS Guntur", "career centre assam", "vocational training kamrup", "andhra pradesh pin code", "jorhat"]
+
+
+class ReferenceBM25(rank_bm25.BM25Okapi):
+    """rank_bm25's Okapi BM25 with the non-negative idf BM25Index uses, log(1 + (N - df + 0.5) / (df + 0.5))."""
+
+    def _calc_idf(self, nd):
+        for word, freq in nd.items():
+            self.idf[word] = np.log1p((self.corpus_size - freq + 0.5) / (freq + 0.5))
+
+
+def chunks(ids):
+    return [Document(page_content=ROWS[chunk_id], metadata={"id": chunk_id}) for chunk_id in ids]
+
+
+def reference_search(ids, query, k=8, allowed_ids=None):
+    ids = sorted(ids)
+    reference = ReferenceBM25([tokenize(ROWS[chunk_id]) for chunk_id in ids])
+    scores = reference.get_scores(sorted(set(tokenize(query))))
+    results = [
+        (chunk_id, score) for chunk_id, score in zip(ids, scores)
+        if score > 0 and (allowed_ids is None or chunk_id in allowed_ids)
+    ]
+    return sorted(results, key=lambda result: result[1], reverse=True)[:k]
+
+
+def assert_matches_reference(index, ids, allowed_ids=None):
+    assert index.ids() == set(ids)
+    for query in QUERIES:
+        results = index.search(query, k=4, allowed_ids=allowed_ids)
+        expected = reference_search(ids, query, k=4, allowed_ids=allowed_ids)
+        assert [chunk_id for chunk_id, _ in results] == [chunk_id for chunk_id, _ in expected], query
+        assert [score for _, score in results] == pytest.approx([score for _, score in expected], rel=1e-5), query
+
+
+def test_scores_match_reference(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.update(chunks(ROWS), [])
+
+    assert_matches_reference(index, ROWS)
+    assert_matches_reference(BM25Index(str(tmp_path)), ROWS)
+
+
+def test_scores_match_reference_across_updates_and_merge(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.update(chunks("abc"), [])
+    assert index.update(chunks("def"), ["b"]) == (3, 1)
+    assert len(index.segments) == 2
+
+    assert_matches_reference(index, "acdef")
+    assert index.search("ongole prakasam") == []
+
+    index.merge()
+
+    assert len(index.segments) == 1
+    assert_matches_reference(index, "acdef")
+    assert_matches_reference(BM25Index(str(tmp_path)), "acdef")
+
+
+def test_deleted_chunk_is_restored_without_reindexing(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.update(chunks(ROWS), [])
+    index.update([], ["a"])
+    assert_matches_reference(index, "bcdef")
+
+    assert index.update(chunks("a"), []) == (1, 0)
+
+    assert len(index.segments) == 1
+    assert_matches_reference(index, ROWS)
+
+
+def test_allowed_ids_mask_results_but_not_statistics(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.update(chunks("abc"), [])
+    index.update(chunks("def"), [])
+    allowed_ids = {"a", "d", "e"}
+
+    assert_matches_reference(index, ROWS, allowed_ids=allowed_ids)
+    assert index.search("jss", allowed_ids=set()) == []
@@ -0,0 +1,90 @@
+import json
+import os
+from langchain_core.documents import Document
+from chunk_store import INDEX_FILE, ChunkStore
+
+
+def chunk(chunk_id, text, source="data/a.pdf"):
+    return Document(page_content=text, metadata={"id": chunk_id, "source": source})
+
+
+def test_append_replace_delete_round_trip(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.append([chunk("a", "first"), chunk("b", "second")])
+    store.append([chunk("a", "first, replaced")])
+    store.delete(["b"])
+
+    reopened = ChunkStore(str(tmp_path))
+
+    assert reopened.ids() == ["a"]
+    assert reopened.get("a").page_content == "first, replaced"
+    assert reopened.get("a").metadata == {"id": "a", "source": "data/a.pdf"}
+    assert reopened.get("b") is None
+    assert "b" not in reopened and len(reopened) == 1
+
+
+def test_update_compacts_once_most_of_the_blob_is_dead(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.update([chunk(str(i), f"row {i}") for i in range(4)], [])
+
+    assert store.update([chunk("4", "row 4")], ["0", "1", "2", "missing"]) == (1, 3)
+
+    assert store.dead_bytes() == 0
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".bin")] == [os.path.basename(store.blob_path)]
+    assert sorted(chunk.page_content for chunk in ChunkStore(str(tmp_path))) == ["row 3", "row 4"]
+
+
+def test_sources_of_legacy_index_lines(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.append([chunk("a", "first", "data/a.pdf"), chunk("b", "second", "data/b.pdf")])
+    # Index lines written before sources were recorded.
+    index_path = os.path.join(tmp_path, INDEX_FILE)
+    with open(index_path) as f:
+        entries = [json.loads(line) for line in f]
+    with open(index_path, "w") as f:
+        f.write("".join(json.dumps({key: value for key, value in entry.items() if key != "source"}) + "\n" for entry in entries))
+
+    legacy = ChunkStore(str(tmp_path))
+
+    assert legacy.sources() == {"a": "data/a.pdf", "b": "data/b.pdf"}
+    legacy.compact()
+    assert ChunkStore(str(tmp_path)).sources() == {"a": "data/a.pdf", "b": "data/b.pdf"}
+
+
+def test_reader_across_compaction(tmp_path):
+    writer = ChunkStore(str(tmp_path))
+    writer.append([chunk("a", "first"), chunk("b", "second")])
+    mapped = ChunkStore(str(tmp_path))
+    assert mapped.get("a").page_content == "first"
+    unmapped = ChunkStore(str(tmp_path))
+
+    writer.delete(["b"])
+    writer.compact()
+    writer.append([chunk("c", "third")])
+
+    # A reader that mapped the old blob keeps reading it; one that didn't reloads the index when the blob is gone.
+    assert mapped.get("a").page_content == "first"
+    assert unmapped.get("a").page_content == "first"
+    for reader in (mapped, unmapped):
+        reader.refresh()
+        assert sorted(reader.ids()) == ["a", "c"]
+        assert reader.get("c").page_content == "third"
+        assert reader.get("b") is None
+
+
+def test_partially_written_index_line_is_skipped(tmp_path):
+    writer = ChunkStore(str(tmp_path))
+    writer.append([chunk("a", "first")])
+    index_path = os.path.join(tmp_path, INDEX_FILE)
+    line = json.dumps({"id": "a", "deleted": True}) + "\n"
+    with open(index_path, "a") as f:
+        f.write(line[:10])
+
+    reader = ChunkStore(str(tmp_path))
+    assert reader.ids() == ["a"]
+
+    with open(index_path, "a") as f:
+        f.write(line[10:])
+    reader.refresh()
+
+    assert reader.ids() == []
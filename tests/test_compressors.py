@@ -0,0 +1,67 @@
+from langchain_core.documents import Document
+from compressors import ExtractiveCompressor, split_units
+from stubs import HashingEmbeddings
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+def row(text, chunk_id=None):
+    return Document(page_content=text, metadata={"id": chunk_id or text})
+
+
+def test_split_units():
+    assert split_units("Name: JSS Guntur\n\nName: JSS Ongole") == ["Name: JSS Guntur", "Name: JSS Ongole"]
+    assert split_units("JSS offers courses. Fees are low! Apply online") == ["JSS offers courses.", "Fees are low!", "Apply online"]
+
+
+def test_multi_row_document_keeps_matching_rows_in_order():
+    document = row(
+        "Name: JSS Guntur; District: Guntur\nName: MCC Kamrup; District: Kamrup\nName: JSS Tenali; District: Guntur", "chunk"
+    )
+
+    [compressed] = ExtractiveCompressor().compress_documents([document], "JSS in Guntur")
+
+    assert compressed.page_content == "Name: JSS Guntur; District: Guntur\nName: JSS Tenali; District: Guntur"
+    assert compressed.metadata == {"id": "chunk"}
+
+
+def test_low_scoring_single_rows_are_dropped_whole():
+    embeddings = CountingEmbeddings()
+    rows = [
+        row("Name: JSS Guntur; District: Guntur; State: Andhra Pradesh"),
+        row("Name: MCC Kamrup; District: Kamrup; State: Assam"),
+        row("Name: JSS Tenali; District: Guntur; State: Andhra Pradesh"),
+        row("Name: ITI Ongole; District: Prakasam; State: Andhra Pradesh"),
+    ]
+
+    compressed = ExtractiveCompressor(embeddings=embeddings).compress_documents(rows, "JSS centres in Guntur")
+
+    assert compressed == [rows[0], rows[2]]
+    # Rows are scored lexically only.
+    assert embeddings.texts == []
+
+
+def test_rows_are_kept_when_none_matches_the_query():
+    rows = [row("Name: JSS Guntur"), row("Name: MCC Kamrup")]
+
+    assert ExtractiveCompressor().compress_documents(rows, "how do I apply?") == rows
+    assert ExtractiveCompressor().compress_documents(rows[:1], "MCC") == rows[:1]
+
+
+def test_rows_and_multi_row_documents_together():
+    rows = [row("Name: JSS Guntur; District: Guntur"), row("Name: MCC Kamrup; District: Kamrup")]
+    text = row("JSS Guntur runs tailoring courses. The office is closed on Sundays.", "text")
+
+    compressed = ExtractiveCompressor().compress_documents([rows[0], text, rows[1]], "JSS Guntur courses")
+
+    assert compressed[0] is rows[0]
+    assert compressed[1].page_content == "JSS Guntur runs tailoring courses."
+    assert len(compressed) == 2
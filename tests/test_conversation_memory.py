@@ -0,0 +1,125 @@
+import threading
+import time
+from langchain_core.runnables import RunnableLambda
+from conversation_memory import BoundedConversationMemory, count_tokens, truncate_tokens
+
+
+class FakeSummarizer:
+    """
+    Stands in for the summary LLM: the new summary is the old one plus the questions of the new lines.
+
+    With `gate`, every call waits until the gate is set.
+    """
+
+    def __init__(self, gate=None, padding=""):
+        self.gate = gate
+        self.padding = padding
+        self.calls = 0
+        self.llm = RunnableLambda(self.summarize)
+
+    def summarize(self, prompt):
+        self.calls += 1
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        text = prompt.to_string()
+        # The prompt opens with a worked example; the actual summary and lines come last.
+        current = text.rsplit("Current summary:\n", 1)[1].split("\n\nNew lines of conversation:", 1)[0].strip()
+        lines = text.rsplit("New lines of conversation:\n", 1)[1].split("\n\nNew summary:", 1)[0]
+        questions = [line[len("Human: "):] for line in lines.splitlines() if line.startswith("Human: ")]
+        return " ".join([current, *questions, self.padding]).strip()
+
+
+def memory(llm=None, **kwargs):
+    return BoundedConversationMemory(llm=llm, return_messages=True, output_key="answer", **kwargs)
+
+
+def say(memory, number):
+    memory.save_context({"question": f"question {number}"}, {"answer": f"answer {number}"})
+
+
+def wait_for_summary(memory):
+    deadline = time.monotonic() + 5
+    while memory._summarizing:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def history(memory):
+    return [message.content for message in memory.load_memory_variables({})["chat_history"]]
+
+
+def test_turns_beyond_keep_turns_are_summarized():
+    summarizer = FakeSummarizer()
+    conversation = memory(summarizer.llm, keep_turns=2)
+    for number in range(4):
+        say(conversation, number)
+    wait_for_summary(conversation)
+
+    assert "question 0" in conversation.summary and "question 1" in conversation.summary
+    assert history(conversation) == [
+        f"Summary of the earlier conversation: {conversation.summary}",
+        "question 2", "answer 2", "question 3", "answer 3",
+    ]
+
+
+def test_moved_turns_are_returned_until_the_summary_is_ready():
+    gate = threading.Event()
+    conversation = memory(FakeSummarizer(gate).llm, keep_turns=1)
+    say(conversation, 0)
+    say(conversation, 1)
+
+    assert history(conversation) == ["question 0", "answer 0", "question 1", "answer 1"]
+    gate.set()
+    wait_for_summary(conversation)
+    assert history(conversation)[1:] == ["question 1", "answer 1"]
+
+
+def test_summary_is_held_to_its_share_of_the_budget():
+    conversation = memory(FakeSummarizer(padding="and so on " * 200).llm, keep_turns=1, max_token_limit=100)
+    for number in range(6):
+        say(conversation, number)
+        wait_for_summary(conversation)
+
+    assert 0 < count_tokens(conversation.summary) <= 50
+    assert sum(count_tokens(content) for content in history(conversation)) <= 100 + count_tokens("Summary of the earlier conversation: ")
+
+
+def test_without_llm_old_turns_are_dropped():
+    conversation = memory(keep_turns=1)
+    say(conversation, 0)
+    say(conversation, 1)
+
+    assert conversation.summary == ""
+    assert history(conversation) == ["question 1", "answer 1"]
+
+
+def test_clear_discards_a_summary_being_written():
+    gate = threading.Event()
+    summarizer = FakeSummarizer(gate)
+    conversation = memory(summarizer.llm, keep_turns=1)
+    say(conversation, 0)
+    say(conversation, 1)
+    assert summarizer.calls == 1 or conversation._summarizing
+
+    conversation.clear()
+    gate.set()
+    time.sleep(0.1)
+
+    assert conversation.summary == ""
+    assert history(conversation) == []
+
+    # The next conversation is summarized from scratch.
+    say(conversation, 2)
+    say(conversation, 3)
+    wait_for_summary(conversation)
+    assert conversation.summary == "question 2"
+
+
+def test_truncate_tokens_keeps_the_end():
+    text = " ".join(f"fact{number}" for number in range(200))
+
+    truncated = truncate_tokens(text, 20)
+
+    assert count_tokens(truncated) <= 20
+    assert text.endswith(truncated)
+    assert truncate_tokens("short", 20) == "short"
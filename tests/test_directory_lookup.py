@@ -0,0 +1,112 @@
+from typing import Any, Dict, List, Optional
+import pytest
+from langchain.chains.base import Chain
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.documents import Document
+from directory_lookup import DirectoryLookup, DirectoryRouterChain, DirectoryStore
+from metadata_index import EntityExtractor, MetadataIndex
+
+SOURCE = "data/Jan_Shikshan_Sansthan.pdf"
+
+
+def rows():
+    guntur = [
+        f"S.No: {number}; Name: JSS Guntur {number}; District: Guntur; State: Andhra Pradesh; Pin Code: 5220{number:02d}"
+        for number in range(1, 13)
+    ]
+    return guntur + ["S.No: 13; Name: JSS Ongole; District: Prakasam; State: Andhra Pradesh; Pin Code: 523002"]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    chunks = [
+        Document(page_content=row, metadata={"id": f"row-{number}", "source": SOURCE, "page": 1, "chunk_type": "table_row"})
+        for number, row in enumerate(rows())
+    ]
+    MetadataIndex.update(str(tmp_path / "metadata_index.json"), chunks)
+    DirectoryStore.update(str(tmp_path / "directory.sqlite"), chunks)
+    return DirectoryLookup(
+        DirectoryStore(str(tmp_path / "directory.sqlite")), EntityExtractor(MetadataIndex(str(tmp_path / "metadata_index.json")))
+    )
+
+
+@pytest.mark.parametrize("question", [
+    "List JSS centres in Guntur",
+    "please show the Jan Shikshan Sansthan in Prakasam",
+    "Which centres are there in Andhra Pradesh?",
+    "how many JSS are in Guntur district",
+    "Give me the addresses of JSS in Guntur",
+    "JSS near 523002 contact details",
+])
+def test_lookup_questions(directory, question):
+    assert directory.is_lookup(question)
+    assert directory.answer(question) is not None
+
+
+@pytest.mark.parametrize("question", [
+    "What is a Jan Shikshan Sansthan?",
+    "How do I apply to JSS Guntur?",
+    "Which courses does JSS Guntur offer?",
+    "List the documents required for admission in Guntur",
+    "Tell me about the fees at JSS Ongole",
+    "Why should I join a JSS?",
+])
+def test_questions_for_the_chain(directory, question):
+    assert directory.answer(question) is None
+
+
+def test_lookup_without_a_known_place_goes_to_the_chain(directory):
+    assert directory.is_lookup("List the centres in Assam")
+    assert directory.answer("List the centres in Assam") is None
+
+
+def test_more_pages_through_the_previous_lookup(directory):
+    first = directory.answer("List JSS in Guntur")
+
+    assert first.total == 12 and first.page == 0
+    assert first.answer.splitlines()[0] == "Found 12 results for Jan Shikshan Sansthan in Guntur. Showing 1-10:"
+    assert first.answer.splitlines()[1] == "1. JSS Guntur 1 - District: Guntur; State: Andhra Pradesh; Pin Code: 522001"
+    assert first.answer.splitlines()[-1] == 'Say "more" to see the next 2.'
+
+    second = directory.answer("more", first)
+
+    assert second.page == 1 and second.filters == first.filters
+    assert second.answer.splitlines()[0] == "Found 12 results for Jan Shikshan Sansthan in Guntur. Showing 11-12:"
+    assert "more" not in second.answer.splitlines()[-1]
+    assert directory.answer("Show more", second).answer == "That's all 12 results for Jan Shikshan Sansthan in Guntur."
+    # Without a previous lookup, "more" is an ordinary question.
+    assert directory.answer("more") is None
+
+
+class EchoChain(Chain):
+    """Stands in for the conversation chain: answers every question with its own text."""
+
+    questions: List[str] = []
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["question"]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return ["answer"]
+
+    def _call(self, inputs: Dict[str, Any], run_manager: Optional[CallbackManagerForChainRun] = None) -> Dict[str, Any]:
+        self.questions.append(inputs["question"])
+        return {"answer": f"chain: {inputs['question']}"}
+
+
+def test_router_sends_lookups_to_the_directory(directory):
+    chain = EchoChain()
+    router = DirectoryRouterChain(chain=chain, directory=directory)
+
+    lookup = router.invoke({"question": "List JSS in Guntur"})
+    more = router.invoke({"question": "more"})
+    explanation = router.invoke({"question": "How do I apply to JSS Guntur?"})
+    after = router.invoke({"question": "more"})
+
+    assert lookup["lookup"].page == 0 and more["lookup"].page == 1
+    assert explanation["answer"] == "chain: How do I apply to JSS Guntur?" and explanation["lookup"] is None
+    # The explanation ended the lookup, so "more" goes to the chain.
+    assert after["lookup"] is None
+    assert chain.questions == ["How do I apply to JSS Guntur?", "more"]
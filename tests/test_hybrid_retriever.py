@@ -0,0 +1,116 @@
+from typing import Any, List, Optional, Set
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from hybrid_retriever import HybridRetriever, get_last_timings
+from stubs import HashingEmbeddings
+
+
+def doc(chunk_id, text=None):
+    return Document(page_content=text or f"row {chunk_id}", metadata={"id": chunk_id})
+
+
+class FakeVectorStore:
+    """Returns fixed results for unfiltered and filtered searches, and records the filters it was given."""
+
+    def __init__(self, results, filtered_results=()):
+        self.embeddings = HashingEmbeddings()
+        self.results = results
+        self.filtered_results = list(filtered_results)
+        self.filters = []
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        self.filters.append(filter)
+        return (self.results if filter is None else self.filtered_results)[:k]
+
+
+class FakeKeywordRetriever(BaseRetriever):
+    results: List[Document] = []
+    filtered_results: List[Document] = []
+    allowed: List[Any] = []
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, allowed_ids: Optional[Set[str]] = None
+    ) -> List[Document]:
+        self.allowed.append(allowed_ids)
+        return self.results if allowed_ids is None else self.filtered_results
+
+
+class FakePrefilter:
+    def __init__(self, filters):
+        self._filters = filters
+
+    def filters(self, query):
+        return self._filters
+
+
+def ids(documents):
+    return [document.metadata["id"] for document in documents]
+
+
+def test_reciprocal_rank_fusion_order():
+    retriever = HybridRetriever(
+        vectorstore=FakeVectorStore([doc("a"), doc("b"), doc("c")]),
+        keyword_retriever=FakeKeywordRetriever(results=[doc("c"), doc("d")]),
+    )
+
+    # c: 1/63 + 1/61; a: 1/61; b and d: 1/62, in the order they were first seen.
+    assert ids(retriever.invoke("jss guntur")) == ["c", "a", "b", "d"]
+    assert set(get_last_timings()) == {"prefilter", "query_embedding", "vector_search", "keyword_search", "fusion", "total"}
+
+
+def test_weights_and_rank_constant():
+    retriever = HybridRetriever(
+        vectorstore=FakeVectorStore([]), keyword_retriever=FakeKeywordRetriever(), weights=(0.2, 0.8), c=0,
+    )
+
+    fused = retriever.fuse([[doc("a"), doc("b")], [doc("b"), doc("a")]])
+
+    # a: 0.2/1 + 0.8/2 = 0.6; b: 0.2/2 + 0.8/1 = 0.9.
+    assert ids(fused) == ["b", "a"]
+
+
+def test_fusion_deduplicates_by_id():
+    retriever = HybridRetriever(vectorstore=FakeVectorStore([]), keyword_retriever=FakeKeywordRetriever())
+    vector_a = doc("a", "row a from the vector store")
+
+    fused = retriever.fuse([[vector_a, doc("b")], [doc("a", "row a from the keyword index"), doc("b")]])
+
+    assert ids(fused) == ["a", "b"]
+    assert fused[0] is vector_a
+
+
+def test_prefiltered_search():
+    vectorstore = FakeVectorStore([doc("a")], filtered_results=[doc("g1"), doc("g2")])
+    keyword_retriever = FakeKeywordRetriever(results=[doc("a")], filtered_results=[doc("g2")])
+    where = {"id": {"$in": ["g1", "g2"]}}
+    retriever = HybridRetriever(
+        vectorstore=vectorstore, keyword_retriever=keyword_retriever, prefilter=FakePrefilter(({"g1", "g2"}, where)),
+    )
+
+    assert ids(retriever.invoke("jss in guntur")) == ["g2", "g1"]
+    assert vectorstore.filters == [where]
+    assert keyword_retriever.allowed == [{"g1", "g2"}]
+
+
+def test_falls_back_to_unfiltered_search_when_prefiltered_search_is_empty():
+    vectorstore = FakeVectorStore([doc("a"), doc("b")])
+    keyword_retriever = FakeKeywordRetriever(results=[doc("b")])
+    where = {"id": {"$in": ["gone"]}}
+    retriever = HybridRetriever(
+        vectorstore=vectorstore, keyword_retriever=keyword_retriever, prefilter=FakePrefilter(({"gone"}, where)),
+    )
+
+    assert ids(retriever.invoke("jss in guntur")) == ["b", "a"]
+    assert vectorstore.filters == [where, None]
+    assert keyword_retriever.allowed == [{"gone"}, None]
+
+
+def test_without_mentions_searches_everything():
+    vectorstore = FakeVectorStore([doc("a")])
+    keyword_retriever = FakeKeywordRetriever(results=[doc("a")])
+    retriever = HybridRetriever(vectorstore=vectorstore, keyword_retriever=keyword_retriever, prefilter=FakePrefilter(None))
+
+    assert ids(retriever.invoke("how do I apply?")) == ["a"]
+    assert vectorstore.filters == [None]
+    assert keyword_retriever.allowed == [None]
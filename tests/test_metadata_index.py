@@ -0,0 +1,129 @@
+import json
+import pytest
+from langchain_core.documents import Document
+import metadata_index
+from metadata_index import (
+    EntityExtractor,
+    MetadataIndex,
+    annotate,
+    extract_text_fields,
+    normalize_district,
+    normalize_state,
+)
+
+ROWS = {
+    "guntur": "Name: JSS Guntur; District: Guntur; State: Andhra Pradesh; Pin Code: 522001",
+    "ongole": "Name: JSS Ongole; District: Prakasam District; State: Andhra Pradesh; Pin Code: 523002",
+    "srinagar": "Name: MCC Srinagar; District: Srinagar; State: Jammu & Kashmir; Pin Code: 190001",
+    "cuttack": "Name: MCC Cuttack; District: Cuttack; State: Orissa; Pin Code: 753001",
+}
+
+
+def chunk(chunk_id, text, source="data/Jan_Shikshan_Sansthan.pdf"):
+    return Document(page_content=text, metadata={"id": chunk_id, "source": source})
+
+
+def build(path, rows=ROWS):
+    MetadataIndex.update(str(path), [chunk(chunk_id, text) for chunk_id, text in rows.items()])
+    return MetadataIndex(str(path))
+
+
+def test_normalization():
+    assert normalize_state("Jammu & Kashmir") == normalize_state("JAMMU AND KASHMIR.") == "jammu and kashmir"
+    assert normalize_state("Orissa") == "odisha"
+    assert normalize_district("Prakasam District") == normalize_district("prakasam") == "prakasam"
+
+
+def test_extract_fields_from_row():
+    fields = extract_text_fields(ROWS["srinagar"], "data/Model_Career_Centers.pdf")
+
+    assert fields == {
+        "state": {"jammu and kashmir"}, "district": {"srinagar"}, "pin": {"190001"}, "centre_type": {"model career centre"},
+    }
+
+
+def test_phone_numbers_are_not_pins():
+    row = "Name: JSS Guntur; Address: Station Road, Guntur-522001; Phone: 0863 222333; Mobile: 944 0123456"
+
+    assert extract_text_fields(row)["pin"] == {"522001"}
+    assert "pin" not in extract_text_fields("Name: JSS Guntur; Phone: 0863-222333")
+    assert "pin" not in extract_text_fields("Call 0863 222333 or 222333 for admissions.")
+    assert extract_text_fields("Write to the office, PIN 522 002.")["pin"] == {"522002"}
+
+
+def test_update_matches_a_rebuild(tmp_path):
+    index_path = tmp_path / "incremental.json"
+    build(index_path)
+    changed = {"guntur": ROWS["guntur"].replace("522001", "522004"), "tenali": "Name: JSS Tenali; District: Guntur"}
+
+    MetadataIndex.update(str(index_path), [chunk(chunk_id, text) for chunk_id, text in changed.items()], ["cuttack"])
+
+    rows = {**{chunk_id: text for chunk_id, text in ROWS.items() if chunk_id != "cuttack"}, **changed}
+    incremental, rebuilt = MetadataIndex(str(index_path)), build(tmp_path / "rebuilt.json", rows)
+    assert incremental.fields == rebuilt.fields
+    assert incremental.chunks == rebuilt.chunks
+    assert "522001" not in incremental.fields["pin"] and "odisha" not in incremental.fields["state"]
+    assert incremental.ids("district", {"guntur"}) == {"guntur", "tenali"}
+
+
+def test_update_of_an_index_without_chunk_values(tmp_path):
+    index_path = tmp_path / "metadata_index.json"
+    build(index_path)
+    # An index written before the per-chunk values were stored.
+    stored = json.loads(index_path.read_text())
+    index_path.write_text(json.dumps({"fields": stored["fields"]}))
+
+    MetadataIndex.update(str(index_path), [], ["ongole"])
+
+    rows = {chunk_id: text for chunk_id, text in ROWS.items() if chunk_id != "ongole"}
+    assert MetadataIndex(str(index_path)).fields == build(tmp_path / "rebuilt.json", rows).fields
+
+
+def test_field_that_empties_the_candidates_is_skipped(tmp_path):
+    extractor = EntityExtractor(build(tmp_path / "metadata_index.json"))
+
+    assert extractor.resolve("centres in Guntur") == ({"guntur"}, {"district": {"guntur"}})
+    assert extractor.resolve("centres in Andhra Pradesh near 522001") == (
+        {"guntur"}, {"pin": {"522001"}, "state": {"andhra pradesh"}}
+    )
+    # PIN 523002 is in Prakasam, so the Guntur mention would leave nothing and is dropped.
+    assert extractor.resolve("JSS in Guntur near 523002") == (
+        {"ongole"}, {"pin": {"523002"}, "centre_type": {"jan shikshan sansthan"}}
+    )
+    assert extractor.resolve("centres in Orissa") == ({"cuttack"}, {"state": {"odisha"}})
+    assert extractor.resolve("how do I apply?") == (None, {})
+
+
+def test_where_filter_lists_ids_up_to_the_limit(tmp_path):
+    extractor = EntityExtractor(build(tmp_path / "metadata_index.json"))
+
+    assert extractor.filters("centres in Andhra Pradesh") == (
+        {"guntur", "ongole"}, {"id": {"$in": ["guntur", "ongole"]}}
+    )
+
+
+def test_where_filter_above_the_limit_matches_multi_valued_chunks_by_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata_index, "MAX_WHERE_IDS", 1)
+    # One chunk holding rows from two districts has no 'district' metadata to match.
+    combined = chunk("combined", ROWS["guntur"] + "\n" + ROWS["ongole"])
+    rows = [chunk(chunk_id, text) for chunk_id, text in ROWS.items()] + [combined]
+    MetadataIndex.update(str(tmp_path / "metadata_index.json"), rows)
+    extractor = EntityExtractor(MetadataIndex(str(tmp_path / "metadata_index.json")))
+
+    candidates, where = extractor.filters("centres in Guntur")
+
+    assert candidates == {"guntur", "combined"}
+    annotate(combined)
+    assert "district" not in combined.metadata
+    assert where == {"$or": [{"district": {"$in": ["guntur"]}}, {"id": {"$in": ["combined"]}}]}
+
+
+@pytest.mark.parametrize("question, pins", [
+    ("centres near 522001", {"522001"}),
+    ("centres near 522 001", {"522001"}),
+    ("is there a centre at pincode 190001?", {"190001"}),
+])
+def test_pins_in_questions(tmp_path, question, pins):
+    extractor = EntityExtractor(build(tmp_path / "metadata_index.json"))
+
+    assert extractor.extract(question)["pin"] == pins
@@ -0,0 +1,84 @@
+import pytest
+from bhashini_translator import Bhashini, BhashiniResponseError, PipelineConfigCache, RetryPolicy, Transport
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("bhashini_translator.pipeline_config.time.monotonic", lambda: now[0])
+    cache = PipelineConfigCache(ttl=60)
+    cache.set("key", {"config": {"serviceId": "service"}}, {"pipeline": 1})
+
+    now[0] = 159.0
+    assert cache.get("key") == ({"config": {"serviceId": "service"}}, {"pipeline": 1})
+    now[0] = 161.0
+    assert cache.get("key") is None
+
+
+def test_cached_config_is_a_copy():
+    cache = PipelineConfigCache()
+    cache.set("key", {"config": {"serviceId": "service"}}, {})
+
+    cache.get("key")[0]["config"]["serviceId"] = "changed"
+
+    assert cache.get("key")[0]["config"]["serviceId"] == "service"
+
+
+def test_invalidate_one_or_all():
+    cache = PipelineConfigCache()
+    cache.set("a", {}, {})
+    cache.set("b", {}, {})
+
+    cache.invalidate("a")
+    assert cache.get("a") is None and cache.get("b") is not None
+    cache.invalidate()
+    assert cache.get("b") is None
+
+
+def make_client(server, sourceLanguage="hi", targetLanguage="en", gender="female", configCache=None):
+    client = Bhashini(
+        sourceLanguage, targetLanguage, transport=Transport(retryPolicy=RetryPolicy(maxRetries=0)), gender=gender
+    )
+    client.ulcaEndPoint = f"{server.url}/config"
+    client.configCache = configCache or PipelineConfigCache()
+    return client
+
+
+def test_clients_share_configs_per_task_languages_and_gender(ulca_server):
+    server = ulca_server()
+    configCache = PipelineConfigCache()
+
+    for _ in range(3):
+        make_client(server, configCache=configCache).getPipeLineConfig("translation")
+    make_client(server, configCache=configCache).getPipeLineConfig("tts")
+    make_client(server, configCache=configCache, gender="male").getPipeLineConfig("tts")
+    # Gender only matters for TTS.
+    make_client(server, configCache=configCache, gender="male").getPipeLineConfig("translation")
+    make_client(server, targetLanguage="ta", configCache=configCache).getPipeLineConfig("translation")
+
+    assert server.requests == ["/config"] * 4
+
+
+def test_invalidated_config_is_fetched_again(ulca_server):
+    server = ulca_server()
+    client = make_client(server)
+    assert client.getPipeLineConfig("translation")["config"]["serviceId"] == "service"
+    client.getPipeLineConfig("tts")
+
+    client.invalidatePipeLineConfig("translation")
+    client.getPipeLineConfig("translation")
+    client.getPipeLineConfig("tts")
+    client.invalidatePipeLineConfig()
+    client.getPipeLineConfig("tts")
+
+    assert server.requests == ["/config"] * 4
+
+
+def test_malformed_config_response(stub_server, monkeypatch):
+    monkeypatch.setenv("userId", "user")
+    monkeypatch.setenv("ulcaApiKey", "key")
+    server = stub_server({"/config": [(200, {"pipelineResponseConfig": []}, 0)]})
+    client = make_client(server)
+
+    with pytest.raises(BhashiniResponseError):
+        client.getPipeLineConfig("translation")
+    assert client.configCache.get(client.getConfigCacheKey("translation")) is None
@@ -0,0 +1,68 @@
+import os
+import pytest
+from langchain_core.documents import Document
+from stubs import HashingEmbeddings
+
+populate_database = pytest.importorskip("populate_database")
+
+
+class FakeChroma:
+    """In-memory stand-in for langchain_chroma.Chroma, keyed by persist directory."""
+
+    stores = {}
+
+    def __init__(self, persist_directory, embedding_function):
+        self.records = self.stores.setdefault(persist_directory, {})
+        self.embedding_function = embedding_function
+
+    def get(self, include=None):
+        return {"ids": list(self.records)}
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+    def add_documents(self, documents, ids):
+        self.embedding_function.embed_documents([document.page_content for document in documents])
+        self.records.update(zip(ids, documents))
+
+
+def rows(*texts):
+    return [
+        Document(page_content=text, metadata={"source": "data/a.pdf", "page": 1, "chunk_type": "table_row"})
+        for text in texts
+    ]
+
+
+@pytest.fixture
+def chroma(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("llama_parsed")
+    FakeChroma.stores = {}
+    monkeypatch.setattr(populate_database, "Chroma", FakeChroma)
+    return FakeChroma(populate_database.CHROMA_PATH, HashingEmbeddings())
+
+
+def test_ingest_replaces_positional_ids(chroma):
+    # A store built when ids were 'source:page:index'.
+    chroma.add_documents(rows("Name: JSS Guntur", "Name: JSS Ongole"), ["data/a.pdf:1:0", "data/a.pdf:1:1"])
+
+    populate_database.ingest(rows("Name: JSS Guntur", "Name: JSS Ongole"), embeddings=HashingEmbeddings())
+
+    stored_ids = set(populate_database.ChunkStore(populate_database.CHUNKS_PATH).ids())
+    assert len(stored_ids) == 2
+    assert set(chroma.records) == stored_ids
+
+
+def test_ingest_repairs_drift(chroma):
+    populate_database.ingest(rows("Name: JSS Guntur", "Name: JSS Ongole"), embeddings=HashingEmbeddings())
+    stored_ids = set(chroma.records)
+    dropped = sorted(stored_ids)[0]
+    chroma.delete([dropped])
+    chroma.add_documents(rows("Name: JSS Kamrup"), ["orphan"])
+
+    # Nothing changed in the artifacts; the run still re-adds the missing chunk and deletes the orphan.
+    populate_database.ingest([], embeddings=HashingEmbeddings())
+
+    assert set(chroma.records) == stored_ids
+    assert chroma.records[dropped].metadata["id"] == dropped
@@ -0,0 +1,98 @@
+from bhashini_translator import ResultCache, countLookups
+
+
+def test_key_covers_task_languages_services_and_gender():
+    key = ResultCache.makeKey("tts", "namaste", "hi", "en", ["service"], "female")
+
+    assert key == ResultCache.makeKey("tts", "namaste", "hi", "en", ["service"], "female")
+    assert key != ResultCache.makeKey("tts", "namaste", "hi", "en", ["service"], "male")
+    assert key != ResultCache.makeKey("tts", "namaste", "hi", "en", ["new-service"], "female")
+    assert key != ResultCache.makeKey("tts", "namaste", "hi", "ta", ["service"], "female")
+    assert key != ResultCache.makeKey("translation", "namaste", "hi", "en", ["service"], "female")
+
+
+def test_memory_tier_is_bounded_by_entries():
+    cache = ResultCache(maxEntries=2, diskPath=None)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    cache = ResultCache(maxEntries=100, diskPath=None, maxMemoryBytes=10)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    cache.set("c", "zzzz")
+
+    assert cache.stats()["memoryBytes"] == 8
+    assert cache.get("a") is None
+    assert cache.get("b") == "yyyy" and cache.get("c") == "zzzz"
+
+    # Larger than the whole budget: not kept in memory at all.
+    cache.set("big", "w" * 11)
+    assert cache.get("big") is None
+    assert cache.stats()["memoryEntries"] == 2
+
+
+def test_disk_tier_serves_evicted_and_oversized_entries(tmp_path):
+    cache = ResultCache(maxEntries=1, diskPath=str(tmp_path / "results.sqlite"), maxMemoryBytes=10)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("big", "w" * 11)
+
+    assert cache.get("a") == "1"
+    assert cache.get("big") == "w" * 11
+    assert cache.stats()["diskHits"] == 2
+    # A new process reads the same file.
+    assert ResultCache(diskPath=str(tmp_path / "results.sqlite")).get("b") == "2"
+
+
+def test_disk_tier_evicts_least_recently_used_down_to_90_percent(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr("bhashini_translator.result_cache.time.time", lambda: next(clock))
+    cache = ResultCache(maxEntries=1, diskPath=str(tmp_path / "results.sqlite"), maxDiskBytes=100)
+    for key in "abcde":
+        cache.set(key, key * 20)
+    assert cache.stats()["diskBytes"] == 100
+    # Reading "a" makes "b" the least recently used.
+    assert cache.get("a") == "a" * 20
+
+    cache.set("f", "f" * 20)
+
+    assert cache.stats()["diskBytes"] == 80
+    assert [key for key in "abcdef" if cache.get(key) is None] == ["b", "c"]
+    assert ResultCache(diskPath=str(tmp_path / "results.sqlite")).stats()["diskBytes"] == 80
+
+
+def test_replacing_an_entry_keeps_disk_size_exact(tmp_path):
+    cache = ResultCache(diskPath=str(tmp_path / "results.sqlite"))
+    cache.set("a", "x" * 10)
+    cache.set("a", "x" * 4)
+
+    assert cache.stats()["diskBytes"] == 4
+
+
+def test_missing_results_are_not_cached():
+    cache = ResultCache(diskPath=None)
+    cache.set("a", None)
+
+    assert cache.get("a") is None
+    assert cache.stats()["memoryEntries"] == 0
+
+
+def test_count_lookups():
+    cache = ResultCache(diskPath=None)
+    cache.set("a", "1")
+
+    with countLookups() as outer:
+        cache.get("a")
+        with countLookups() as inner:
+            cache.get("b")
+        cache.get("c")
+
+    assert inner == {"hits": 0, "misses": 1}
+    assert outer == {"hits": 1, "misses": 1}
@@ -0,0 +1,357 @@
+import argparse
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence
+import numpy as np
+from langchain.retrievers.document_compressors import DocumentCompressorPipeline
+from langchain_core.callbacks import BaseCallbackHandler, Callbacks
+from langchain_core.documents import Document
+from directory_lookup import LOOKUP_EVENT
+from hybrid_retriever import TIMINGS_EVENT
+
+# Spans of the last METRICS_WINDOW turns per stage are kept in memory for the metrics endpoint.
+METRICS_WINDOW = 2000
+
+# Chains and retrievers tagged with one of these are timed by TracingCallbackHandler as a span of the same name.
+STAGE_TAGS = ("condense", "retrieval", "generation")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_recorder = None
+_recorder_lock = threading.Lock()
+_configured = False
+
+
+class Span:
+    """
+    One timed stage of a chat turn, with attributes such as payload sizes and cache hits.
+
+    Spans started while another span is current (in the same thread, or in a thread or coroutine started from it
+    with the context copied) become its children and share its trace id.
+    """
+
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "trace": self.trace_id,
+            "span": self.id,
+            "parent": self.parent.id if self.parent is not None else None,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration * 1000 if self.duration is not None else None,
+            **self.attributes,
+        }
+
+
+def current_span():
+    """
+    Get the innermost active span, or None outside of any span.
+    """
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """
+    Set attributes on the innermost active span; does nothing outside of any span.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a stage as a child of the current span.
+
+    Yields:
+        Span: The new span, to which attributes can be added while the stage runs.
+    """
+    new_span = Span(name, _current_span.get(), **attributes)
+    token = _current_span.set(new_span)
+    start = time.perf_counter()
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.set(error=type(e).__name__)
+        raise
+    finally:
+        new_span.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        get_recorder().record(new_span)
+
+
+def record(name, seconds, **attributes):
+    """
+    Record a stage that was timed elsewhere (e.g. in another thread) as a child of the current span.
+    """
+    new_span = Span(name, _current_span.get(), **attributes)
+    new_span.start = time.time() - seconds
+    new_span.duration = seconds
+    get_recorder().record(new_span)
+
+
+class Recorder:
+    """
+    Collects finished spans: keeps a window per stage for percentiles, and appends every span to a JSONL file.
+
+    Spans are written by a background thread, so recording a span never waits on disk.
+    """
+
+    def __init__(self, path=None, window=METRICS_WINDOW):
+        self.path = path
+        self._stages = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        if path:
+            threading.Thread(target=self._write, name="trace-writer", daemon=True).start()
+
+    def record(self, span):
+        with self._lock:
+            self._stages[span.name].append((span.duration, span.attributes))
+        if self.path:
+            self._queue.put(span.to_dict())
+
+    def _write(self):
+        while True:
+            records = [self._queue.get()]
+            # Write whatever has accumulated in one go.
+            while not self._queue.empty():
+                records.append(self._queue.get_nowait())
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+            except OSError:
+                traceback.print_exc()
+
+    def summary(self):
+        """
+        Summarize the recorded window per stage.
+
+        Returns:
+            dict: For every stage, the span count, mean and p50/p95/p99 duration in milliseconds,
+            and the fraction of spans for which each boolean attribute (e.g. answer_cache_hit) was true.
+        """
+        with self._lock:
+            stages = {name: list(spans) for name, spans in self._stages.items()}
+        return {name: summarize(spans) for name, spans in sorted(stages.items())}
+
+
+def summarize(spans):
+    """
+    Summarize (duration in seconds, attributes) pairs of one stage; see Recorder.summary().
+    """
+    durations = np.asarray([duration for duration, _ in spans], dtype=np.float64) * 1000
+    flags = defaultdict(list)
+    for _, attributes in spans:
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                flags[key].append(value)
+    return {
+        "count": len(spans),
+        "mean_ms": float(durations.mean()),
+        "p50_ms": float(np.percentile(durations, 50)),
+        "p95_ms": float(np.percentile(durations, 95)),
+        "p99_ms": float(np.percentile(durations, 99)),
+        **{f"{key}_rate": sum(values) / len(values) for key, values in sorted(flags.items())},
+    }
+
+
+def get_recorder():
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = Recorder()
+    return _recorder
+
+
+def set_recorder(recorder):
+    """
+    Replace the process-wide recorder, e.g. with one writing elsewhere in a benchmark.
+    """
+    global _recorder
+    _recorder = recorder
+
+
+def setup():
+    """
+    Configure tracing from the environment, once per process.
+
+    TRACE_FILE, when set, is the JSONL file every span is appended to (spans are only kept in memory otherwise),
+    and METRICS_PORT, when set, serves the per-stage percentiles as JSON at http://localhost:<port>/metrics.
+    """
+    global _recorder, _configured
+    with _recorder_lock:
+        if _configured:
+            return
+        _recorder = Recorder(os.getenv("TRACE_FILE") or None)
+        _configured = True
+    port = os.getenv("METRICS_PORT")
+    if port:
+        serve_metrics(int(port))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = json.dumps(get_recorder().summary(), indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port):
+    """
+    Serve Recorder.summary() as JSON on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def payload_chars(value):
+    """
+    Count the characters of the text in chain inputs or outputs (strings and documents, in dicts and lists).
+    """
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, Document):
+        return len(value.page_content)
+    if isinstance(value, dict):
+        return sum(payload_chars(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_chars(item) for item in value)
+    return 0
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler turning the runs and custom events of the conversation chain into spans and turn attributes.
+
+    Chains and retrievers tagged with one of STAGE_TAGS (condensing, retrieval, answer generation) are recorded as spans
+    of that name under the current span, the per-stage timings of HybridRetriever become spans (vector_search,
+    keyword_search, ...), and directory lookups set directory_lookup_hit on the current span.
+    """
+
+    def __init__(self):
+        self._stages = {}
+
+    def _start(self, run_id, tags, **attributes):
+        stage = next((tag for tag in tags or () if tag in STAGE_TAGS), None)
+        if stage is not None:
+            self._stages[run_id] = (stage, time.perf_counter(), attributes)
+
+    def _end(self, run_id, **attributes):
+        started = self._stages.pop(run_id, None)
+        if started is not None:
+            stage, start, start_attributes = started
+            record(stage, time.perf_counter() - start, **start_attributes, **attributes)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags, chars_in=payload_chars(inputs))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, chars_out=payload_chars(outputs))
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+    def on_retriever_start(self, serialized, query, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents=len(documents), chars=payload_chars(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+    def on_custom_event(self, name, data, *, run_id, tags=None, metadata=None, **kwargs):
+        if name == TIMINGS_EVENT:
+            for stage, seconds in data.items():
+                if stage != "total":
+                    record(stage, seconds)
+        elif name == LOOKUP_EVENT:
+            set_attributes(directory_lookup_hit=data["hit"])
+
+
+class TracedCompressorPipeline(DocumentCompressorPipeline):
+    """DocumentCompressorPipeline that runs every transformer (reranker, filter, compressor) in its own span."""
+
+    stage_names: List[str] = []
+    """Span name of each transformer, in order; the class name is used for the ones without."""
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        for index, transformer in enumerate(self.transformers):
+            name = self.stage_names[index] if index < len(self.stage_names) else type(transformer).__name__
+            with span(name, documents_in=len(documents), chars_in=sum(len(d.page_content) for d in documents)) as stage:
+                single = self.copy(update={"transformers": [transformer]})
+                documents = super(TracedCompressorPipeline, single).compress_documents(documents, query, callbacks=callbacks)
+                stage.set(documents_out=len(documents), chars_out=sum(len(d.page_content) for d in documents))
+        return documents
+
+
+def print_summary(summary):
+    """
+    Print a per-stage summary (see Recorder.summary()) as a table.
+    """
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stage in summary.items():
+        rates = "  ".join(f"{key}={value:.2f}" for key, value in stage.items() if key.endswith("_rate"))
+        print(f"{name:<22}{stage['count']:>7}{stage['p50_ms']:>10.1f}{stage['p95_ms']:>10.1f}{stage['p99_ms']:>10.1f}  {rates}")
+
+
+def main():
+    """
+    Print per-stage latency percentiles of a JSONL trace file.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("trace_file", nargs="?", default="traces.jsonl")
+    args = parser.parse_args()
+
+    spans = defaultdict(list)
+    with open(args.trace_file, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                attributes = {key: value for key, value in record.items() if isinstance(value, bool)}
+                spans[record["name"]].append((record["duration_ms"] / 1000, attributes))
+    print_summary({name: summarize(stage_spans) for name, stage_spans in sorted(spans.items())})
+
+
+if __name__ == "__main__":
+    main()